@@ -0,0 +1,40 @@
+"""inventory change log
+
+Revision ID: 5d2e8b6f0c31
+Revises: a3f9c1d27b44
+Create Date: 2025-11-05 16:40:02.118530
+
+"""
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import sqlite
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2e8b6f0c31'
+down_revision: str | Sequence[str] | None = 'a3f9c1d27b44'
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('inventory_change',
+    sa.Column('id', sa.INTEGER(), nullable=False),
+    sa.Column('sku', sa.VARCHAR(length=255), nullable=False),
+    sa.Column('delta', sa.INTEGER(), nullable=False),
+    sa.Column('quantity', sa.INTEGER(), nullable=False),
+    sa.Column('version', sa.INTEGER(), nullable=False),
+    sa.Column('service_name', sa.VARCHAR(length=255), nullable=True),
+    sa.Column('idempotency_key', sa.VARCHAR(length=255), nullable=True),
+    sa.Column('created_at', sqlite.DATETIME(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sqlite_autoincrement=True
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('inventory_change')
@@ -0,0 +1,28 @@
+"""idempotency key indexes
+
+Revision ID: a3f9c1d27b44
+Revises: seed_service_credentials
+Create Date: 2025-11-03 10:12:41.204871
+
+"""
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f9c1d27b44'
+down_revision: str | Sequence[str] | None = 'seed_service_credentials'
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_idempotency_key_lookup', 'idempotency_key', ['key', 'service_name', 'expires_at'], unique=False)
+    op.create_index('ix_idempotency_key_expires_at', 'idempotency_key', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_idempotency_key_expires_at', table_name='idempotency_key')
+    op.drop_index('ix_idempotency_key_lookup', table_name='idempotency_key')
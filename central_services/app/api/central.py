@@ -1,44 +1,166 @@
-import asyncio
-from datetime import UTC, datetime
 import logging
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, Header, HTTPException
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from auth.utils import VerifiedService, get_db, verify_service_jwt
 from common.schemas import (
+	BatchReadItem,
+	BatchReadRequest,
+	BulkSyncItemResult,
 	BulkSyncRequest,
+	ConflictError,
+	InventoryChangeEntry,
 	InventoryResponse,
 	UpdateInventory,
 )
-from models.models import IdempotencyKey, Inventory
+from core.config import get_settings
+from core.db import session
 from observability import (
 	bulk_sync_total,
 	inventory_update_failures_total,
 	inventory_updates_total,
 )
+from service.idempotency import (
+	IdempotencyKeyTaken,
+	IdempotencyRecord,
+	idempotency_cache,
+	request_digest,
+)
 from service.inventory import (
+	AdjustmentRequest,
 	adjust_inventory_services,
-	create_idempotency,
-	get_idempotency,
+	apply_adjustments,
+	find_idempotency_record,
+	get_changes_since,
 	get_item_from_sku,
+	inventory_read_cache,
+	iter_items_from_skus,
+	sku_write_coalescer,
 )
 
 logger = logging.getLogger("central_service")
+settings = get_settings()
 
 router = APIRouter(prefix="/v1", tags=["central"])
 
+_BULK_STATUS_CODES = {"applied": 200, "replayed": 200, "conflict": 409, "insufficient": 400}
+
+
+def inventory_etag(item: InventoryResponse) -> str:
+	"""Strong ETag of an inventory state, versions only move forward."""
+	return f'"{item.sku}-{item.version}"'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+	candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+	return "*" in candidates or etag in candidates
+
+
+@router.get(
+	"/inventory/changes",
+	response_class=StreamingResponse,
+	responses={200: {"content": {"application/x-ndjson": {}}}},
+)
+async def get_inventory_changes(
+	db: Annotated[AsyncSession, Depends(get_db)],
+	service: Annotated[VerifiedService, Depends(verify_service_jwt)],
+	since: int = Query(0, ge=0, description="Last change sequence already applied"),
+	limit: int = Query(1000, ge=1, le=10_000),
+) -> StreamingResponse:
+	"""Stream the changes applied after `since` as NDJSON, oldest first.
+
+	`X-Next-Cursor` holds the `since` to use for the next page and `X-Has-More`
+	tells if there are more changes after this page.
+	"""
+	changes = await get_changes_since(db=db, since=since, limit=limit + 1)
+	has_more = len(changes) > limit
+	changes = changes[:limit]
+	next_cursor = changes[-1].id if changes else since
+
+	def _lines():
+		for change in changes:
+			yield InventoryChangeEntry.model_validate(change).model_dump_json() + "\n"
+
+	return StreamingResponse(
+		_lines(),
+		media_type="application/x-ndjson",
+		headers={"X-Next-Cursor": str(next_cursor), "X-Has-More": str(has_more).lower()},
+	)
 
+
+# Declared after /inventory/changes so it does not capture it as a sku
 @router.get("/inventory/{sku}", response_model=InventoryResponse)
 async def get_inventory(
 	sku: str,
 	db: Annotated[AsyncSession, Depends(get_db)],
 	service: Annotated[VerifiedService, Depends(verify_service_jwt)],
+	response: Response,
+	if_none_match: str | None = Header(None, alias="If-None-Match"),
+) -> InventoryResponse | Response:
+	"""Get current inventory state for a SKU.
+
+	Served from the read cache when possible. Answers 304 when `If-None-Match`
+	holds the ETag of the current version.
+	"""
+	item = await inventory_read_cache.get(db=db, sku=sku)
+	etag = inventory_etag(item)
+	if if_none_match and _etag_matches(if_none_match, etag):
+		return Response(status_code=304, headers={"ETag": etag})
+	response.headers["ETag"] = etag
+	return item
+
+
+def _is_commutative(payload: UpdateInventory, service: VerifiedService) -> bool:
+	"""Delta mode is chosen per request, or for every request of a service."""
+	return (
+		payload.mode == "delta"
+		or service["service_name"] in settings.delta_mode_services
+	)
+
+
+async def _replay(
+	db: AsyncSession, sku: str, payload: UpdateInventory, record: IdempotencyRecord
+) -> InventoryResponse | Response:
+	"""Answer a request whose Idempotency-Key was already used."""
+	if record.response_body is None:
+		return await get_item_from_sku(db=db, sku=sku)
+	if record.request_hash != request_digest(payload):
+		raise HTTPException(
+			status_code=422,
+			detail="Idempotency-Key already used with a different request",
+		)
+	return Response(
+		content=record.response_body,
+		media_type="application/json",
+		headers={"Idempotent-Replayed": "true"},
+	)
+
+
+async def _adjust_coalesced(
+	db: AsyncSession, request: AdjustmentRequest
 ) -> InventoryResponse:
-	"""Get current inventory state for a SKU."""
-	return await get_item_from_sku(db=db, sku=sku)
+	"""Apply an adjustment through the per-SKU write coalescer and turn its
+	result in the same response `adjust_inventory_services` would give.
+
+	The batch runs on a session of its own, so the connection of the request
+	(checked out by the auth lookup) goes back to the pool first: a burst of
+	waiting requests would otherwise hold every connection the batch needs.
+	"""
+	await db.close()
+	result = await sku_write_coalescer.submit(request)
+	if result.status == "conflict":
+		raise HTTPException(
+			status_code=409,
+			detail=ConflictError(
+				message=result.detail, current_state=result.item
+			).model_dump(mode="json"),
+		)
+	if result.status == "insufficient":
+		raise HTTPException(status_code=400, detail=result.detail)
+	return result.item
 
 
 @router.post("/inventory/{sku}/adjust", response_model=InventoryResponse)
@@ -48,31 +170,52 @@ async def adjust_inventory(
 	db: Annotated[AsyncSession, Depends(get_db)],
 	service: Annotated[VerifiedService, Depends(verify_service_jwt)],
 	idempotency_key: str = Header(..., alias="Idempotency-Key"),
-) -> InventoryResponse:
-	"""Adjust inventory quantity for a SKU with optimistic locking."""
+) -> InventoryResponse | Response:
+	"""Adjust inventory quantity for a SKU with optimistic locking, or atomically
+	without a version check in delta mode.
+
+	A retry with an already used Idempotency-Key gets the original response back.
+	"""
 	try:
-		existing = await get_idempotency(
-			db=db, idempotency_key=idempotency_key, service_name=service["service_name"]
-		)
-		logger.info(f"Idempotency: {existing}")
-		if not existing:
-			idepotency = IdempotencyKey(
-				key=idempotency_key, service_name=service["service_name"],
-				request_hash=hash(payload.model_dump_json()),
-				response_body="",
-				created_at=datetime.now(UTC)
+		existing = idempotency_cache.get((service["service_name"], idempotency_key))
+		if existing is not None:
+			return await _replay(db=db, sku=sku, payload=payload, record=existing)
+
+		commutative = _is_commutative(payload, service)
+		if settings.adjust_coalescing:
+			updated = await _adjust_coalesced(
+				db,
+				AdjustmentRequest(
+					sku=sku,
+					payload=payload,
+					service_name=service["service_name"],
+					idempotency_key=idempotency_key,
+					commutative=commutative,
+				)
 			)
-			await create_idempotency(db=db, idempotency=idepotency)
-		if existing:
-			return await get_item_from_sku(db=db, sku=sku)
-
-		updated = await adjust_inventory_services(
-			db=db,
-			payload=payload,
-			sku=sku,
-			service_name=service["service_name"],
-			idempotency_key=idempotency_key,
-		)
+		else:
+			try:
+				updated = await adjust_inventory_services(
+					db=db,
+					payload=payload,
+					sku=sku,
+					service_name=service["service_name"],
+					idempotency_key=idempotency_key,
+					commutative=commutative,
+				)
+			except IdempotencyKeyTaken:
+				existing = await find_idempotency_record(
+					db=db,
+					idempotency_key=idempotency_key,
+					service_name=service["service_name"],
+				)
+				if existing is None:
+					raise HTTPException(
+						status_code=409,
+						detail="Idempotency-Key is already in use",
+					) from None
+				logger.info(f"Idempotency: {existing}")
+				return await _replay(db=db, sku=sku, payload=payload, record=existing)
 		inventory_updates_total.inc()
 		return updated
 	except HTTPException:
@@ -82,60 +225,73 @@ async def adjust_inventory(
 		raise
 
 
-@router.post("/inventory/bulk-sync", response_model=list[InventoryResponse])
+@router.post("/inventory/bulk-sync", response_model=list[BulkSyncItemResult])
 async def bulk_sync(
 	payload: BulkSyncRequest,
 	db: Annotated[AsyncSession, Depends(get_db)],
 	service: Annotated[VerifiedService, Depends(verify_service_jwt)],
-) -> list[InventoryResponse]:
-	"""Process a batch of inventory updates for store sync."""
-	results: list[InventoryResponse] = []
-	semaphore = asyncio.Semaphore(10)
-
-	async def _process_item(item: UpdateInventory) -> InventoryResponse:
-		"""Process a single item from the bulk request.
-
-		Uses the existing `adjust_inventory` endpoint logic via internal call to
-		keep behaviour consistent (idempotency + optimistic locking).
-		If a conflict (409) occurs, return the current state from DB.
-		"""
-		async with semaphore:
-			try:
-				resp = await adjust_inventory(
-					item.sku,
-					item,
-					db,
-					service,
-					idempotency_key=f"bulk-{item.operation_id}",
-				)
-				return resp
-			except HTTPException as e:
-				if e.status_code == 409:
-					# Conflict: return current state
-					logger.debug("Conflict during bulk-sync for SKU %s", item.sku)
-					result = await db.execute(
-						select(Inventory).where(Inventory.sku == item.sku)
-					)
-					item = result.scalar_one()
-					return InventoryResponse.model_validate(item)
-				raise
-
-	# Launch tasks and gather results preserving order
+) -> list[BulkSyncItemResult]:
+	"""Process a batch of inventory updates for store sync.
+
+	The whole batch is applied in a single transaction. Every item keeps the
+	semantics of `/adjust` (idempotency + optimistic locking) and reports its own
+	result: conflicts (409) and insufficient stock (400) carry the current state
+	from the DB instead of failing the batch.
+	"""
+	requests = [
+		AdjustmentRequest(
+			sku=item.sku,
+			payload=item,
+			service_name=service["service_name"],
+			idempotency_key=f"bulk-{item.operation_id}",
+			commutative=_is_commutative(item, service),
+		)
+		for item in payload.items
+	]
 	try:
-		tasks = [asyncio.create_task(_process_item(it)) for it in payload.items]
-		gathered = await asyncio.gather(*tasks)
-		results.extend(gathered)
-	except Exception as err:
+		outcomes = await apply_adjustments(db=db, requests=requests)
+	except HTTPException:
+		raise
+	except Exception:
 		inventory_update_failures_total.inc()
 		logger.exception("bulk_sync failed")
 		raise
 	finally:
 		bulk_sync_total.inc()
 
-	try:
-		for _r in results:
-			inventory_updates_total.inc()
-	except Exception:
-		pass
+	applied = sum(1 for outcome in outcomes if outcome.status == "applied")
+	if applied:
+		inventory_updates_total.inc(applied)
+	return [
+		BulkSyncItemResult(
+			**outcome.item.model_dump(),
+			operation_id=outcome.request.payload.operation_id,
+			status=outcome.status,
+			status_code=_BULK_STATUS_CODES[outcome.status],
+			detail=outcome.detail,
+		)
+		for outcome in outcomes
+	]
+
+
+@router.post(
+	"/inventory/batch-read",
+	response_class=StreamingResponse,
+	responses={200: {"content": {"application/x-ndjson": {}}}},
+)
+async def batch_read_inventory(
+	payload: BatchReadRequest,
+	service: Annotated[VerifiedService, Depends(verify_service_jwt)],
+) -> StreamingResponse:
+	"""Read the state of many SKUs in one request.
+
+	The answer is streamed as NDJSON, one `BatchReadItem` per SKU in request
+	order. Unknown SKUs are reported inline with `found=false`.
+	"""
+
+	async def _lines():
+		async with session() as db:
+			async for sku, item in iter_items_from_skus(db=db, skus=payload.skus):
+				yield BatchReadItem(sku=sku, found=item is not None, item=item).model_dump_json() + "\n"
 
-	return results
+	return StreamingResponse(_lines(), media_type="application/x-ndjson")
@@ -1,13 +1,16 @@
 from collections.abc import AsyncGenerator
 from datetime import UTC, datetime, timedelta
+import hashlib
+import time
 from typing import Annotated, TypedDict
 
 import jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy import select
+from sqlalchemy import event, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from common.cache import TTLCache
 from core.config import get_settings
 from core.db import session
 from models.models import ServiceCredentials
@@ -26,46 +29,101 @@ class VerifiedService(TypedDict):
     role: str
 
 
+# sha256(token) -> VerifiedService, each entry expires at the token `exp` or
+# after `credentials_cache_ttl`, whichever comes first
+_verified_tokens: TTLCache[str, VerifiedService] = TTLCache(
+    max_entries=settings.token_cache_size
+)
+# service_name -> role
+_service_roles: TTLCache[str, str] = TTLCache(
+    max_entries=1024, ttl_seconds=settings.credentials_cache_ttl
+)
+
+
 async def get_db() -> AsyncGenerator[AsyncSession]:
     async with session() as db:
         yield db
 
 
+def invalidate_service_credentials(service_name: str | None = None) -> None:
+    """Drop the cached role and verified tokens of a service (all when None).
+
+    Must be called when a ServiceCredentials row changes outside of the ORM,
+    ORM updates and deletes are handled by the listeners below. Changes made by
+    Core statements or by another process are only seen once the cache expires:
+    a revoked service keeps authenticating for up to `credentials_cache_ttl`.
+    """
+    if service_name is None:
+        _service_roles.clear()
+        _verified_tokens.clear()
+        return
+    _service_roles.pop(service_name)
+    _verified_tokens.discard_where(
+        lambda _, verified: verified["service_name"] == service_name
+    )
+
+
+@event.listens_for(ServiceCredentials, "after_update")
+@event.listens_for(ServiceCredentials, "after_delete")
+def _on_credentials_change(mapper, connection, target: ServiceCredentials) -> None:
+    invalidate_service_credentials(target.service_name)
+
+
+async def get_service_role(db: AsyncSession, service_name: str) -> str | None:
+    """Return the role of a known service, None if the service does not exist."""
+    role = _service_roles.get(service_name)
+    if role is not None:
+        return role
+    result = await db.execute(
+        select(ServiceCredentials).where(ServiceCredentials.service_name == service_name)
+    )
+    service = result.scalar_one_or_none()
+    if not service:
+        return None
+    _service_roles.set(service_name, service.role)
+    return service.role
+
+
 async def verify_service_jwt(
     db: Annotated[AsyncSession, Depends(get_db)],
     token: Annotated[HTTPAuthorizationCredentials, Depends(security)],
 ) -> VerifiedService:
-    """Verify JWT is signed by a known service and return the service details."""
+    """Verify JWT is signed by a known service and return the service details.
+
+    A token already verified is answered from memory until its `exp`, without
+    checking the signature again nor querying the database.
+    """
     credentials_exception = HTTPException(
 		status_code=status.HTTP_401_UNAUTHORIZED,
 		detail="Could not validate credentials",
 		headers={"WWW-Authenticate": "Bearer"},
 	)
+    digest = hashlib.sha256(token.credentials.encode()).hexdigest()
+    verified = _verified_tokens.get(digest)
+    if verified is not None:
+        return verified
     try:
-    # First decode without verification to get issuer
-        unverified = jwt.decode(token.credentials, options={"verify_signature": False})
-        service_name = unverified.get("iss")
-        if not service_name:
-            raise HTTPException(401, "Missing issuer claim")
-
-        # Look up service secret
-        result = await db.execute(
-            select(ServiceCredentials).where(ServiceCredentials.service_name == service_name)
-        )
-        service = result.scalar_one_or_none()
-        if not service:
-            raise HTTPException(401, "Unknown service")
         payload = jwt.decode(
             token.credentials,
             settings.jwt_secrets,
             algorithms=[settings.jwt_algorithm],
             audience="central-service",
+            options={"require": ["exp"]},
         )
-        if datetime.now(UTC) > datetime.fromtimestamp(payload["exp"], UTC):
-            raise credentials_exception
-        return {"service_name": service_name, "role": service.role}
     except jwt.InvalidTokenError as e:
         raise credentials_exception from e
+    service_name = payload.get("iss")
+    if not service_name:
+        raise HTTPException(401, "Missing issuer claim")
+
+    role = await get_service_role(db=db, service_name=service_name)
+    if role is None:
+        raise HTTPException(401, "Unknown service")
+    verified = {"service_name": service_name, "role": role}
+    # Capped so a revocation the listeners miss is seen within the credentials TTL
+    expires_at = min(float(payload["exp"]), time.time() + settings.credentials_cache_ttl)
+    _verified_tokens.set(digest, verified, expires_at=expires_at)
+    return verified
 
 
 def create_access_token(data: Token) -> str:
@@ -0,0 +1,62 @@
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+
+
+class TTLCache[K: Hashable, V]:
+	"""Bounded in-process LRU cache whose entries expire at a wall-clock time.
+
+	Not thread safe: it is meant to be used from the event loop of the process.
+
+	.. code-block:: python
+		cache = TTLCache[str, int](max_entries=100, ttl_seconds=60)
+		cache.set("a", 1)
+		cache.set("b", 2, expires_at=time.time() + 5)
+		cache.get("a")
+	"""
+
+	def __init__(self, max_entries: int, ttl_seconds: float | None = None) -> None:
+		self.max_entries = max_entries
+		self.ttl_seconds = ttl_seconds
+		self._entries: OrderedDict[K, tuple[V, float | None]] = OrderedDict()
+
+	def __len__(self) -> int:
+		return len(self._entries)
+
+	def get(self, key: K) -> V | None:
+		"""Return the value for `key`, or None if it is absent or expired."""
+		entry = self._entries.get(key)
+		if entry is None:
+			return None
+		value, expires_at = entry
+		if expires_at is not None and expires_at <= time.time():
+			del self._entries[key]
+			return None
+		self._entries.move_to_end(key)
+		return value
+
+	def set(self, key: K, value: V, expires_at: float | None = None) -> None:
+		"""Store `value`. `expires_at` is an epoch timestamp; by default the entry
+		lives `ttl_seconds`, and never expires if the cache has no ttl."""
+		if self.max_entries <= 0:
+			return
+		if expires_at is None and self.ttl_seconds is not None:
+			expires_at = time.time() + self.ttl_seconds
+		self._entries[key] = (value, expires_at)
+		self._entries.move_to_end(key)
+		while len(self._entries) > self.max_entries:
+			self._entries.popitem(last=False)
+
+	def pop(self, key: K) -> V | None:
+		entry = self._entries.pop(key, None)
+		return entry[0] if entry is not None else None
+
+	def discard_where(self, predicate: Callable[[K, V], bool]) -> int:
+		"""Remove every entry matching `predicate`. Returns the number removed."""
+		keys = [key for key, (value, _) in self._entries.items() if predicate(key, value)]
+		for key in keys:
+			del self._entries[key]
+		return len(keys)
+
+	def clear(self) -> None:
+		self._entries.clear()
@@ -9,6 +9,10 @@ class UpdateInventory(BaseModel):
     delta: int = Field(..., description="Negative for reservation/sale; positive for restock")
     version: int
     operation_id: str = Field(..., description="Client-generated operation ID for idempotency")
+    mode: Literal["versioned", "delta"] = Field(
+        "versioned",
+        description="`versioned` requires `version` to match central; `delta` applies the delta atomically whatever the version",
+    )
 
 class UpdateInventoryResponse(BaseModel):
     sku: str
@@ -33,6 +37,38 @@ class ConflictError(BaseModel):
 class BulkSyncRequest(BaseModel):
     items: list[UpdateInventory]
 
+
+class BulkSyncItemResult(InventoryResponse):
+    """Per-item outcome of a bulk-sync batch.
+
+    The inventory fields always hold central's state for the SKU, so a
+    conflicting or rejected item carries the data the store needs to resolve it.
+    """
+    operation_id: str
+    status: Literal["applied", "replayed", "conflict", "insufficient"] = "applied"
+    status_code: int = Field(200, description="HTTP status the item would get on /adjust")
+    detail: str | None = None
+
+class BatchReadRequest(BaseModel):
+    skus: list[str] = Field(..., min_length=1, max_length=10_000, description="SKUs to read, duplicates are answered once")
+
+
+class BatchReadItem(BaseModel):
+    """One NDJSON line of a batch read, unknown SKUs have `found=False`."""
+    sku: str
+    found: bool
+    item: InventoryResponse | None = None
+
+class InventoryChangeEntry(BaseModel):
+    """One NDJSON line of the change feed."""
+    seq: int = Field(..., validation_alias="id", description="Global change sequence, use it as `since` to resume")
+    sku: str
+    delta: int
+    quantity: int
+    version: int
+    created_at: datetime
+    model_config = ConfigDict(from_attributes=True)
+
 class GetDataFromSku(BaseModel):
     id: int
     quantity: int
@@ -19,6 +19,19 @@ class ReadEnvSettings(BaseSettings):
     jwt_algorithm: str = Field("HS256", description="Algorith used in the JWT Auth", alias="JWT_ALGORITHM")
     database_url: str = Field(default="sqlite+aiosqlite:///./central_inventory.db", description="url or path for the sqlite db", alias="DATABASE_URL")
     jwt_expiration: int = Field(15, description="Minutes to expire the JWT token", alias="JWT_EXPIRATION")
+    delta_mode_services: list[str] = Field([], description="Services whose adjustments always use the commutative delta mode", alias="DELTA_MODE_SERVICES")
+    adjust_coalescing: bool = Field(False, description="Group concurrent /adjust calls of the same SKU in one transaction", alias="ADJUST_COALESCING")
+    adjust_coalesce_window_ms: float = Field(5, description="Milliseconds to wait for more adjustments of a SKU before applying them", alias="ADJUST_COALESCE_WINDOW_MS")
+    adjust_coalesce_max_batch: int = Field(64, description="Max adjustments of a SKU applied in one transaction", alias="ADJUST_COALESCE_MAX_BATCH")
+    inventory_cache_size: int = Field(50_000, description="Max SKUs kept in the inventory read cache", alias="INVENTORY_CACHE_SIZE")
+    inventory_cache_ttl: float = Field(5, description="Seconds a cached inventory read is served before going back to the DB", alias="INVENTORY_CACHE_TTL")
+    token_cache_size: int = Field(10_000, description="Max verified tokens kept in memory", alias="TOKEN_CACHE_SIZE")
+    credentials_cache_ttl: int = Field(300, description="Seconds a service credential is cached in memory", alias="CREDENTIALS_CACHE_TTL")
+    idempotency_ttl_hours: int = Field(24, description="Hours an idempotency key is kept to answer replays", alias="IDEMPOTENCY_TTL_HOURS")
+    idempotency_sweep_interval: int = Field(300, description="Seconds between sweeps of expired idempotency keys", alias="IDEMPOTENCY_SWEEP_INTERVAL")
+    idempotency_sweep_batch_size: int = Field(500, description="Max expired idempotency keys deleted per transaction", alias="IDEMPOTENCY_SWEEP_BATCH_SIZE")
+    idempotency_sweep_pause: float = Field(0.05, description="Seconds to yield to writers between two sweep batches", alias="IDEMPOTENCY_SWEEP_PAUSE")
+    idempotency_cache_size: int = Field(10_000, description="Max idempotency records kept in the in-memory replay cache", alias="IDEMPOTENCY_CACHE_SIZE")
 
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", extra="ignore")
 
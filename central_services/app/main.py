@@ -1,3 +1,5 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
 from datetime import UTC, datetime
 
 from fastapi import FastAPI, Response
@@ -8,11 +10,22 @@ from api.central import router as central_routes
 from auth.routes import router as auth_route
 from common.schemas import GenericResponse
 from core.db import session
-from models.models import IdempotencyKey, Inventory
-from observability import REGISTRY, idempotency_keys_gauge, inventory_count_gauge
+from models.models import Inventory
+from observability import REGISTRY, inventory_count_gauge
+from service.idempotency import run_idempotency_sweeper
 from utils.logger_middleware import RequestLoggingMiddleware, logger
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    sweeper = asyncio.create_task(run_idempotency_sweeper())
+    yield
+    sweeper.cancel()
+    with suppress(asyncio.CancelledError):
+        await sweeper
+
+
+app = FastAPI(lifespan=lifespan)
 app.include_router(central_routes)
 app.include_router(auth_route)
 
@@ -28,17 +41,18 @@ def health_check() -> GenericResponse:
 
 @app.get("/metrics", tags=["observability"])
 async def metrics():
-    """Return simple observability metrics: uptime and DB counts."""
+    """Return simple observability metrics: uptime and DB counts.
+
+    The idempotency table is not counted: it can be large, watch
+    `central_idempotency_keys_swept_total` instead.
+    """
     async with session() as db:
         inv_res = await db.execute(select(func.count()).select_from(Inventory))
         inv_count = inv_res.scalar_one()
-        idem_res = await db.execute(select(func.count()).select_from(IdempotencyKey))
-        idem_count = idem_res.scalar_one()
 
     uptime = (datetime.now(UTC) - START_TIME).total_seconds()
     # Update gauges
     inventory_count_gauge.set(int(inv_count))
-    idempotency_keys_gauge.set(int(idem_count))
 
     # Return Prometheus text format
     output = generate_latest(REGISTRY)
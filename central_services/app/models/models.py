@@ -1,6 +1,7 @@
 from datetime import UTC, datetime
 from typing import Annotated
 
+from sqlalchemy import Index
 from sqlalchemy.dialects.sqlite import DATETIME, INTEGER, VARCHAR
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -30,6 +31,13 @@ class IdempotencyKey(ModelBase, MixInNameTable):
 
     For prototype we store a short-lived record of the request and response.
     """
+    __table_args__ = (
+        # Matches the predicate of `get_idempotency`
+        Index("ix_idempotency_key_lookup", "key", "service_name", "expires_at"),
+        # Lets the sweeper find expired rows without a full scan
+        Index("ix_idempotency_key_expires_at", "expires_at"),
+    )
+
     id: Mapped[primary_key]
     key: Mapped[str] = mapped_column(VARCHAR(255), unique=True, nullable=False)
     service_name: Mapped[str] = mapped_column(VARCHAR(255), nullable=False)
@@ -37,3 +45,21 @@ class IdempotencyKey(ModelBase, MixInNameTable):
     response_body: Mapped[str] = mapped_column(VARCHAR, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DATETIME, nullable=False, default=lambda: datetime.now(UTC))
     expires_at: Mapped[datetime] = mapped_column(DATETIME, nullable=True)
+
+
+class InventoryChange(ModelBase, MixInNameTable):
+    """Append-only log of the adjustments applied to the inventory.
+
+    `id` is the global change sequence stores use to pull deltas, AUTOINCREMENT
+    keeps it monotonic even if old rows are deleted.
+    """
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id: Mapped[primary_key]
+    sku: Mapped[str] = mapped_column(VARCHAR(255), nullable=False)
+    delta: Mapped[int] = mapped_column(INTEGER, nullable=False)
+    quantity: Mapped[int] = mapped_column(INTEGER, nullable=False)
+    version: Mapped[int] = mapped_column(INTEGER, nullable=False)
+    service_name: Mapped[str] = mapped_column(VARCHAR(255), nullable=True)
+    idempotency_key: Mapped[str] = mapped_column(VARCHAR(255), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DATETIME, nullable=False, default=lambda: datetime.now(UTC))
@@ -24,11 +24,28 @@ bulk_sync_total = Counter(
     "Total bulk sync batches processed",
     registry=REGISTRY,
 )
+coalesced_batches_total = Counter(
+    "central_coalesced_batches_total",
+    "Total batches of same-SKU adjustments applied by the write coalescer",
+    registry=REGISTRY,
+)
+idempotency_keys_swept_total = Counter(
+    "central_idempotency_keys_swept_total",
+    "Total expired idempotency keys deleted by the sweeper",
+    registry=REGISTRY,
+)
 
 # Gauges (set at scrape time)
 inventory_count_gauge = Gauge(
     "central_inventory_count", "Number of inventory items in central DB", registry=REGISTRY
 )
-idempotency_keys_gauge = Gauge(
-    "central_idempotency_keys", "Number of idempotency keys stored", registry=REGISTRY
+idempotency_sweep_duration_seconds = Gauge(
+    "central_idempotency_sweep_duration_seconds",
+    "Duration in seconds of the idempotency key sweep (latest)",
+    registry=REGISTRY,
+)
+coalesced_batch_size = Gauge(
+    "central_coalesced_batch_size",
+    "Number of adjustments applied in the last coalesced batch",
+    registry=REGISTRY,
 )
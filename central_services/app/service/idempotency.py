@@ -0,0 +1,160 @@
+import asyncio
+import hashlib
+import logging
+import time
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+
+from pydantic import BaseModel
+from sqlalchemy import and_, delete, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from common.cache import TTLCache
+from core.config import get_settings
+from core.db import session
+from models.models import IdempotencyKey
+from observability import (
+	idempotency_keys_swept_total,
+	idempotency_sweep_duration_seconds,
+)
+
+logger = logging.getLogger("central_service")
+settings = get_settings()
+
+IDEMPOTENCY_TTL = timedelta(hours=settings.idempotency_ttl_hours)
+
+
+@dataclass(slots=True, frozen=True)
+class IdempotencyRecord:
+	"""Stored outcome of a request made with an idempotency key.
+
+	`response_body` is the serialized InventoryResponse sent to the client. It is
+	None for rows written before responses were stored, which can only be
+	answered with the current state of the SKU.
+	"""
+
+	request_hash: str | None
+	response_body: bytes | None
+	expires_at: datetime
+
+
+class IdempotencyKeyTaken(Exception):
+	"""The idempotency key of a request is already used by a completed request."""
+
+
+# (service_name, key) -> IdempotencyRecord
+idempotency_cache: TTLCache[tuple[str, str], IdempotencyRecord] = TTLCache(
+	max_entries=settings.idempotency_cache_size
+)
+
+
+def request_digest(payload: BaseModel) -> str:
+	"""Process-stable digest of a request payload (unlike the builtin `hash`)."""
+	return hashlib.sha256(payload.model_dump_json().encode()).hexdigest()
+
+
+def build_idempotency_record(
+	payload: BaseModel, response: BaseModel, now: datetime | None = None
+) -> IdempotencyRecord:
+	"""Build the record to store once `payload` has been applied successfully."""
+	now = now or datetime.now(UTC)
+	return IdempotencyRecord(
+		request_hash=request_digest(payload),
+		response_body=response.model_dump_json().encode(),
+		expires_at=now + IDEMPOTENCY_TTL,
+	)
+
+
+def record_from_row(row: IdempotencyKey) -> IdempotencyRecord:
+	"""Convert an IdempotencyKey row in an IdempotencyRecord."""
+	body = row.response_body
+	expires_at = row.expires_at
+	if expires_at is not None and expires_at.tzinfo is None:
+		expires_at = expires_at.replace(tzinfo=UTC)
+	return IdempotencyRecord(
+		request_hash=row.request_hash,
+		# Legacy rows hold `hash()` values instead of the JSON body
+		response_body=body.encode() if body and body.startswith("{") else None,
+		expires_at=expires_at or datetime.now(UTC),
+	)
+
+
+def remember_idempotency(service_name: str, key: str, record: IdempotencyRecord) -> None:
+	"""Put a record in the in-memory cache until it expires."""
+	if record.response_body is None:
+		return
+	idempotency_cache.set(
+		(service_name, key), record, expires_at=record.expires_at.timestamp()
+	)
+
+
+async def delete_expired_idempotency(
+	db: AsyncSession, batch_size: int, now: datetime | None = None
+) -> int:
+	"""Delete one chunk of expired idempotency keys and commit.
+	Rows without `expires_at` (claims that never completed) are deleted once they
+	are older than the retention window.
+	Params:
+		batch_size (int): Max number of rows deleted
+		db (AsyncSession)
+
+	Return:
+		int: Number of rows deleted"""
+	now = now or datetime.now(UTC)
+	expired_ids = (
+		select(IdempotencyKey.id)
+		.where(
+			or_(
+				IdempotencyKey.expires_at <= now,
+				and_(
+					IdempotencyKey.expires_at.is_(None),
+					IdempotencyKey.created_at <= now - IDEMPOTENCY_TTL,
+				),
+			)
+		)
+		.limit(batch_size)
+		.scalar_subquery()
+	)
+	result = await db.execute(
+		delete(IdempotencyKey).where(IdempotencyKey.id.in_(expired_ids))
+	)
+	await db.commit()
+	return result.rowcount
+
+
+async def sweep_idempotency_keys(
+	batch_size: int = settings.idempotency_sweep_batch_size,
+	pause: float = settings.idempotency_sweep_pause,
+) -> int:
+	"""Delete every expired idempotency key in short transactions.
+
+	Each chunk is its own transaction and the sweep sleeps `pause` seconds between
+	chunks, so the SQLite writer lock is never held for long.
+	Returns the number of rows deleted."""
+	start = time.perf_counter()
+	swept = 0
+	while True:
+		async with session() as db:
+			deleted = await delete_expired_idempotency(db=db, batch_size=batch_size)
+		swept += deleted
+		idempotency_keys_swept_total.inc(deleted)
+		if deleted < batch_size:
+			break
+		await asyncio.sleep(pause)
+	idempotency_sweep_duration_seconds.set(time.perf_counter() - start)
+	logger.info(f"Idempotency sweep removed {swept} expired keys")
+	return swept
+
+
+async def run_idempotency_sweeper(
+	interval: float = settings.idempotency_sweep_interval,
+) -> None:
+	"""Sweep expired idempotency keys forever, every `interval` seconds."""
+	while True:
+		try:
+			await sweep_idempotency_keys()
+		except asyncio.CancelledError:
+			raise
+		except Exception:
+			logger.exception("Idempotency sweep failed")
+		await asyncio.sleep(interval)
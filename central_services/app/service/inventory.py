@@ -1,25 +1,71 @@
-from datetime import UTC, datetime, timedelta
+import asyncio
+from collections.abc import AsyncIterator, Iterable, Sequence
+from dataclasses import dataclass
+from datetime import UTC, datetime
 import logging
-from typing import Any
+from typing import Any, Literal
 
 from fastapi import HTTPException
-from sqlalchemy import lambda_stmt, select, update
+from sqlalchemy import bindparam, delete, insert, lambda_stmt, or_, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from common.cache import TTLCache
 from common.schemas import (
 	ConflictError,
 	GetDataFromSku,
 	InventoryResponse,
 	UpdateInventory,
 )
-from models.models import IdempotencyKey, Inventory
+from core.config import get_settings
+from core.db import session
+from models.models import IdempotencyKey, Inventory, InventoryChange
 from observability import (
+	coalesced_batch_size,
+	coalesced_batches_total,
 	inventory_update_conflicts_total,
 	inventory_update_failures_total,
 )
+from service.idempotency import (
+	IDEMPOTENCY_TTL,
+	IdempotencyKeyTaken,
+	IdempotencyRecord,
+	build_idempotency_record,
+	idempotency_cache,
+	record_from_row,
+	remember_idempotency,
+	request_digest,
+)
 
 
 logger = logging.getLogger("central_service")
+settings = get_settings()
+
+AdjustmentStatus = Literal["applied", "replayed", "conflict", "insufficient"]
+
+
+@dataclass(slots=True)
+class AdjustmentRequest:
+	"""A single inventory adjustment to be applied by `apply_adjustments`."""
+
+	sku: str
+	payload: UpdateInventory
+	service_name: str
+	idempotency_key: str
+	# Skip the version check, see `apply_commutative_delta`
+	commutative: bool = False
+
+
+@dataclass(slots=True)
+class AdjustmentResult:
+	"""Outcome of an `AdjustmentRequest`, with central's state for the SKU."""
+
+	request: AdjustmentRequest
+	status: AdjustmentStatus
+	item: InventoryResponse
+	detail: str | None = None
+
+
 async def get_data_from_sku(sku: str, db: AsyncSession) -> GetDataFromSku:
 	"""Get data from sku. The data retrieve is the id, quantity and version of the Inventory
 	Params:
@@ -57,6 +103,7 @@ async def update_inventory(db: AsyncSession, sku: str, update_values: dict) -> N
 	stmt = update(Inventory).where(Inventory.sku == sku).values(**update_values)
 	await db.execute(stmt)
 	await db.commit()
+	inventory_read_cache.invalidate(sku)
 
 
 async def get_item_from_sku(
@@ -88,6 +135,32 @@ async def create_idempotency(db:AsyncSession, idempotency: IdempotencyKey):
 	db.add(idempotency)
 	await db.commit()
 
+
+async def find_idempotency_record(
+	db: AsyncSession, idempotency_key: str, service_name: str
+) -> IdempotencyRecord | None:
+	"""Get the stored outcome of an idempotency key, looking first in the
+	in-memory cache and then in the database.
+	Params:
+		idempotency_key (str): Key to search
+		service_name (str): Name of the services that is making the
+		requirement
+		db (AsyncSession)
+
+	Return:
+		IdempotencyRecord | None"""
+	record = idempotency_cache.get((service_name, idempotency_key))
+	if record is not None:
+		return record
+	row = await get_idempotency(
+		idempotency_key=idempotency_key, service_name=service_name, db=db
+	)
+	if row is None:
+		return None
+	record = record_from_row(row)
+	remember_idempotency(service_name, idempotency_key, record)
+	return record
+
 async def get_idempotency(
 	idempotency_key: str, service_name: str, db: AsyncSession
 ) -> IdempotencyKey | None:
@@ -112,10 +185,56 @@ async def get_idempotency(
 	return idem_key.scalar_one_or_none()
 
 
+async def claim_idempotency(
+	db: AsyncSession,
+	idempotency_key: str,
+	service_name: str,
+	request_hash: str,
+	now: datetime | None = None,
+) -> bool:
+	"""Atomically claim an idempotency key with an insert-if-absent.
+
+	Expired keys are taken over. The claim is not committed: it becomes visible
+	together with the rest of the transaction, and disappears on rollback so the
+	key can be retried. A concurrent request with the same key waits for this
+	transaction and then loses the claim.
+	Params:
+		idempotency_key (str): Key to claim
+		service_name (str): Name of the services that is making the
+		requirement
+		request_hash (str): Digest of the request
+		db (AsyncSession)
+
+	Return:
+		bool: True if the key was claimed, False if it is already in use"""
+	now = now or datetime.now(UTC)
+	values = {
+		"service_name": service_name,
+		"request_hash": request_hash,
+		"response_body": None,
+		"created_at": now,
+		"expires_at": now + IDEMPOTENCY_TTL,
+	}
+	stmt = (
+		sqlite_insert(IdempotencyKey)
+		.values(key=idempotency_key, **values)
+		.on_conflict_do_update(
+			index_elements=[IdempotencyKey.key],
+			set_=values,
+			where=or_(
+				IdempotencyKey.expires_at.is_(None), IdempotencyKey.expires_at <= now
+			),
+		)
+		.returning(IdempotencyKey.id)
+	)
+	result = await db.execute(stmt)
+	return result.scalar_one_or_none() is not None
+
+
 async def update_idempotency(
 	db: AsyncSession, idempotency_key: str, update_values: dict[str, Any]
 ):
-	"""Update the Idempotency table given a specific key
+	"""Update the Idempotency table given a specific key, without committing
 	Params:
 		idempotency_key (str): Identifier of the Idempotency table
 		update_values (dict): Dictionary with the values to update
@@ -129,20 +248,51 @@ async def update_idempotency(
 		.where(IdempotencyKey.key == idempotency_key)
 		.values(**update_values)
 	)
-	await db.commit()
 
 
 async def update_inventory_return(
-	db: AsyncSession, sku: str, version: int, update_values: dict
+	db: AsyncSession,
+	sku: str,
+	version: int,
+	update_values: dict,
+	delta: int | None = None,
+	service_name: str | None = None,
+	idempotency_key: str | None = None,
 ) -> Inventory:
+	"""Update the Inventory of a sku if it is still at `version` and return the
+	new row, without committing. When `delta` is given the adjustment is also
+	appended to the change log.
+	Params:
+		sku (str): Identifier of the Inventory
+		version (int): Version the row must have
+		update_values (dict): Dictionary with the values to update
+		delta (int | None): Quantity change to record in the change log
+		service_name (str | None): Service that made the change
+		idempotency_key (str | None): Key of the request that made the change
+		db (AsyncSession)
+
+	Return:
+		Inventory
+	"""
 	result = await db.execute(
 		update(Inventory)
 		.where(Inventory.sku == sku, Inventory.version == version)
 		.values(**update_values)
 		.returning(Inventory)
 	)
-	await db.commit()
-	return result.scalar_one()
+	updated = result.scalar_one()
+	if delta is not None:
+		db.add(
+			InventoryChange(
+				sku=sku,
+				delta=delta,
+				quantity=updated.quantity,
+				version=updated.version,
+				service_name=service_name,
+				idempotency_key=idempotency_key,
+			)
+		)
+	return updated
 
 
 async def adjust_inventory_services(
@@ -151,6 +301,75 @@ async def adjust_inventory_services(
 	sku: str,
 	service_name: str,
 	idempotency_key: str,
+	commutative: bool = False,
+) -> Inventory:
+	"""Apply an adjustment in a single transaction with a single commit.
+
+	The idempotency key is claimed first, then the inventory is updated (with
+	optimistic locking, or with `apply_commutative_delta` when `commutative`) and
+	the response is stored in the claimed key. Any error rolls everything back,
+	the claim included.
+
+	Raises:
+		IdempotencyKeyTaken: The key is already used, the caller should replay it
+		HTTPException: 404, 409 on a version conflict, 400 if the quantity is not
+		enough
+	"""
+	now = datetime.now(UTC)
+	try:
+		claimed = await claim_idempotency(
+			db=db,
+			idempotency_key=idempotency_key,
+			service_name=service_name,
+			request_hash=request_digest(payload),
+			now=now,
+		)
+		if not claimed:
+			raise IdempotencyKeyTaken(idempotency_key)
+
+		if commutative:
+			updated = await apply_commutative_delta(
+				db=db,
+				payload=payload,
+				sku=sku,
+				service_name=service_name,
+				idempotency_key=idempotency_key,
+			)
+		else:
+			updated = await _apply_versioned(
+				db=db,
+				payload=payload,
+				sku=sku,
+				service_name=service_name,
+				idempotency_key=idempotency_key,
+			)
+
+		response = InventoryResponse.model_validate(updated)
+		record = build_idempotency_record(payload, response, now=now)
+		await update_idempotency(
+			db=db,
+			idempotency_key=idempotency_key,
+			update_values={
+				"response_body": record.response_body.decode(),
+				"expires_at": record.expires_at,
+			},
+		)
+		await db.commit()
+	except BaseException:
+		await db.rollback()
+		raise
+
+	remember_idempotency(service_name, idempotency_key, record)
+	inventory_read_cache.refresh(response)
+	return updated
+
+
+async def _apply_versioned(
+	db: AsyncSession,
+	payload: UpdateInventory,
+	sku: str,
+	service_name: str,
+	idempotency_key: str,
 ) -> Inventory:
 	# Get current item state
 	item = await get_item_from_sku(db=db, retrieve_for_update=True, sku=sku)
@@ -163,7 +382,7 @@ async def adjust_inventory_services(
 			detail=ConflictError(
 				message="Optimistic lock failed - item was updated",
 				current_state=InventoryResponse.model_validate(item),
-			).model_dump(),
+			).model_dump(mode="json"),
 		)
 
 	new_qty = item.quantity + payload.delta
@@ -184,21 +403,518 @@ async def adjust_inventory_services(
 			"version": payload.version + 1,
 			"updated_at": datetime.now(UTC),
 		},
+		delta=payload.delta,
+		service_name=service_name,
+		idempotency_key=idempotency_key,
 	)
 	logger.info(f"vesion: {updated.version}, qty: {updated.quantity}")
-	# Store idempotency key (upsert-like behavior)
-	await update_idempotency(
+	return updated
+
+
+async def apply_commutative_delta(
+	db: AsyncSession,
+	payload: UpdateInventory,
+	sku: str,
+	service_name: str,
+	idempotency_key: str,
+) -> Inventory:
+	"""Apply `payload.delta` without optimistic locking, without committing.
+
+	Deltas commute, so concurrent adjustments from different stores do not need
+	to agree on a version. The row is changed with one conditional UPDATE that
+	only checks the quantity does not go below zero, and the version is bumped.
+	Params:
+		payload (UpdateInventory): `version` is ignored
+		sku (str): Identifier of the Inventory
+		service_name (str): Service that made the change
+		idempotency_key (str): Key of the request
+		db (AsyncSession)
+
+	Return:
+		Inventory
+
+	Raises:
+		HTTPException: 404 if the sku does not exist, 400 if the quantity is not
+		enough
+	"""
+	result = await db.execute(
+		update(Inventory)
+		.where(Inventory.sku == sku, Inventory.quantity + payload.delta >= 0)
+		.values(
+			quantity=Inventory.quantity + payload.delta,
+			version=Inventory.version + 1,
+			updated_at=datetime.now(UTC),
+		)
+		.returning(Inventory)
+	)
+	updated = result.scalar_one_or_none()
+	if updated is None:
+		item = await get_item_from_sku(db=db, sku=sku)
+		inventory_update_failures_total.inc()
+		raise HTTPException(
+			status_code=400,
+			detail=f"Insufficient quantity. Available: {item.quantity}, requested: {abs(payload.delta)}",
+		)
+	db.add(
+		InventoryChange(
+			sku=sku,
+			delta=payload.delta,
+			quantity=updated.quantity,
+			version=updated.version,
+			service_name=service_name,
+			idempotency_key=idempotency_key,
+		)
+	)
+	return updated
+
+
+async def get_items_from_skus(db: AsyncSession, skus: Iterable[str]) -> dict[str, Inventory]:
+	"""Get every Inventory row of a set of skus with a single query
+	Params:
+		skus (Iterable[str]): Identifiers of the Inventory, duplicates are ignored
+		db (AsyncSession)
+
+	Return:
+		dict[str, Inventory]: Rows keyed by sku, unknown skus are absent
+	"""
+	unique_skus = list(dict.fromkeys(skus))
+	if not unique_skus:
+		return {}
+	result = await db.execute(select(Inventory).where(Inventory.sku.in_(unique_skus)))
+	return {item.sku: item for item in result.scalars()}
+
+
+async def iter_items_from_skus(
+	db: AsyncSession, skus: Iterable[str], chunk_size: int = 500
+) -> AsyncIterator[tuple[str, InventoryResponse | None]]:
+	"""Yield the state of many skus, querying them `chunk_size` at a time with
+	`WHERE sku IN (...)` so the SQLite parameter limit is never reached.
+	Params:
+		skus (Iterable[str]): Identifiers of the Inventory, duplicates are ignored
+		db (AsyncSession)
+		chunk_size (int): Skus per query
+
+	Return:
+		AsyncIterator[tuple[str, InventoryResponse | None]]: (sku, state) in the
+		order of `skus`, state is None for unknown skus
+	"""
+	unique_skus = list(dict.fromkeys(skus))
+	for start in range(0, len(unique_skus), chunk_size):
+		chunk = unique_skus[start : start + chunk_size]
+		items = await get_items_from_skus(db=db, skus=chunk)
+		for sku in chunk:
+			item = items.get(sku)
+			yield sku, InventoryResponse.model_validate(item) if item else None
+
+
+async def get_idempotency_many(
+	db: AsyncSession, idempotency_keys: Iterable[str]
+) -> dict[str, IdempotencyKey]:
+	"""Get the IdempotencyKey rows of a set of keys with a single query.
+	Expired rows are returned too, the caller decides if they are still valid.
+	Params:
+		idempotency_keys (Iterable[str]): Keys to search
+		db (AsyncSession)
+
+	Return:
+		dict[str, IdempotencyKey]: Rows keyed by key"""
+	unique_keys = list(dict.fromkeys(idempotency_keys))
+	if not unique_keys:
+		return {}
+	result = await db.execute(
+		select(IdempotencyKey).where(IdempotencyKey.key.in_(unique_keys))
+	)
+	return {row.key: row for row in result.scalars()}
+
+
+def _is_expired_idempotency(row: IdempotencyKey, now: datetime) -> bool:
+	"""Same rule as `claim_idempotency`: rows without expiry can be taken over."""
+	if row.expires_at is None:
+		return True
+	expires_at = row.expires_at
+	if expires_at.tzinfo is None:
+		expires_at = expires_at.replace(tzinfo=UTC)
+	return expires_at <= now
+
+
+def _is_live_idempotency(row: IdempotencyKey, service_name: str, now: datetime) -> bool:
+	return row.service_name == service_name and not _is_expired_idempotency(row, now)
+
+
+async def apply_adjustments(
+	db: AsyncSession, requests: Sequence[AdjustmentRequest]
+) -> list[AdjustmentResult]:
+	"""Apply a batch of adjustments with set-based reads and writes in one commit.
+
+	All the skus are loaded with one query and all the idempotency keys are
+	checked with another one. The adjustments are evaluated in order against the
+	in-memory state, so several requests for the same sku behave as if they were
+	sent one after the other. The result is written with one bulk UPDATE, one
+	bulk idempotency insert and a single commit.
+	Params:
+		requests (Sequence[AdjustmentRequest]): Adjustments in the order to apply
+		db (AsyncSession)
+
+	Return:
+		list[AdjustmentResult]: One result per request, in the same order
+
+	Raises:
+		HTTPException: 404 if a sku does not exist, 409 if another writer changed
+		one of the rows while the batch was being applied
+	"""
+	if not requests:
+		return []
+	now = datetime.now(UTC)
+	items = await get_items_from_skus(db=db, skus=(r.sku for r in requests))
+	missing = next((r.sku for r in requests if r.sku not in items), None)
+	if missing is not None:
+		raise HTTPException(status_code=404, detail=f"SKU not found: {missing}")
+	# Replays are answered from the cache, only the other keys hit the database
+	records: dict[str, IdempotencyRecord] = {}
+	for request in requests:
+		cached = idempotency_cache.get((request.service_name, request.idempotency_key))
+		if cached is not None:
+			records[request.idempotency_key] = cached
+	existing = await get_idempotency_many(
 		db=db,
-		idempotency_key=idempotency_key,
-		update_values={
-			"service_name": service_name,
-			"request_hash": hash(payload.model_dump_json()),
-			"response_body": hash(
-				InventoryResponse.model_validate(updated).model_dump_json()
-			),
-			"expires_at": datetime.now(UTC) + timedelta(hours=24),
-		},
+		idempotency_keys=(
+			r.idempotency_key for r in requests if r.idempotency_key not in records
+		),
 	)
+	for request in requests:
+		row = existing.get(request.idempotency_key)
+		if row is not None and _is_live_idempotency(row, request.service_name, now):
+			records[request.idempotency_key] = record_from_row(row)
+
+	# sku -> current state while walking the batch
+	state = {
+		sku: InventoryResponse.model_validate(item) for sku, item in items.items()
+	}
+	seen_keys: set[str] = set()
+	results: list[AdjustmentResult] = []
+	for request in requests:
+		current = state[request.sku]
+		record = records.get(request.idempotency_key)
+		if record is not None and record.response_body is not None:
+			original = InventoryResponse.model_validate_json(record.response_body)
+			results.append(AdjustmentResult(request, "replayed", original))
+			continue
+		if record is not None or request.idempotency_key in seen_keys:
+			results.append(AdjustmentResult(request, "replayed", current))
+			continue
+		row = existing.get(request.idempotency_key)
+		if row is not None and not _is_expired_idempotency(row, now):
+			# Live key of another service: never taken over
+			inventory_update_conflicts_total.inc()
+			results.append(
+				AdjustmentResult(
+					request,
+					"conflict",
+					current,
+					"Idempotency key already used by another service",
+				)
+			)
+			continue
+
+		if not request.commutative and current.version != request.payload.version:
+			inventory_update_conflicts_total.inc()
+			results.append(
+				AdjustmentResult(
+					request,
+					"conflict",
+					current,
+					"Optimistic lock failed - item was updated",
+				)
+			)
+			continue
+
+		new_qty = current.quantity + request.payload.delta
+		if new_qty < 0:
+			inventory_update_failures_total.inc()
+			results.append(
+				AdjustmentResult(
+					request,
+					"insufficient",
+					current,
+					f"Insufficient quantity. Available: {current.quantity}, requested: {abs(request.payload.delta)}",
+				)
+			)
+			continue
+
+		current = current.model_copy(
+			update={"quantity": new_qty, "version": current.version + 1, "updated_at": now}
+		)
+		state[request.sku] = current
+		seen_keys.add(request.idempotency_key)
+		results.append(AdjustmentResult(request, "applied", current))
+
+	applied = [r for r in results if r.status == "applied"]
+	if not applied:
+		return results
 
+	inventory_table = Inventory.__table__
+	rows = [
+		{
+			"_id": items[sku].id,
+			"_version": items[sku].version,
+			"_quantity": final.quantity,
+			"_new_version": final.version,
+			"_updated_at": now,
+		}
+		for sku, final in state.items()
+		if final.version != items[sku].version
+	]
+	updated = await db.execute(
+		update(inventory_table)
+		.where(
+			inventory_table.c.id == bindparam("_id"),
+			inventory_table.c.version == bindparam("_version"),
+		)
+		.values(
+			quantity=bindparam("_quantity"),
+			version=bindparam("_new_version"),
+			updated_at=bindparam("_updated_at"),
+		),
+		rows,
+	)
+	if updated.rowcount >= 0 and updated.rowcount != len(rows):
+		await db.rollback()
+		inventory_update_conflicts_total.inc()
+		raise HTTPException(
+			status_code=409, detail="Inventory changed while applying the batch, retry"
+		)
+
+	# Keys left over from expired records would break the unique index. The
+	# expiry is checked again so a key that became live since is kept
+	stale_keys = [
+		r.request.idempotency_key for r in applied if r.request.idempotency_key in existing
+	]
+	if stale_keys:
+		await db.execute(
+			delete(IdempotencyKey).where(
+				IdempotencyKey.key.in_(stale_keys),
+				or_(IdempotencyKey.expires_at.is_(None), IdempotencyKey.expires_at <= now),
+			)
+		)
+	new_records = {
+		r.request.idempotency_key: build_idempotency_record(r.request.payload, r.item, now=now)
+		for r in applied
+	}
+	await db.execute(
+		insert(IdempotencyKey),
+		[
+			{
+				"key": r.request.idempotency_key,
+				"service_name": r.request.service_name,
+				"request_hash": new_records[r.request.idempotency_key].request_hash,
+				"response_body": new_records[r.request.idempotency_key].response_body.decode(),
+				"created_at": now,
+				"expires_at": new_records[r.request.idempotency_key].expires_at,
+			}
+			for r in applied
+		],
+	)
+	await db.execute(
+		insert(InventoryChange),
+		[
+			{
+				"sku": r.request.sku,
+				"delta": r.request.payload.delta,
+				"quantity": r.item.quantity,
+				"version": r.item.version,
+				"service_name": r.request.service_name,
+				"idempotency_key": r.request.idempotency_key,
+				"created_at": now,
+			}
+			for r in applied
+		],
+	)
 	await db.commit()
-	return updated
+	for sku, final in state.items():
+		if final.version != items[sku].version:
+			inventory_read_cache.refresh(final)
+	for r in applied:
+		remember_idempotency(
+			r.request.service_name,
+			r.request.idempotency_key,
+			new_records[r.request.idempotency_key],
+		)
+	return results
+
+
+async def get_changes_since(
+	db: AsyncSession, since: int, limit: int
+) -> Sequence[InventoryChange]:
+	"""Get the changes recorded after the sequence `since`, oldest first
+	Params:
+		since (int): Last sequence already seen by the caller
+		limit (int): Max number of changes
+		db (AsyncSession)
+
+	Return:
+		Sequence[InventoryChange]
+	"""
+	result = await db.execute(
+		select(InventoryChange)
+		.where(InventoryChange.id > since)
+		.order_by(InventoryChange.id)
+		.limit(limit)
+	)
+	return result.scalars().all()
+
+
+class SkuWriteCoalescer:
+	"""Group concurrent adjustments of the same sku into a single transaction.
+
+	The first adjustment of a sku opens a window of `window` seconds; everything
+	submitted for that sku meanwhile (up to `max_batch` adjustments) is applied in
+	arrival order by `apply_adjustments`, with one UPDATE and one commit. Each
+	caller still gets its own AdjustmentResult. Batches of the same sku never run
+	at the same time, so they cannot invalidate each other's versions.
+	"""
+
+	def __init__(self, window: float, max_batch: int) -> None:
+		self.window = window
+		self.max_batch = max_batch
+		self._pending: dict[str, list[tuple[AdjustmentRequest, asyncio.Future]]] = {}
+		self._timers: dict[str, asyncio.TimerHandle] = {}
+		self._locks: dict[str, asyncio.Lock] = {}
+		# Batches holding or waiting for the lock of a sku
+		self._users: dict[str, int] = {}
+		self._tasks: set[asyncio.Task] = set()
+
+	async def submit(self, request: AdjustmentRequest) -> AdjustmentResult:
+		"""Queue an adjustment and wait for the batch that contains it."""
+		loop = asyncio.get_running_loop()
+		future: asyncio.Future[AdjustmentResult] = loop.create_future()
+		batch = self._pending.setdefault(request.sku, [])
+		batch.append((request, future))
+		if len(batch) >= self.max_batch:
+			self._flush(request.sku)
+		elif len(batch) == 1:
+			self._timers[request.sku] = loop.call_later(
+				self.window, self._flush, request.sku
+			)
+		return await future
+
+	def _flush(self, sku: str) -> None:
+		timer = self._timers.pop(sku, None)
+		if timer is not None:
+			timer.cancel()
+		batch = self._pending.pop(sku, None)
+		if not batch:
+			return
+		task = asyncio.create_task(self._apply(sku, batch))
+		self._tasks.add(task)
+		task.add_done_callback(self._tasks.discard)
+
+	async def _apply(
+		self, sku: str, batch: list[tuple[AdjustmentRequest, asyncio.Future]]
+	) -> None:
+		lock = self._locks.setdefault(sku, asyncio.Lock())
+		self._users[sku] = self._users.get(sku, 0) + 1
+		try:
+			async with lock:
+				coalesced_batches_total.inc()
+				coalesced_batch_size.set(len(batch))
+				async with session() as db:
+					results = await apply_adjustments(
+						db=db, requests=[request for request, _ in batch]
+					)
+		except Exception as err:
+			for _, future in batch:
+				if not future.done():
+					future.set_exception(err)
+			return
+		finally:
+			self._users[sku] -= 1
+			if not self._users[sku]:
+				del self._users[sku]
+				del self._locks[sku]
+		for (_, future), result in zip(batch, results, strict=True):
+			if not future.done():
+				future.set_result(result)
+
+
+sku_write_coalescer = SkuWriteCoalescer(
+	window=settings.adjust_coalesce_window_ms / 1000,
+	max_batch=settings.adjust_coalesce_max_batch,
+)
+
+
+class InventoryReadCache:
+	"""Versioned read-through cache of the inventory state by sku.
+
+	Concurrent misses for the same sku share a single query. Writes refresh the
+	entry with the state they committed, and an entry is only replaced by one
+	with the same or a newer version, so a slow read never overwrites a newer
+	write. Entries expire after `ttl_seconds` to pick up writes made by other
+	processes.
+	"""
+
+	def __init__(self, max_entries: int, ttl_seconds: float) -> None:
+		self._cache: TTLCache[str, InventoryResponse] = TTLCache(
+			max_entries=max_entries, ttl_seconds=ttl_seconds
+		)
+		self._inflight: dict[str, asyncio.Future[InventoryResponse]] = {}
+
+	async def get(self, db: AsyncSession, sku: str) -> InventoryResponse:
+		"""Return the state of a sku, querying the database only on a miss.
+
+		Raises:
+			HTTPException: 404 if the sku does not exist
+		"""
+		cached = self._cache.get(sku)
+		if cached is not None:
+			return cached
+		inflight = self._inflight.get(sku)
+		if inflight is not None:
+			try:
+				return await asyncio.shield(inflight)
+			except asyncio.CancelledError:
+				current = asyncio.current_task()
+				if not inflight.cancelled() or (current and current.cancelling()):
+					raise
+			# The request running the query was cancelled: query it ourselves
+			return await self.get(db=db, sku=sku)
+
+		future: asyncio.Future[InventoryResponse] = (
+			asyncio.get_running_loop().create_future()
+		)
+		self._inflight[sku] = future
+		try:
+			item = InventoryResponse.model_validate(
+				await get_item_from_sku(db=db, sku=sku)
+			)
+		except Exception as err:
+			future.set_exception(err)
+			# Avoid "exception was never retrieved" when nobody else was waiting
+			future.exception()
+			raise
+		except BaseException:
+			# Cancelled (e.g. the client went away): release the waiters
+			future.cancel()
+			raise
+		finally:
+			self._inflight.pop(sku, None)
+		self.refresh(item)
+		future.set_result(item)
+		return item
+
+	def refresh(self, item: InventoryResponse) -> None:
+		"""Store a committed state unless a newer version is already cached."""
+		cached = self._cache.get(item.sku)
+		if cached is None or cached.version <= item.version:
+			self._cache.set(item.sku, item)
+
+	def invalidate(self, sku: str) -> None:
+		self._cache.pop(sku)
+
+	def clear(self) -> None:
+		self._cache.clear()
+
+
+inventory_read_cache = InventoryReadCache(
+	max_entries=settings.inventory_cache_size,
+	ttl_seconds=settings.inventory_cache_ttl,
+)
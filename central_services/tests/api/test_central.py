@@ -0,0 +1,103 @@
+import asyncio
+from datetime import UTC, datetime, timedelta
+from unittest.mock import patch
+
+import httpx
+import jwt
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+# The module objects the app uses: `app.auth...` would be other ones
+import auth.utils
+from main import app
+from models.models import Inventory, ModelBase, ServiceCredentials
+
+
+@pytest.fixture
+async def central_db(tmp_path):
+	"""A file database behind a pool of 2 connections, with one service and one
+	sku, used by the requests and by the write coalescer."""
+	engine = create_async_engine(
+		f"sqlite+aiosqlite:///{tmp_path / 'central.db'}",
+		pool_size=2,
+		max_overflow=0,
+		pool_timeout=2,
+	)
+	async with engine.begin() as conn:
+		await conn.run_sync(ModelBase.metadata.create_all)
+	maker = async_sessionmaker(bind=engine, expire_on_commit=False)
+	async with maker() as db:
+		db.add_all([
+			ServiceCredentials(service_name="store-1", service_secret="x", role="store"),
+			Inventory(sku="abc", name="abc", quantity=100, version=1),
+		])
+		await db.commit()
+
+	async def get_db():
+		async with maker() as db:
+			yield db
+
+	app.dependency_overrides[auth.utils.get_db] = get_db
+	auth.utils.invalidate_service_credentials()
+	with patch("service.inventory.session", maker):
+		yield maker
+	app.dependency_overrides.clear()
+	auth.utils.invalidate_service_credentials()
+	await engine.dispose()
+
+
+def _token() -> str:
+	payload = {
+		"iss": "store-1",
+		"sub": "store-1",
+		"role": "store",
+		"exp": datetime.now(UTC) + timedelta(minutes=5),
+		"aud": "central-service",
+	}
+	return jwt.encode(payload, auth.utils.settings.jwt_secrets, algorithm="HS256")
+
+
+def _client() -> httpx.AsyncClient:
+	return httpx.AsyncClient(
+		transport=httpx.ASGITransport(app=app, raise_app_exceptions=False),
+		base_url="http://central",
+		headers={"Authorization": f"Bearer {_token()}"},
+	)
+
+
+async def _adjust(client: httpx.AsyncClient, key: str, **payload) -> httpx.Response:
+	return await client.post(
+		"/v1/inventory/abc/adjust",
+		json={"sku": "abc", "delta": -1, "version": 1, "operation_id": key, **payload},
+		headers={"Idempotency-Key": key},
+	)
+
+
+@pytest.mark.asyncio
+@patch("api.central.settings.adjust_coalescing", True)
+async def test_adjust_coalesced_burst_with_cold_auth_cache(central_db):
+	"""Every request checks out a connection for the auth lookup; the coalesced
+	batch needs one more, so the burst must not wait on the pool."""
+	async with _client() as client:
+		responses = await asyncio.wait_for(
+			asyncio.gather(*(_adjust(client, f"op-{i}", mode="delta") for i in range(10))),
+			timeout=10,
+		)
+
+	assert [r.status_code for r in responses] == [200] * 10
+	assert max(r.json()["version"] for r in responses) == 11
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("coalescing", [True, False])
+async def test_adjust_conflict_is_json(central_db, coalescing):
+	"""The 409 body the store rebases on (store_services conflict_version)."""
+	with patch("api.central.settings.adjust_coalescing", coalescing):
+		async with _client() as client:
+			response = await _adjust(client, "op-1", version=7)
+
+	assert response.status_code == 409
+	detail = response.json()["detail"]
+	assert detail["error"] == "CONFLICT"
+	assert detail["current_state"]["version"] == 1
+	assert isinstance(detail["current_state"]["updated_at"], str)
@@ -1,5 +1,6 @@
 from datetime import UTC, datetime, timedelta
 import os
+import time
 from unittest.mock import patch, AsyncMock, Mock
 
 from fastapi import HTTPException, Header, status
@@ -8,7 +9,11 @@ import jwt
 import pytest
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.auth.utils import create_access_token, verify_service_jwt
+from app.auth.utils import (
+    create_access_token,
+    invalidate_service_credentials,
+    verify_service_jwt,
+)
 from app.models.models import ServiceCredentials
 from pydantic import BaseModel
 
@@ -80,3 +85,58 @@ async def test_verify_service_jwt_invalid_signature():
         await verify_service_jwt(db=db, token=token)
     assert exc.value.status_code == 401
 
+
+
+@pytest.mark.asyncio
+async def test_verify_service_jwt_cached():
+    from app.auth.utils import settings
+
+    expire = datetime.now(UTC) + timedelta(hours=1)
+    payload = {"iss": "dummy", "sub": "sub", "role": "store", "exp": expire, "aud": "central-service"}
+    token = HTTPAuthorizationCredentials(
+        credentials=jwt.encode(payload, settings.jwt_secrets, algorithm=settings.jwt_algorithm),
+        scheme="Bearer",
+    )
+    service = ServiceCredentials(id=1, service_name="dummy", service_secret="x", role="store")
+    mock_result = Mock()
+    mock_result.scalar_one_or_none.return_value = service
+    db = AsyncMock(spec=AsyncSession)
+    db.execute.return_value = mock_result
+
+    first = await verify_service_jwt(db=db, token=token)
+    with patch("app.auth.utils.jwt.decode") as mock_decode:
+        second = await verify_service_jwt(db=db, token=token)
+        mock_decode.assert_not_called()
+    assert first == second
+    assert db.execute.await_count == 1
+
+    invalidate_service_credentials("dummy")
+    await verify_service_jwt(db=db, token=token)
+    assert db.execute.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_verify_service_jwt_revocation_delay():
+    from app.auth.utils import settings
+
+    expire = datetime.now(UTC) + timedelta(hours=1)
+    payload = {"iss": "dummy", "sub": "sub", "role": "store", "exp": expire, "aud": "central-service"}
+    token = HTTPAuthorizationCredentials(
+        credentials=jwt.encode(payload, settings.jwt_secrets, algorithm=settings.jwt_algorithm),
+        scheme="Bearer",
+    )
+    service = ServiceCredentials(id=1, service_name="dummy", service_secret="x", role="store")
+    mock_result = Mock()
+    mock_result.scalar_one_or_none.return_value = service
+    db = AsyncMock(spec=AsyncSession)
+    db.execute.return_value = mock_result
+    await verify_service_jwt(db=db, token=token)
+
+    # Revoked outside the ORM (bulk delete, other process): no listener fires
+    mock_result.scalar_one_or_none.return_value = None
+    later = time.time() + settings.credentials_cache_ttl + 1
+    with patch("common.cache.time.time", return_value=later):
+        with pytest.raises(HTTPException) as exc:
+            await verify_service_jwt(db=db, token=token)
+    # Seen once the credentials TTL is over, before the token expires
+    assert exc.value.status_code == 401
@@ -0,0 +1,35 @@
+import time
+
+from app.common.cache import TTLCache
+
+
+def test_ttl_cache_lru_eviction():
+	cache = TTLCache[str, int](max_entries=2)
+	cache.set("a", 1)
+	cache.set("b", 2)
+	assert cache.get("a") == 1
+	cache.set("c", 3)
+	assert cache.get("b") is None
+	assert cache.get("a") == 1
+	assert cache.get("c") == 3
+	assert len(cache) == 2
+
+
+def test_ttl_cache_expiration():
+	cache = TTLCache[str, int](max_entries=10, ttl_seconds=60)
+	cache.set("a", 1)
+	cache.set("b", 2, expires_at=time.time() - 1)
+	assert cache.get("a") == 1
+	assert cache.get("b") is None
+	assert len(cache) == 1
+
+
+def test_ttl_cache_discard_where():
+	cache = TTLCache[tuple[str, str], int](max_entries=10)
+	cache.set(("svc-a", "1"), 1)
+	cache.set(("svc-a", "2"), 2)
+	cache.set(("svc-b", "1"), 3)
+	assert cache.discard_where(lambda key, _: key[0] == "svc-a") == 2
+	assert cache.get(("svc-b", "1")) == 3
+	assert cache.pop(("svc-b", "1")) == 3
+	assert len(cache) == 0
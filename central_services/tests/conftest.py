@@ -19,3 +19,30 @@ def db_with():
 	db_cm.__aexit__.return_value = None
 
 	return db_cm, session_mock
+
+
+@pytest.fixture(autouse=True)
+def clear_idempotency_cache():
+	from service.idempotency import idempotency_cache
+
+	idempotency_cache.clear()
+	yield
+	idempotency_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_auth_cache():
+	from app.auth.utils import invalidate_service_credentials
+
+	invalidate_service_credentials()
+	yield
+	invalidate_service_credentials()
+
+
+@pytest.fixture(autouse=True)
+def clear_inventory_read_cache():
+	from service.inventory import inventory_read_cache
+
+	inventory_read_cache.clear()
+	yield
+	inventory_read_cache.clear()
@@ -0,0 +1,76 @@
+from datetime import UTC, datetime
+from unittest.mock import Mock, patch
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.common.schemas import InventoryResponse, UpdateInventory
+from app.models.models import IdempotencyKey
+from app.service.idempotency import (
+	build_idempotency_record,
+	delete_expired_idempotency,
+	record_from_row,
+	request_digest,
+	sweep_idempotency_keys,
+)
+
+
+def test_request_digest_is_stable():
+	payload = UpdateInventory(sku="abc", delta=-1, version=1, operation_id="op-1")
+	same = UpdateInventory(sku="abc", delta=-1, version=1, operation_id="op-1")
+	other = UpdateInventory(sku="abc", delta=-2, version=1, operation_id="op-1")
+	assert request_digest(payload) == request_digest(same)
+	assert request_digest(payload) != request_digest(other)
+	assert len(request_digest(payload)) == 64
+
+
+def test_build_idempotency_record_roundtrip():
+	now = datetime.now(UTC)
+	payload = UpdateInventory(sku="abc", delta=-1, version=1, operation_id="op-1")
+	response = InventoryResponse(
+		sku="abc", name="dummy", quantity=1, version=2, updated_at=now
+	)
+	record = build_idempotency_record(payload, response, now=now)
+	row = IdempotencyKey(
+		key="op-1",
+		service_name="dummy",
+		request_hash=record.request_hash,
+		response_body=record.response_body.decode(),
+		expires_at=record.expires_at.replace(tzinfo=None),
+	)
+	restored = record_from_row(row)
+	assert restored.request_hash == request_digest(payload)
+	assert InventoryResponse.model_validate_json(restored.response_body) == response
+	assert restored.expires_at == record.expires_at
+
+
+def test_record_from_legacy_row():
+	row = IdempotencyKey(
+		key="op-1", service_name="dummy", request_hash="123", response_body="-456"
+	)
+	assert record_from_row(row).response_body is None
+
+
+@pytest.mark.asyncio
+async def test_delete_expired_idempotency(db: AsyncSession):
+	db.execute.return_value = Mock(rowcount=3)
+	deleted = await delete_expired_idempotency(db=db, batch_size=10)
+	assert deleted == 3
+	db.commit.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_sweep_idempotency_keys_in_chunks(db_with):
+	db_cm, session_mock = db_with
+	with (
+		patch("app.service.idempotency.session", return_value=db_cm),
+		patch(
+			"app.service.idempotency.delete_expired_idempotency", side_effect=[2, 1]
+		) as mock_delete,
+	):
+		swept = await sweep_idempotency_keys(batch_size=2, pause=0)
+
+	assert swept == 3
+	assert mock_delete.await_count == 2
+	# Only the chunked deletes: the table is never counted
+	session_mock.execute.assert_not_called()
@@ -1,3 +1,4 @@
+import asyncio
 from collections import namedtuple
 from datetime import UTC, datetime, timedelta
 from re import A
@@ -11,18 +12,38 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.common.schemas import InventoryResponse, UpdateInventory
 from app.models.models import IdempotencyKey, Inventory
 from app.service.inventory import (
+	AdjustmentRequest,
+	AdjustmentResult,
+	InventoryReadCache,
+	SkuWriteCoalescer,
 	adjust_inventory_services,
+	apply_adjustments,
+	apply_commutative_delta,
+	claim_idempotency,
+	get_changes_since,
 	get_data_from_sku,
 	get_idempotency,
 	get_item_from_sku,
+	iter_items_from_skus,
 	update_idempotency,
 	update_inventory,
 	update_inventory_return,
 )
 
+# Imported like app/service/inventory.py does, `app.service.idempotency` is
+# another module object with its own exception class
+from service.idempotency import IdempotencyKeyTaken
+
 fake_row = namedtuple("Row", ["id", "quantity", "version"])
 
 
+def _claimed_result() -> Mock:
+	"""Result of the INSERT that claims an idempotency key"""
+	result = Mock()
+	result.scalar_one_or_none.return_value = 1
+	return result
+
+
 @pytest.mark.asyncio
 @pytest.mark.parametrize("item", [None, fake_row(id=1, version=1, quantity=1)])
 async def test_get_data_from_sku(db: AsyncSession, item: None | Row):
@@ -125,7 +146,7 @@ async def test_update_idempotency(db: AsyncSession):
 async def test_update_inventory_return(db: AsyncSession):
 	mock_result = Mock()
 	mock_result.scalar_one.return_value = Inventory(
-		id=1, sku="abc", name="dummy", quantity=2, version=2
+		id=1, sku="abc", name="dummy", quantity=2, version=2, updated_at=datetime.now(UTC)
 	)
 	db.execute.return_value = mock_result
 	update_values = {"quantity": 2, "version": 2}
@@ -149,6 +170,7 @@ async def test_update_inventory_return(db: AsyncSession):
 	),
 )
 async def test_adjust_inventory_services_wrong_version(db: AsyncSession):
+	db.execute.return_value = _claimed_result()
 	with pytest.raises(HTTPException) as err:
 		await adjust_inventory_services(
 			db=db,
@@ -175,6 +197,7 @@ async def test_adjust_inventory_services_wrong_version(db: AsyncSession):
 	),
 )
 async def test_adjust_inventory_services_less_stock(db: AsyncSession):
+	db.execute.return_value = _claimed_result()
 	with pytest.raises(HTTPException) as err:
 		await adjust_inventory_services(
 			db=db,
@@ -214,6 +237,7 @@ async def test_adjust_inventory_services_less_stock(db: AsyncSession):
 )
 @patch("app.service.inventory.update_idempotency",return_value= None)
 async def test_adjust_inventory_services( get_item_mock, update_inventory_mock, update_idempotency_mock, db: AsyncSession):
+	db.execute.return_value = _claimed_result()
 	item = await adjust_inventory_services(
 		db=db,
 		payload=UpdateInventory(sku="abc", delta=-1, version=2, operation_id="abcd"),
@@ -223,3 +247,346 @@ async def test_adjust_inventory_services( get_item_mock, update_inventory_mock,
 	)
 	assert item.version == 3
 	assert item.quantity == 0
+	db.commit.assert_awaited_once()
+
+
+def _bulk_requests(*items: tuple[str, int, int, str]) -> list[AdjustmentRequest]:
+	return [
+		AdjustmentRequest(
+			sku=sku,
+			payload=UpdateInventory(
+				sku=sku, delta=delta, version=version, operation_id=operation_id
+			),
+			service_name="dummy-service",
+			idempotency_key=f"bulk-{operation_id}",
+		)
+		for sku, delta, version, operation_id in items
+	]
+
+
+def _scalars_result(rows: list) -> Mock:
+	result = Mock()
+	result.scalars.return_value = rows
+	return result
+
+
+@pytest.mark.asyncio
+async def test_apply_adjustments_in_order(db: AsyncSession):
+	inventory = Inventory(
+		id=1, sku="abc", name="dummy", quantity=2, version=1, updated_at=datetime.now(UTC)
+	)
+	update_result = Mock(rowcount=1)
+	db.execute.side_effect = [
+		_scalars_result([inventory]),
+		_scalars_result([]),
+		update_result,
+		Mock(),
+		Mock(),
+	]
+	results = await apply_adjustments(
+		db=db,
+		requests=_bulk_requests(
+			("abc", -1, 1, "op-1"),
+			("abc", -1, 1, "op-2"),
+			("abc", -5, 2, "op-3"),
+			("abc", -1, 2, "op-4"),
+		),
+	)
+	assert [r.status for r in results] == ["applied", "conflict", "insufficient", "applied"]
+	assert results[1].item.version == 2
+	assert results[-1].item.quantity == 0
+	assert results[-1].item.version == 3
+	# items, idempotency, bulk update, idempotency insert, change log insert
+	assert db.execute.call_count == 5
+	changes = db.execute.await_args_list[4].args[1]
+	assert [c["version"] for c in changes] == [2, 3]
+	db.commit.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_apply_adjustments_replay(db: AsyncSession):
+	inventory = Inventory(
+		id=1, sku="abc", name="dummy", quantity=2, version=2, updated_at=datetime.now(UTC)
+	)
+	record = IdempotencyKey(
+		id=1,
+		key="bulk-op-1",
+		service_name="dummy-service",
+		expires_at=datetime.now(UTC) + timedelta(hours=1),
+	)
+	db.execute.side_effect = [_scalars_result([inventory]), _scalars_result([record])]
+	results = await apply_adjustments(
+		db=db, requests=_bulk_requests(("abc", -1, 1, "op-1"))
+	)
+	assert results[0].status == "replayed"
+	assert results[0].item.version == 2
+	db.commit.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_apply_adjustments_foreign_key_conflict(db: AsyncSession):
+	inventory = Inventory(
+		id=1, sku="abc", name="dummy", quantity=2, version=1, updated_at=datetime.now(UTC)
+	)
+	record = IdempotencyKey(
+		id=1,
+		key="bulk-op-1",
+		service_name="other-service",
+		expires_at=datetime.now(UTC) + timedelta(hours=1),
+	)
+	db.execute.side_effect = [_scalars_result([inventory]), _scalars_result([record])]
+	results = await apply_adjustments(
+		db=db, requests=_bulk_requests(("abc", -1, 1, "op-1"))
+	)
+	# The live key of another service is neither replayed nor deleted
+	assert results[0].status == "conflict"
+	assert db.execute.call_count == 2
+	db.commit.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_apply_adjustments_unknown_sku(db: AsyncSession):
+	db.execute.side_effect = [_scalars_result([])]
+	with pytest.raises(HTTPException) as err:
+		await apply_adjustments(db=db, requests=_bulk_requests(("abc", -1, 1, "op-1")))
+	assert err.value.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_sku_write_coalescer_groups_same_sku(db_with):
+	db_cm, session_mock = db_with
+	coalescer = SkuWriteCoalescer(window=0.01, max_batch=10)
+	requests = _bulk_requests(("abc", -1, 1, "op-1"), ("abc", -1, 2, "op-2"))
+	item = InventoryResponse(sku="abc", name="dummy", quantity=1, version=2)
+
+	async def fake_apply(db, requests):
+		return [AdjustmentResult(r, "applied", item) for r in requests]
+
+	with (
+		patch("app.service.inventory.session", return_value=db_cm),
+		patch(
+			"app.service.inventory.apply_adjustments", side_effect=fake_apply
+		) as mock_apply,
+	):
+		results = await asyncio.gather(*(coalescer.submit(r) for r in requests))
+	assert [r.request for r in results] == requests
+	mock_apply.assert_awaited_once()
+	assert mock_apply.await_args.kwargs["requests"] == requests
+
+
+@pytest.mark.asyncio
+async def test_sku_write_coalescer_propagates_errors(db_with):
+	db_cm, _ = db_with
+	coalescer = SkuWriteCoalescer(window=0.01, max_batch=1)
+	with (
+		patch("app.service.inventory.session", return_value=db_cm),
+		patch(
+			"app.service.inventory.apply_adjustments",
+			side_effect=HTTPException(status_code=404, detail="SKU not found: abc"),
+		),
+		pytest.raises(HTTPException) as err,
+	):
+		await coalescer.submit(_bulk_requests(("abc", -1, 1, "op-1"))[0])
+	assert err.value.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_inventory_read_cache_single_flight(db: AsyncSession):
+	cache = InventoryReadCache(max_entries=10, ttl_seconds=60)
+	item = Inventory(
+		id=1, sku="abc", name="dummy", quantity=2, version=2, updated_at=datetime.now(UTC)
+	)
+
+	async def slow_read(db, sku):
+		await asyncio.sleep(0.01)
+		return item
+
+	with patch(
+		"app.service.inventory.get_item_from_sku", side_effect=slow_read
+	) as mock_read:
+		results = await asyncio.gather(*(cache.get(db=db, sku="abc") for _ in range(5)))
+		await cache.get(db=db, sku="abc")
+	assert mock_read.await_count == 1
+	assert all(r.version == 2 for r in results)
+
+
+@pytest.mark.asyncio
+async def test_inventory_read_cache_leader_cancelled(db: AsyncSession):
+	cache = InventoryReadCache(max_entries=10, ttl_seconds=60)
+	item = Inventory(
+		id=1, sku="abc", name="dummy", quantity=2, version=2, updated_at=datetime.now(UTC)
+	)
+	started = asyncio.Event()
+
+	async def slow_read(db, sku):
+		started.set()
+		await asyncio.sleep(0.05)
+		return item
+
+	with patch("app.service.inventory.get_item_from_sku", side_effect=slow_read):
+		leader = asyncio.create_task(cache.get(db=db, sku="abc"))
+		await started.wait()
+		waiter = asyncio.create_task(cache.get(db=db, sku="abc"))
+		await asyncio.sleep(0)
+		leader.cancel()
+		result = await asyncio.wait_for(waiter, timeout=1)
+
+	assert leader.cancelled()
+	assert result.version == 2
+	assert not cache._inflight
+
+
+@pytest.mark.asyncio
+async def test_inventory_read_cache_keeps_newest_version(db: AsyncSession):
+	cache = InventoryReadCache(max_entries=10, ttl_seconds=60)
+	newer = InventoryResponse(sku="abc", name="dummy", quantity=1, version=3)
+	older = InventoryResponse(sku="abc", name="dummy", quantity=2, version=2)
+	cache.refresh(newer)
+	cache.refresh(older)
+	assert (await cache.get(db=db, sku="abc")).version == 3
+	db.execute.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_iter_items_from_skus_chunks(db: AsyncSession):
+	now = datetime.now(UTC)
+	db.execute.side_effect = [
+		_scalars_result(
+			[Inventory(id=1, sku="a", name="a", quantity=1, version=1, updated_at=now)]
+		),
+		_scalars_result(
+			[Inventory(id=3, sku="c", name="c", quantity=3, version=1, updated_at=now)]
+		),
+	]
+	results = [
+		(sku, item)
+		async for sku, item in iter_items_from_skus(
+			db=db, skus=["a", "b", "a", "c"], chunk_size=2
+		)
+	]
+	assert [sku for sku, _ in results] == ["a", "b", "c"]
+	assert results[1][1] is None
+	assert results[2][1].quantity == 3
+	assert db.execute.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_update_inventory_return_records_change(db: AsyncSession):
+	mock_result = Mock()
+	mock_result.scalar_one.return_value = Inventory(
+		id=1, sku="abc", name="dummy", quantity=1, version=2, updated_at=datetime.now(UTC)
+	)
+	db.execute.return_value = mock_result
+	await update_inventory_return(
+		db=db,
+		sku="abc",
+		version=1,
+		update_values={"quantity": 1, "version": 2},
+		delta=-1,
+		service_name="dummy-service",
+	)
+	change = db.add.call_args.args[0]
+	assert (change.sku, change.delta, change.version) == ("abc", -1, 2)
+	db.commit.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_get_changes_since(db: AsyncSession):
+	mock_result = Mock()
+	mock_result.scalars.return_value.all.return_value = []
+	db.execute.return_value = mock_result
+	assert await get_changes_since(db=db, since=10, limit=5) == []
+
+
+@pytest.mark.asyncio
+async def test_apply_commutative_delta(db: AsyncSession):
+	mock_result = Mock()
+	mock_result.scalar_one_or_none.return_value = Inventory(
+		id=1, sku="abc", name="dummy", quantity=4, version=8, updated_at=datetime.now(UTC)
+	)
+	db.execute.return_value = mock_result
+	item = await apply_commutative_delta(
+		db=db,
+		payload=UpdateInventory(
+			sku="abc", delta=-1, version=1, operation_id="abcd", mode="delta"
+		),
+		sku="abc",
+		service_name="dummy-service",
+		idempotency_key="abc",
+	)
+	assert item.version == 8
+	# change log only, the caller stores idempotency and commits
+	assert db.add.call_count == 1
+	db.commit.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+@patch(
+	"app.service.inventory.get_item_from_sku",
+	return_value=Inventory(id=1, sku="abc", name="dummy", quantity=0, version=2),
+)
+async def test_apply_commutative_delta_less_stock(_, db: AsyncSession):
+	mock_result = Mock()
+	mock_result.scalar_one_or_none.return_value = None
+	db.execute.return_value = mock_result
+	with pytest.raises(HTTPException) as err:
+		await apply_commutative_delta(
+			db=db,
+			payload=UpdateInventory(
+				sku="abc", delta=-1, version=1, operation_id="abcd", mode="delta"
+			),
+			sku="abc",
+			service_name="dummy-service",
+			idempotency_key="abc",
+		)
+	assert err.value.status_code == 400
+	db.commit.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_apply_adjustments_commutative_ignores_version(db: AsyncSession):
+	inventory = Inventory(
+		id=1, sku="abc", name="dummy", quantity=2, version=5, updated_at=datetime.now(UTC)
+	)
+	db.execute.side_effect = [
+		_scalars_result([inventory]),
+		_scalars_result([]),
+		Mock(rowcount=1),
+		Mock(),
+		Mock(),
+	]
+	requests = _bulk_requests(("abc", -1, 1, "op-1"))
+	requests[0].commutative = True
+	results = await apply_adjustments(db=db, requests=requests)
+	assert results[0].status == "applied"
+	assert results[0].item.version == 6
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(("row_id", "claimed"), [(1, True), (None, False)])
+async def test_claim_idempotency(db: AsyncSession, row_id: int | None, claimed: bool):
+	mock_result = Mock()
+	mock_result.scalar_one_or_none.return_value = row_id
+	db.execute.return_value = mock_result
+	result = await claim_idempotency(
+		db=db, idempotency_key="abc", service_name="dummy", request_hash="x"
+	)
+	assert result is claimed
+	db.commit.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_adjust_inventory_services_key_taken(db: AsyncSession):
+	mock_result = Mock()
+	mock_result.scalar_one_or_none.return_value = None
+	db.execute.return_value = mock_result
+	with pytest.raises(IdempotencyKeyTaken):
+		await adjust_inventory_services(
+			db=db,
+			payload=UpdateInventory(sku="abc", delta=-1, version=2, operation_id="abcd"),
+			sku="abc",
+			service_name="dummy-service",
+			idempotency_key="abc",
+		)
+	db.rollback.assert_awaited_once()
+	db.commit.assert_not_awaited()
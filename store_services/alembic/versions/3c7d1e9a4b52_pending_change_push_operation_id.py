@@ -0,0 +1,31 @@
+"""pending change push operation id
+
+Revision ID: 3c7d1e9a4b52
+Revises: 97ca9f85eca2
+Create Date: 2026-10-17 09:12:05.118204
+
+"""
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '3c7d1e9a4b52'
+down_revision: str | Sequence[str] | None = '97ca9f85eca2'
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('pending_change', sa.Column('push_operation_id', sa.VARCHAR(length=255), nullable=True))
+    op.create_index(op.f('ix_pending_change_push_operation_id'), 'pending_change', ['push_operation_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('pending_change') as batch_op:
+        batch_op.drop_index(batch_op.f('ix_pending_change_push_operation_id'))
+        batch_op.drop_column('push_operation_id')
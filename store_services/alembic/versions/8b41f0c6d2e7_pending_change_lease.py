@@ -0,0 +1,34 @@
+"""pending change lease
+
+Revision ID: 8b41f0c6d2e7
+Revises: 3c7d1e9a4b52
+Create Date: 2026-10-17 10:03:41.552871
+
+"""
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import sqlite
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '8b41f0c6d2e7'
+down_revision: str | Sequence[str] | None = '3c7d1e9a4b52'
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('pending_change', sa.Column('lease_owner', sa.VARCHAR(length=255), nullable=True))
+    op.add_column('pending_change', sa.Column('lease_expires_at', sqlite.DATETIME(), nullable=True))
+    op.create_index('ix_pending_change_claim', 'pending_change', ['status', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('pending_change') as batch_op:
+        batch_op.drop_index('ix_pending_change_claim')
+        batch_op.drop_column('lease_expires_at')
+        batch_op.drop_column('lease_owner')
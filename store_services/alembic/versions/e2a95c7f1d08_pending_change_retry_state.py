@@ -0,0 +1,34 @@
+"""pending change retry state
+
+Revision ID: e2a95c7f1d08
+Revises: 8b41f0c6d2e7
+Create Date: 2026-10-17 10:48:19.207364
+
+"""
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import sqlite
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a95c7f1d08'
+down_revision: str | Sequence[str] | None = '8b41f0c6d2e7'
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('pending_change', sa.Column('attempts', sa.INTEGER(), nullable=False, server_default='0'))
+    op.add_column('pending_change', sa.Column('next_attempt_at', sqlite.DATETIME(), nullable=True))
+    op.add_column('pending_change', sa.Column('last_error_class', sa.VARCHAR(length=50), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('pending_change') as batch_op:
+        batch_op.drop_column('last_error_class')
+        batch_op.drop_column('next_attempt_at')
+        batch_op.drop_column('attempts')
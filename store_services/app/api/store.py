@@ -1,20 +1,29 @@
 import logging
-from datetime import UTC, datetime
 from typing import Annotated
-from uuid import uuid4
 
 from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request
 from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from common.schemas import GenericResponse, InventoryResponse, UpdateInventory
+from common.schemas import (
+	BatchUpdateInventory,
+	GenericResponse,
+	InventoryResponse,
+	UpdateInventory,
+)
 from core.db import get_db
-from models.models import Inventory, PendingChange, SyncStatus
+from core.write_pipeline import run_write
+from models.models import SyncStatus
 from observability import local_updates_total
-from services.api_services import get_inventory_by_sku, get_pending_change
+from services.api_services import (
+	apply_local_batch,
+	get_inventory_by_sku,
+	get_pending_change,
+	record_local_update,
+)
 from services.sync_service import process_pending_once
-from services.sync_service_db import get_inventory as getInventory
-from services.sync_service_db import get_pending_change_by_sku, update_model
+from services.sync_service_db import get_pending_change_by_sku
+from services.sync_trigger import request_sync
 
 try:
 	from celery_tools.celery_tasks.tasks import process_pending_once_task
@@ -68,54 +77,44 @@ async def update_inventory(
 	payload: UpdateInventory,
 	db: Annotated[AsyncSession, Depends(get_db)],
 	request: Request,
+	background: BackgroundTasks,
 ) -> InventoryResponse:
-	"""Update local inventory and queue change for central sync."""
-	# Get current inventory
-	item = await get_inventory_by_sku(
-		logger=logger, request=request, db=db, wait_update=True, sku=sku
-	)
-	# Apply local update
-	new_qty = item.quantity + payload.delta
-	if new_qty < 0:
+	"""Update local inventory and queue change for central sync.
+
+	The conditional update and the outbox row are committed together."""
+	item = await run_write(db, lambda s: record_local_update(db=s, sku=sku, payload=payload))
+	if item is None:
+		# Either the SKU doesn't exist (404) or there isn't enough stock
+		current = await get_inventory_by_sku(logger=logger, request=request, db=db, sku=sku)
 		raise HTTPException(
 			status_code=400,
-			detail=f"Insufficient quantity. Available: {item.quantity}, requested: {abs(payload.delta)}",
+			detail=f"Insufficient quantity. Available: {current.quantity}, requested: {abs(payload.delta)}",
 		)
-
-	# Update local inventory
-	new_version = item.version + 1
-	await update_model(
-		model=Inventory,
-		update_values={
-			"quantity": new_qty,
-			"version": new_version,
-			"updated_at": datetime.now(UTC),
-		},
-		db=db,
-		id=item.id,
-	)
-
-	# Queue change for sync
-	change = PendingChange(
-		operation_id=payload.operation_id or str(uuid4()),
-		inventory_id=item.id,
-		sku=item.sku,
-		delta=payload.delta,
-		local_version=item.version + 1,
-		central_version=payload.version,
-		status=SyncStatus.PENDING.value,
-	)
-	db.add(change)
-	await db.commit()
+	background.add_task(request_sync)
 	# Instrument local update
 	try:
 		local_updates_total.inc()
 	except Exception:
 		pass
 
-	# Return updated inventory
-	result = await getInventory(id=item.id, db=db)
-	return InventoryResponse.model_validate(result)
+	return InventoryResponse.model_validate(item)
+
+
+@router.post("/inventory/batch-update", response_model=list[InventoryResponse])
+async def batch_update_inventory(
+	payload: BatchUpdateInventory,
+	db: Annotated[AsyncSession, Depends(get_db)],
+	background: BackgroundTasks,
+) -> list[InventoryResponse]:
+	"""Apply every line of a basket and queue them for central sync, all or
+	nothing, with a single commit. Returns the state of the SKU after each line."""
+	lines = await run_write(db, lambda s: apply_local_batch(db=s, items=payload.items))
+	background.add_task(request_sync)
+	try:
+		local_updates_total.inc(len(lines))
+	except Exception:
+		pass
+	return lines
 
 
 @router.get("/inventory/{sku}/operation_id")
@@ -133,7 +132,12 @@ async def get_sync_status(
 	return GenericResponse(
 		ok=change.status == SyncStatus.COMPLETED.value,
 		message=f"Sync status: {change.status}"
-		+ (f" - {change.error}" if change.error else ""),
+		+ (f" - {change.error}" if change.error else "")
+		+ (
+			f" (pushed as {change.push_operation_id})"
+			if change.push_operation_id and change.push_operation_id != operation_id
+			else ""
+		),
 	)
 
 
@@ -1,41 +1,112 @@
+import asyncio
+import logging
+import time
 from typing import TypedDict
 
 import httpx
+import jwt
 
 from core.config import get_settings
-import jwt
-from datetime import UTC, datetime
+from core.http import central_breaker, get_http_client
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
+
 
 class Token(TypedDict):
     access_token: str
     token_type: str
 
-_token_cache: str | None = None
 
+class TokenManager:
+    """Service token for central, fetched once and shared by every caller.
 
-def get_expired_token(token: str)->bool:
-    payload = jwt.decode(
+    `exp` is read once when the token is fetched, so checking the token is a
+    timestamp comparison. Within `refresh_margin` seconds of the expiry the
+    current token is still returned while a refresh runs in the background.
+    Concurrent callers that need a new token wait on the same request.
+    """
+
+    def __init__(self, refresh_margin: float = 60.0) -> None:
+        self.refresh_margin = refresh_margin
+        self._token: str | None = None
+        self._expires_at = 0.0
+        self._refresh: asyncio.Task[str] | None = None
+
+    async def _fetch(self) -> str:
+        r = await central_breaker.call(
+            lambda: get_http_client().post(
+                f"{settings.central_url}auth/token",
+                json={"service_name": settings.service_name, "service_secret": settings.services_secret}
+            )
+        )
+        r.raise_for_status()
+        data: Token = r.json()
+        token = data["access_token"]
+        payload = jwt.decode(
             token,
             settings.jwt_secrets,
             algorithms=[settings.jwt_algorithm],
             audience="central-service",
         )
-    if datetime.now(UTC) > datetime.fromtimestamp(payload["exp"], UTC):
-            return False
-    return True
-
-async def get_service_token()->str:
-    global _token_cache
-    if _token_cache and not get_expired_token(_token_cache):
-        return _token_cache
-    async with httpx.AsyncClient() as client:
-        r = await client.post(
-            f"{settings.central_url}auth/token",
-            json={"service_name": settings.service_name, "service_secret": settings.services_secret}
+        self._token = token
+        self._expires_at = float(payload["exp"])
+        return token
+
+    def _log_refresh_failure(self, task: asyncio.Task[str]) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Token refresh failed: {task.exception()}")
+
+    def _start_refresh(self) -> asyncio.Task[str]:
+        loop = asyncio.get_running_loop()
+        # A task of a finished loop (an earlier Celery run) can't be awaited
+        if self._refresh is None or self._refresh.done() or self._refresh.get_loop() is not loop:
+            self._refresh = loop.create_task(self._fetch())
+            self._refresh.add_done_callback(self._log_refresh_failure)
+        return self._refresh
+
+    def invalidate(self) -> None:
+        self._token = None
+        self._expires_at = 0.0
+
+    async def get_token(self) -> str:
+        now = time.time()
+        if self._token is not None and now < self._expires_at:
+            if now >= self._expires_at - self.refresh_margin:
+                self._start_refresh()
+            return self._token
+        return await self._start_refresh()
+
+    async def force_refresh(self, rejected: str | None) -> str:
+        """Get a new token after central rejected `rejected`. When another
+        caller already replaced it, its new token is returned instead."""
+        if self._token is not None and self._token != rejected:
+            return self._token
+        self.invalidate()
+        return await self._start_refresh()
+
+
+token_manager = TokenManager(refresh_margin=settings.token_refresh_margin)
+
+
+async def get_service_token() -> str:
+    return await token_manager.get_token()
+
+
+async def post_to_central(url: str, json: dict, headers: dict | None = None) -> httpx.Response:
+    """POST to central with the service token, through the circuit breaker.
+
+    A 401 means central no longer accepts the token: the token is refreshed
+    once and the request sent again.
+    """
+    token = await token_manager.get_token()
+    for attempt in range(2):
+        response = await central_breaker.call(
+            lambda token=token: get_http_client().post(
+                url, json=json, headers={**(headers or {}), "Authorization": f"Bearer {token}"}
+            )
         )
-        r.raise_for_status()
-        data: Token = r.json()
-        _token_cache = data["access_token"]
-        return _token_cache
+        if response.status_code != 401 or attempt:
+            return response
+        token = await token_manager.force_refresh(token)
+    return response
@@ -1,20 +1,94 @@
 import asyncio
 import logging
+from collections.abc import Coroutine
+from typing import Any
 
 from celery import shared_task
+from celery.signals import worker_process_init, worker_process_shutdown, worker_shutdown
 
-from services.sync_service import process_pending_once
+from core.circuit_breaker import CircuitOpenError
+from core.config import get_settings
+from core.http import close_http_client
+from core.partitioning import partition_queue
+from core.worker_loop import worker_loop
+from services.sync_service import partition_backlog, process_pending_once
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+@worker_process_init.connect
+def start_worker_loop(**kwargs):
+	"""Start the event loop of a prefork child; the solo pool starts it on its
+	first task."""
+	if settings.worker_persistent_loop:
+		worker_loop.start()
+
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def stop_worker_loop(**kwargs):
+	"""Close the HTTP client and the database pool of the worker loop."""
+	worker_loop.stop()
+
+
+async def _close_client_after[T](coro: Coroutine[Any, Any, T]) -> T:
+	"""Run `coro` and close the HTTP client bound to this task's loop."""
+	try:
+		return await coro
+	finally:
+		await close_http_client()
+
+
+def _run[T](coro: Coroutine[Any, Any, T]) -> T:
+	"""Run `coro` on the worker loop, or on a loop of its own without
+	WORKER_PERSISTENT_LOOP."""
+	if settings.worker_persistent_loop:
+		return worker_loop.run(coro)
+	return asyncio.run(_close_client_after(coro))
+
+
 @shared_task(
 	bind=True,
 	autoretry_for=(Exception,),
+	dont_autoretry_for=(CircuitOpenError,),
 	retry_backoff=True,
 	retry_kwargs={"max_retries": 5},
 	acks_late=True,
 	name="Store:process_pending_once_task",
 )
 def process_pending_once_task(self):
-	"""Celery task wrapper that runs the async processor once."""
+	"""Celery task wrapper that runs the async processor once.
+
+	With SYNC_PARTITIONS above 1 this task only coordinates: it publishes the
+	backlog of every partition and sends a process_partition_task to the queue
+	of each partition that has changes waiting. Returns the number of changes
+	processed, or dispatched to the partitions.
+	"""
 	logger.info("Executing task in background")
-	return asyncio.run(process_pending_once())
+	if settings.sync_partitions <= 1:
+		return _run(process_pending_once())
+	backlog = _run(partition_backlog())
+	for partition, total in backlog.items():
+		if total:
+			process_partition_task.apply_async(args=(partition,), queue=partition_queue(partition))
+	return sum(backlog.values())
+
+
+@shared_task(
+	bind=True,
+	autoretry_for=(Exception,),
+	dont_autoretry_for=(CircuitOpenError,),
+	retry_backoff=True,
+	retry_kwargs={"max_retries": 5},
+	acks_late=True,
+	name="Store:process_partition_task",
+)
+def process_partition_task(self, partition: int):
+	"""Process the pending changes of one SKU partition.
+
+	Run by the worker consuming `Store.p{partition}`; the changes of a SKU always
+	land in the same partition, so they are still pushed in order.
+	"""
+	logger.info(f"Executing sync partition {partition}")
+	return _run(process_pending_once(partition=partition))
@@ -1,9 +1,27 @@
 from celery import current_app as current_celery_app  # type: ignore
 from celery.local import Proxy  # type: ignore
 from celery.schedules import crontab
+from celery.signals import celeryd_after_setup
+from core.partitioning import SYNC_QUEUE, partition_queues
 from .celery_config import settings
 
 
+@celeryd_after_setup.connect
+def consume_partition_queues(sender, instance, **kwargs) -> None:
+	"""Make the `Store` worker consume every partition queue too.
+
+	The solo pool runs one task at a time, so a dedicated worker per
+	`Store.p{n}` is what gives the partitions their parallelism (see
+	deploy/docker-compose.yml). The `Store` worker still drains every partition,
+	so a partition without its own worker never strands its backlog.
+	"""
+	queues = instance.app.amqp.queues
+	if SYNC_QUEUE not in queues.consume_from:
+		return
+	for name in partition_queues():
+		queues.select_add(name)
+
+
 def create_celery() -> Proxy:
 	# register_pydantic_model()
 	celery_app = current_celery_app
@@ -36,6 +54,8 @@ def create_celery() -> Proxy:
 		worker_task_log_format="[%(asctime)s: %(levelname)s/%(processName)s][%(task_name)s(%(task_id)s)] %(message)s",
 	)
 	celery_app.conf.update(
+		# Local writes trigger a sync themselves (services/sync_trigger.py), the
+		# beat entry only catches changes whose trigger was lost.
 		beat_schedule={
 			"process-pending-every-15m": {
 				"task": "Store:process_pending_once_task",  # Use full path to task
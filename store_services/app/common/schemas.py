@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import Literal
 from uuid import uuid4
 from pydantic import BaseModel, ConfigDict, Field
 
@@ -14,6 +15,14 @@ class UpdateInventory(BaseModel):
     version: int | None = Field(None, description="Track central's version if known")
     operation_id: str = Field(str(uuid4()), description="Key of identification for table PendingChange")
 
+class BatchUpdateItem(UpdateInventory):
+    """One line of a basket, applied with the others or not at all."""
+    sku: str
+    operation_id: str = Field(default_factory=lambda: str(uuid4()), description="Key of identification for table PendingChange")
+
+class BatchUpdateInventory(BaseModel):
+    items: list[BatchUpdateItem] = Field(..., min_length=1, max_length=500)
+
 class InventoryResponse(BaseModel):
     id: int
     sku: str
@@ -27,3 +36,14 @@ class InventoryResponse(BaseModel):
 class GenericResponse(BaseModel):
     ok: bool
     message: str
+
+
+class BulkSyncItemResult(BaseModel):
+    """Per-item result of central's bulk-sync, with central's state for the SKU."""
+    sku: str
+    quantity: int
+    version: int
+    operation_id: str
+    status: Literal["applied", "replayed", "conflict", "insufficient"]
+    detail: str | None = None
+    model_config = ConfigDict(extra="ignore")
@@ -0,0 +1,153 @@
+import logging
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from enum import Enum
+
+import httpx
+from prometheus_client import Gauge
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitState(Enum):
+    CLOSED = 0
+    HALF_OPEN = 1
+    OPEN = 2
+
+
+class CircuitOpenError(Exception):
+    """The circuit is open: the call was rejected without reaching the server."""
+
+
+def is_server_failure(e: BaseException) -> bool:
+    """Errors that tell the server is unhealthy, unlike 4xx answers."""
+    if isinstance(e, httpx.HTTPStatusError):
+        return e.response.status_code >= 500
+    return isinstance(e, httpx.TransportError)
+
+
+class CircuitBreaker:
+    """Fail fast while a remote service is down.
+
+    The circuit opens after `failure_threshold` consecutive failures, or when
+    more than `error_rate` of the last `window` calls failed. While open every
+    call raises CircuitOpenError. After `reset_timeout` seconds up to
+    `half_open_max_calls` probes go through: a success closes the circuit, a
+    failure opens it again.
+
+    .. code-block:: python
+        breaker = CircuitBreaker("central", failure_threshold=5)
+        response = await breaker.call(lambda: client.get(url))
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        error_rate: float = 0.5,
+        window: int = 20,
+        reset_timeout: float = 30.0,
+        half_open_max_calls: int = 1,
+        state_gauge: Gauge | None = None,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.error_rate = error_rate
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.state_gauge = state_gauge
+        self._outcomes: deque[bool] = deque(maxlen=window)
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        self._state = CircuitState.CLOSED
+
+    @property
+    def state(self) -> CircuitState:
+        if (
+            self._state is CircuitState.OPEN
+            and time.monotonic() - self._opened_at >= self.reset_timeout
+        ):
+            self._set_state(CircuitState.HALF_OPEN)
+        return self._state
+
+    @property
+    def is_open(self) -> bool:
+        return self.state is CircuitState.OPEN
+
+    def _set_state(self, state: CircuitState) -> None:
+        if state is not self._state:
+            logger.warning(f"Circuit {self.name} is now {state.name.lower()}")
+        self._state = state
+        self._half_open_calls = 0
+        if state is CircuitState.OPEN:
+            self._opened_at = time.monotonic()
+        if state is CircuitState.CLOSED:
+            self._outcomes.clear()
+            self._consecutive_failures = 0
+        if self.state_gauge is not None:
+            self.state_gauge.set(state.value)
+
+    def reset(self) -> None:
+        """Close the circuit and forget past calls."""
+        self._set_state(CircuitState.CLOSED)
+
+    def allow(self) -> None:
+        """Raise CircuitOpenError if a call can't go through now."""
+        state = self.state
+        if state is CircuitState.OPEN:
+            raise CircuitOpenError(f"Circuit {self.name} is open")
+        if state is CircuitState.HALF_OPEN:
+            if self._half_open_calls >= self.half_open_max_calls:
+                raise CircuitOpenError(f"Circuit {self.name} is half-open, probe in flight")
+            self._half_open_calls += 1
+
+    def record_success(self) -> None:
+        if self._state is CircuitState.HALF_OPEN:
+            self._set_state(CircuitState.CLOSED)
+            return
+        self._consecutive_failures = 0
+        self._outcomes.append(True)
+
+    def record_failure(self) -> None:
+        if self._state is CircuitState.HALF_OPEN:
+            self._set_state(CircuitState.OPEN)
+            return
+        self._consecutive_failures += 1
+        self._outcomes.append(False)
+        failures = self._outcomes.count(False)
+        window_full = len(self._outcomes) == self._outcomes.maxlen
+        if self._consecutive_failures >= self.failure_threshold or (
+            window_full and failures / len(self._outcomes) > self.error_rate
+        ):
+            self._set_state(CircuitState.OPEN)
+
+    async def call(self, func: Callable[[], Awaitable[httpx.Response]]) -> httpx.Response:
+        """Run `func` through the circuit.
+
+        Transport errors and 5xx responses count as failures; the response is
+        still returned to the caller.
+        Raises:
+            CircuitOpenError: If the circuit is open
+        """
+        self.allow()
+        probe = self._state is CircuitState.HALF_OPEN
+        try:
+            response = await func()
+        except Exception as e:
+            if is_server_failure(e):
+                self.record_failure()
+            else:
+                self.record_success()
+            raise
+        except BaseException:
+            # Cancelled: tells nothing about the server, free the probe slot
+            if probe and self._state is CircuitState.HALF_OPEN:
+                self._half_open_calls = max(0, self._half_open_calls - 1)
+            raise
+        if response.status_code >= 500:
+            self.record_failure()
+        else:
+            self.record_success()
+        return response
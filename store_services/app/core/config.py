@@ -23,6 +23,34 @@ class ReadEnvSettings(BaseSettings):
     jwt_algorithm: str = Field("HS256", description="Algorith used in the JWT Auth", alias="JWT_ALGORITHM")
     database_url: str = Field(..., description="url or path for the sqlite db", alias="DATABASE_URL")
     broker_url: str = Field(..., description="RabbitMQ host", alias="RABBITMQ_URL")
+    sync_bulk_enabled: bool = Field(True, description="Push pending changes through central's bulk-sync instead of one /adjust per change", alias="SYNC_BULK_ENABLED")
+    sync_batch_size: int = Field(100, description="Max pending changes sent in one bulk-sync request", alias="SYNC_BATCH_SIZE")
+    sync_drain: bool = Field(True, description="Keep processing pages of pending changes until the outbox is empty", alias="SYNC_DRAIN")
+    sync_push_concurrency: int = Field(5, description="Pushes to central in flight at once when SYNC_BULK_ENABLED is off", alias="SYNC_PUSH_CONCURRENCY")
+    sync_page_size: int = Field(100, description="Pending changes read from the outbox per page", alias="SYNC_PAGE_SIZE")
+    sync_trigger_debounce: float = Field(2.0, description="Seconds a local write waits before triggering a sync, 0 disables the trigger", alias="SYNC_TRIGGER_DEBOUNCE")
+    sync_lease_seconds: int = Field(120, description="Seconds a sync worker owns the pending changes it claimed", alias="SYNC_LEASE_SECONDS")
+    sync_partitions: int = Field(1, description="Partitions the outbox is split in by SKU, each drained from its own Celery queue", alias="SYNC_PARTITIONS")
+    sync_max_attempts: int = Field(8, description="Pushes of a change before it moves to the dead-letter status", alias="SYNC_MAX_ATTEMPTS")
+    sync_retry_base: float = Field(2.0, description="Base in seconds of the exponential retry backoff", alias="SYNC_RETRY_BASE")
+    sync_retry_cap: float = Field(600.0, description="Max seconds between two pushes of a change", alias="SYNC_RETRY_CAP")
+    sync_max_rebases: int = Field(3, description="Times a push that hit a version conflict is pushed again on central's version in the same run", alias="SYNC_MAX_REBASES")
+    write_pipeline_window_ms: float = Field(0, description="Milliseconds concurrent local writes wait to be committed together, 0 commits each write on its own", alias="WRITE_PIPELINE_WINDOW_MS")
+    write_pipeline_max_batch: int = Field(64, description="Max writes committed in one transaction by the write pipeline", alias="WRITE_PIPELINE_MAX_BATCH")
+    worker_persistent_loop: bool = Field(True, description="Run every Celery task of a worker process on one long-lived event loop instead of a new loop per task", alias="WORKER_PERSISTENT_LOOP")
+    central_breaker_failures: int = Field(5, description="Consecutive failures that open the circuit to central", alias="CENTRAL_BREAKER_FAILURES")
+    central_breaker_error_rate: float = Field(0.5, description="Share of failed calls in the window that opens the circuit to central", alias="CENTRAL_BREAKER_ERROR_RATE")
+    central_breaker_window: int = Field(20, description="Number of recent calls used for the error rate", alias="CENTRAL_BREAKER_WINDOW")
+    central_breaker_reset_seconds: float = Field(30.0, description="Seconds the circuit stays open before a probe", alias="CENTRAL_BREAKER_RESET_SECONDS")
+    token_refresh_margin: float = Field(60.0, description="Seconds before its expiry the service token is refreshed in the background", alias="TOKEN_REFRESH_MARGIN")
+    central_max_connections: int = Field(20, description="Max open connections to central", alias="CENTRAL_MAX_CONNECTIONS")
+    central_max_keepalive: int = Field(10, description="Max idle keep-alive connections kept to central", alias="CENTRAL_MAX_KEEPALIVE")
+    central_keepalive_expiry: float = Field(30.0, description="Seconds an idle connection to central is kept open", alias="CENTRAL_KEEPALIVE_EXPIRY")
+    central_http2: bool = Field(False, description="Use HTTP/2 with central (needs the h2 package)", alias="CENTRAL_HTTP2")
+    central_connect_timeout: float = Field(3.0, description="Seconds to open a connection to central", alias="CENTRAL_CONNECT_TIMEOUT")
+    central_read_timeout: float = Field(10.0, description="Seconds to wait for data from central", alias="CENTRAL_READ_TIMEOUT")
+    central_write_timeout: float = Field(10.0, description="Seconds to send a request to central", alias="CENTRAL_WRITE_TIMEOUT")
+    central_pool_timeout: float = Field(5.0, description="Seconds to wait for a free connection of the pool", alias="CENTRAL_POOL_TIMEOUT")
     
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", extra="ignore")
 
@@ -1,8 +1,10 @@
 from collections.abc import AsyncIterator
 
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 from .config import get_settings
+from .partitioning import sku_partition
 
 settings = get_settings()
 
@@ -10,6 +12,35 @@ engine = create_async_engine(url=settings.database_url,echo=False, future =True,
 session  = async_sessionmaker(bind=engine, expire_on_commit=False)
 
 
+# Lets a sync worker claim the changes of its partition only (SYNC_PARTITIONS)
+@event.listens_for(engine.sync_engine, "connect")
+def _register_sku_partition(dbapi_connection, connection_record) -> None:
+    dbapi_connection.create_function("sku_partition", 2, sku_partition, deterministic=True)
+
+
+# Connections of the write pipeline only. pysqlite opens transactions on its own
+# and breaks SAVEPOINT, so SQLAlchemy emits BEGIN itself there. That BEGIN also
+# covers reads and would hold SQLite's shared lock until commit, which is why
+# `engine` keeps the driver's behaviour: a session that reads and then waits on
+# central doesn't block local writes.
+write_engine = create_async_engine(url=settings.database_url, echo=False, connect_args={"check_same_thread": False})
+write_session = async_sessionmaker(bind=write_engine, expire_on_commit=False)
+
+
+@event.listens_for(write_engine.sync_engine, "connect")
+def _disable_driver_transactions(dbapi_connection, connection_record) -> None:
+    dbapi_connection.isolation_level = None
+
+
+# The claim of a partition also runs through the write pipeline
+event.listen(write_engine.sync_engine, "connect", _register_sku_partition)
+
+
+@event.listens_for(write_engine.sync_engine, "begin")
+def _begin(conn) -> None:
+    conn.exec_driver_sql("BEGIN")
+
+
 async def get_db()->AsyncIterator[AsyncSession]:
     async with session() as db:
         yield db
\ No newline at end of file
@@ -0,0 +1,69 @@
+import asyncio
+import importlib.util
+import logging
+
+import httpx
+
+from observability import central_circuit_state
+
+from .circuit_breaker import CircuitBreaker
+from .config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# One client per event loop: the API and the Celery worker (core/worker_loop.py)
+# each run a single loop, but a task run with asyncio.run gets its own, and a
+# pooled connection can't be shared between loops.
+_clients: dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
+
+# Shared by every call to central of the process, whatever its event loop
+central_breaker = CircuitBreaker(
+    "central",
+    failure_threshold=settings.central_breaker_failures,
+    error_rate=settings.central_breaker_error_rate,
+    window=settings.central_breaker_window,
+    reset_timeout=settings.central_breaker_reset_seconds,
+    state_gauge=central_circuit_state,
+)
+
+
+def _build_client() -> httpx.AsyncClient:
+    http2 = settings.central_http2
+    if http2 and importlib.util.find_spec("h2") is None:
+        logger.warning("CENTRAL_HTTP2 is set but h2 is not installed, using HTTP/1.1")
+        http2 = False
+    return httpx.AsyncClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=settings.central_max_connections,
+            max_keepalive_connections=settings.central_max_keepalive,
+            keepalive_expiry=settings.central_keepalive_expiry,
+        ),
+        timeout=httpx.Timeout(
+            connect=settings.central_connect_timeout,
+            read=settings.central_read_timeout,
+            write=settings.central_write_timeout,
+            pool=settings.central_pool_timeout,
+        ),
+    )
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Pooled client used for every call to central from the running event loop.
+
+    The client keeps connections alive between calls, so it must not be used as
+    a context manager: it is closed by `close_http_client` on shutdown.
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = _clients[loop] = _build_client()
+    return client
+
+
+async def close_http_client() -> None:
+    """Close the client of the running event loop, if it has one."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
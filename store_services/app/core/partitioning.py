@@ -0,0 +1,31 @@
+import zlib
+
+from .config import get_settings
+
+settings = get_settings()
+
+# Queue of the sync coordinator, partitions get `Store.p{n}`
+SYNC_QUEUE = "Store"
+
+
+def sku_partition(sku: str, partitions: int) -> int:
+    """Partition of `sku` when the outbox is split in `partitions`.
+
+    crc32 gives the same partition in every process, unlike the builtin `hash`.
+    It is also registered as the `sku_partition` SQL function (core/db.py) so
+    a worker can claim the changes of its partition only.
+    """
+    if partitions <= 1:
+        return 0
+    return zlib.crc32(sku.encode()) % partitions
+
+
+def partition_queue(partition: int) -> str:
+    return f"{SYNC_QUEUE}.p{partition}"
+
+
+def partition_queues() -> list[str]:
+    """Queues of the sync partitions, none when SYNC_PARTITIONS is 1."""
+    if settings.sync_partitions <= 1:
+        return []
+    return [partition_queue(partition) for partition in range(settings.sync_partitions)]
@@ -0,0 +1,103 @@
+import asyncio
+import logging
+import os
+import threading
+from collections.abc import Coroutine
+from typing import Any
+
+from .db import engine, write_engine
+from .http import close_http_client
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerLoop:
+    """One event loop per worker process, shared by every task it runs.
+
+    The loop runs forever in a daemon thread, so the database pool, the HTTP
+    client, the service token and the write pipeline (all tied to the loop
+    that created them) are built once and reused by every task. Background
+    work such as a token refresh keeps running between tasks.
+
+    .. code-block:: python
+        worker_loop.start()
+        processed = worker_loop.run(process_pending_once())
+        worker_loop.stop()
+    """
+
+    def __init__(self, shutdown_timeout: float = 10.0) -> None:
+        self.shutdown_timeout = shutdown_timeout
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._pid: int | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_running(self) -> bool:
+        # A loop inherited through fork has no thread running it in this process
+        return self._loop is not None and self._pid == os.getpid()
+
+    def start(self) -> None:
+        with self._lock:
+            if self.is_running:
+                return
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(
+                target=self._run_forever, args=(loop,), name="worker-loop", daemon=True
+            )
+            self._loop, self._thread, self._pid = loop, thread, os.getpid()
+            thread.start()
+            logger.info("Worker event loop started")
+
+    @staticmethod
+    def _run_forever(loop: asyncio.AbstractEventLoop) -> None:
+        asyncio.set_event_loop(loop)
+        loop.run_forever()
+
+    def run[T](self, coro: Coroutine[Any, Any, T]) -> T:
+        """Run `coro` on the worker loop and wait for its result.
+
+        The loop is started on first use. If the calling thread is interrupted
+        (e.g. by a task time limit) the coroutine is cancelled.
+        """
+        self.start()
+        assert self._loop is not None
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        try:
+            return future.result()
+        except BaseException:
+            future.cancel()
+            raise
+
+    async def _shutdown(self) -> None:
+        await close_http_client()
+        current = asyncio.current_task()
+        tasks = [task for task in asyncio.all_tasks() if task is not current]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await engine.dispose()
+        await write_engine.dispose()
+
+    def stop(self) -> None:
+        """Close the HTTP client and the database pool, then stop the loop."""
+        with self._lock:
+            if not self.is_running:
+                return
+            loop, thread = self._loop, self._thread
+            assert loop is not None and thread is not None
+            try:
+                asyncio.run_coroutine_threadsafe(self._shutdown(), loop).result(
+                    self.shutdown_timeout
+                )
+            except Exception:
+                logger.exception("Worker event loop shutdown failed")
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(self.shutdown_timeout)
+            if not thread.is_alive():
+                loop.close()
+            self._loop = self._thread = self._pid = None
+            logger.info("Worker event loop stopped")
+
+
+worker_loop = WorkerLoop()
@@ -0,0 +1,125 @@
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from observability import write_pipeline_batch_size, write_pipeline_commits_total
+
+from .config import get_settings
+from .db import write_session
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+type WriteOp[T] = Callable[[AsyncSession], Awaitable[T]]
+
+
+class WritePipeline:
+    """Group commit for the writes of one event loop.
+
+    Writes submitted within `window` seconds of each other run in one
+    transaction, each in its own SAVEPOINT, and are committed together. A write
+    that raises only rolls back its savepoint: its caller gets the error and
+    the others are still committed. If the commit itself fails, every caller
+    of the group gets that error.
+
+    .. code-block:: python
+        pipeline = WritePipeline(write_session, window=0.005, max_batch=64)
+        item = await pipeline.submit(lambda db: apply_local_delta(db, "abc", -1))
+    """
+
+    def __init__(
+        self, session_factory: async_sessionmaker[AsyncSession], window: float, max_batch: int
+    ) -> None:
+        self.session_factory = session_factory
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: list[tuple[WriteOp[Any], asyncio.Future[Any]]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        # One group is committed at a time, the next one builds up meanwhile
+        self._lock = asyncio.Lock()
+        self._flushes: set[asyncio.Task[None]] = set()
+
+    async def submit[T](self, op: WriteOp[T]) -> T:
+        """Run `op` in the next group and wait for the group's commit."""
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[T] = loop.create_future()
+        self._pending.append((op, future))
+        if len(self._pending) >= self.max_batch:
+            self._start_flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._start_flush)
+        return await future
+
+    def _start_flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.get_running_loop().create_task(self._flush(batch))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, batch: list[tuple[WriteOp[Any], asyncio.Future[Any]]]) -> None:
+        outcomes: list[tuple[asyncio.Future[Any], Any, BaseException | None]] = []
+        async with self._lock:
+            try:
+                async with self.session_factory() as db, db.begin():
+                    for op, future in batch:
+                        if future.cancelled():
+                            continue
+                        try:
+                            async with db.begin_nested():
+                                result = await op(db)
+                            outcomes.append((future, result, None))
+                        except Exception as e:
+                            outcomes.append((future, None, e))
+            except Exception as e:
+                logger.exception("Write pipeline commit failed")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+        write_pipeline_commits_total.inc()
+        write_pipeline_batch_size.set(len(outcomes))
+        for future, result, error in outcomes:
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+
+# One pipeline per event loop, like the HTTP client: futures can't cross loops
+_pipelines: dict[asyncio.AbstractEventLoop, WritePipeline] = {}
+
+
+def get_write_pipeline() -> WritePipeline:
+    loop = asyncio.get_running_loop()
+    pipeline = _pipelines.get(loop)
+    if pipeline is None:
+        pipeline = _pipelines[loop] = WritePipeline(
+            write_session,
+            window=settings.write_pipeline_window_ms / 1000,
+            max_batch=settings.write_pipeline_max_batch,
+        )
+    return pipeline
+
+
+async def run_write[T](db: AsyncSession, op: WriteOp[T]) -> T:
+    """Run `op` and commit it.
+
+    With WRITE_PIPELINE_WINDOW_MS set, `op` is grouped with the concurrent
+    writes of the process and runs on the pipeline's session; otherwise it runs
+    on `db`, which is committed. `op` must not commit or roll back itself.
+    """
+    if settings.write_pipeline_window_ms <= 0:
+        result = await op(db)
+        await db.commit()
+        return result
+    return await get_write_pipeline().submit(op)
@@ -1,3 +1,5 @@
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from datetime import UTC, datetime
 
 from fastapi import FastAPI, Response
@@ -10,12 +12,20 @@ from celery_tools.config.celery_utils import create_celery
 # from celery_app import celery_app
 from common.schemas import GenericResponse
 from core.db import session
+from core.http import close_http_client
 from models.models import Inventory, PendingChange
 from observability import REGISTRY, inventory_count, pending_changes_gauge
 from services.sync_service_db import count
 from utils.logger_middleware import RequestLoggingMiddleware, logger
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    yield
+    await close_http_client()
+
+
+app = FastAPI(lifespan=lifespan)
 app.celery_app = create_celery()
 # app.celery_app = celery_app
 bearer = HTTPBearer()
@@ -4,7 +4,7 @@ from typing import Annotated
 from uuid import UUID, uuid4
 
 from sqlalchemy import Enum as SQLEnum
-from sqlalchemy import ForeignKey, Text
+from sqlalchemy import ForeignKey, Index, Text
 from sqlalchemy.dialects.sqlite import DATETIME, FLOAT, INTEGER, VARCHAR
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -20,6 +20,8 @@ class SyncStatus(Enum):
 	IN_PROGRESS = "in_progress"
 	COMPLETED = "completed"
 	FAILED = "failed"
+	# Retries exhausted, needs an operator
+	DEAD_LETTER = "dead_letter"
 
 
 class Products(Base, MixInNameTable):
@@ -50,6 +52,10 @@ class Inventory(Base, MixInNameTable):
 class PendingChange(Base, MixInNameTable):
 	"""Track changes that need to be synced to central."""
 
+	__table_args__ = (
+		Index("ix_pending_change_claim", "status", "created_at", "id"),
+	)
+
 	id: Mapped[primary_key]
 	operation_id: Mapped[str] = mapped_column(
 		VARCHAR(255), unique=True, nullable=False, default=lambda: str(uuid4())
@@ -64,7 +70,19 @@ class PendingChange(Base, MixInNameTable):
 		nullable=False,
 		default="pending",
 	)
+	# Operation id of the compacted push that carried this change to central
+	push_operation_id: Mapped[str] = mapped_column(
+		VARCHAR(255), nullable=True, index=True
+	)
 	error: Mapped[str] = mapped_column(Text, nullable=True)
+	# Retry state: pushes made so far, when the next one is due and the kind of
+	# error the last one hit
+	attempts: Mapped[int] = mapped_column(INTEGER, nullable=False, default=0)
+	next_attempt_at: Mapped[datetime] = mapped_column(DATETIME, nullable=True)
+	last_error_class: Mapped[str] = mapped_column(VARCHAR(50), nullable=True)
+	# Sync worker currently pushing the change, until `lease_expires_at`
+	lease_owner: Mapped[str] = mapped_column(VARCHAR(255), nullable=True)
+	lease_expires_at: Mapped[datetime] = mapped_column(DATETIME, nullable=True)
 	created_at: Mapped[datetime] = mapped_column(
 		DATETIME, nullable=False, default=lambda: datetime.now(UTC)
 	)
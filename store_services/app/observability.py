@@ -48,3 +48,73 @@ push_response_seconds = Gauge(
     "Time in seconds for push requests to central (latest)",
     registry=REGISTRY,
 )
+
+# Outbox compaction
+compacted_changes_total = Counter(
+    "store_compacted_changes_total",
+    "Pending changes folded into another push instead of being sent on their own",
+    registry=REGISTRY,
+)
+
+# Retries
+sync_dead_letter_total = Counter(
+    "store_sync_dead_letter_total",
+    "Pending changes moved to the dead-letter status after exhausting their retries",
+    registry=REGISTRY,
+)
+
+# Circuit breaker
+central_circuit_state = Gauge(
+    "store_central_circuit_state",
+    "State of the circuit breaker around central (0 closed, 1 half-open, 2 open)",
+    registry=REGISTRY,
+)
+
+# Conflict rebases
+sync_rebases_total = Counter(
+    "store_sync_rebases_total",
+    "Pushes sent again on central's version after a version conflict",
+    registry=REGISTRY,
+)
+sync_rebases_exhausted_total = Counter(
+    "store_sync_rebases_exhausted_total",
+    "Pushes still in conflict after the max number of rebases",
+    registry=REGISTRY,
+)
+sync_rebase_seconds = Gauge(
+    "store_sync_rebase_seconds",
+    "Time in seconds of a rebase push to central (latest)",
+    registry=REGISTRY,
+)
+
+# Group commit
+write_pipeline_commits_total = Counter(
+    "store_write_pipeline_commits_total",
+    "Transactions committed by the write pipeline",
+    registry=REGISTRY,
+)
+write_pipeline_batch_size = Gauge(
+    "store_write_pipeline_batch_size",
+    "Writes committed together by the write pipeline (latest)",
+    registry=REGISTRY,
+)
+
+# Partitioned sync
+sync_partition_backlog = Gauge(
+    "store_sync_partition_backlog",
+    "Changes waiting to be pushed in each sync partition (latest)",
+    ["partition"],
+    registry=REGISTRY,
+)
+sync_partition_processed = Gauge(
+    "store_sync_partition_processed",
+    "Changes processed by the last run of each sync partition",
+    ["partition"],
+    registry=REGISTRY,
+)
+sync_partition_duration_seconds = Gauge(
+    "store_sync_partition_duration_seconds",
+    "Duration in seconds of the last run of each sync partition",
+    ["partition"],
+    registry=REGISTRY,
+)
@@ -1,10 +1,14 @@
+from datetime import UTC, datetime
 from logging import Logger
+from uuid import uuid4
 
 from fastapi import HTTPException, Request
-from sqlalchemy import lambda_stmt, select
+from sqlalchemy import bindparam, insert, lambda_stmt, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from models.models import Inventory, PendingChange
+from common.schemas import BatchUpdateItem, InventoryResponse, UpdateInventory
+from models.models import Inventory, PendingChange, SyncStatus
 
 
 async def get_inventory_by_sku(
@@ -16,14 +20,14 @@ async def get_inventory_by_sku(
 ) -> Inventory:
 	"""Get a single item by SKU with logger
 	Params:
-	    sku (str): Unique Identifier for the inventory
-	    db (AsyncSession)
-	    logger (Logger)
-	    request (Request)
+		sku (str): Unique Identifier for the inventory
+		db (AsyncSession)
+		logger (Logger)
+		request (Request)
 	Return:
-	    Iventory
+		Iventory
 	Raises:
-	    HTTPException"""
+		HTTPException"""
 	stmt = lambda_stmt(lambda: select(Inventory).where(Inventory.sku == sku))
 	if wait_update:
 		stmt += lambda s: s.with_for_update()
@@ -38,6 +42,154 @@ async def get_inventory_by_sku(
 	return item
 
 
+async def apply_local_delta(db: AsyncSession, sku: str, delta: int) -> Inventory | None:
+	"""Add `delta` to the quantity of a SKU and bump its version, in one
+	conditional UPDATE ... RETURNING. Nothing is committed.
+	Params:
+		sku (str): Unique Identifier for the inventory
+		delta (int): Quantity to add, negative for a sale
+		db (AsyncSession)
+	Return:
+		Inventory | None: The updated row, None if the SKU doesn't exist or the
+		quantity would go below zero"""
+	stmt = (
+		update(Inventory)
+		.where(Inventory.sku == sku, Inventory.quantity + delta >= 0)
+		.values(
+			quantity=Inventory.quantity + delta,
+			version=Inventory.version + 1,
+			updated_at=datetime.now(UTC),
+		)
+		.returning(Inventory)
+		.execution_options(synchronize_session=False, populate_existing=True)
+	)
+	result = await db.execute(stmt)
+	return result.scalar_one_or_none()
+
+
+async def record_local_update(
+	db: AsyncSession, sku: str, payload: UpdateInventory
+) -> Inventory | None:
+	"""Apply a local update and queue its change for central sync, in the
+	current transaction. Nothing is committed.
+	Params:
+		sku (str): Unique Identifier for the inventory
+		payload (UpdateInventory)
+		db (AsyncSession)
+	Return:
+		Inventory | None: The updated row, None if nothing was written (see
+		`apply_local_delta`)"""
+	item = await apply_local_delta(db=db, sku=sku, delta=payload.delta)
+	if item is None:
+		return None
+	db.add(
+		PendingChange(
+			operation_id=payload.operation_id or str(uuid4()),
+			inventory_id=item.id,
+			sku=item.sku,
+			delta=payload.delta,
+			local_version=item.version,
+			central_version=payload.version,
+			status=SyncStatus.PENDING.value,
+		)
+	)
+	return item
+
+
+async def apply_local_batch(
+	db: AsyncSession, items: list[BatchUpdateItem]
+) -> list[InventoryResponse]:
+	"""Apply every line of a basket in one transaction, or none of them.
+
+	The SKUs are read with one query and the lines are checked in memory. Then
+	one executemany UPDATE, guarded by the versions that were read, and one bulk
+	INSERT of the outbox rows are executed. Lines of the same SKU are applied in
+	order. Nothing is committed: on error the caller drops the transaction.
+	Params:
+		items (list[BatchUpdateItem]): Lines of the basket
+		db (AsyncSession)
+	Return:
+		list[InventoryResponse]: State of the SKU after each line
+	Raises:
+		HTTPException: 404 if a SKU doesn't exist, 400 if a line lacks stock, 409
+		if a SKU changed while the batch was applied or an operation_id is taken"""
+	if len({item.operation_id for item in items}) != len(items):
+		raise HTTPException(status_code=400, detail="Duplicate operation_id in the batch")
+	now = datetime.now(UTC)
+	result = await db.execute(
+		select(Inventory).where(Inventory.sku.in_({item.sku for item in items}))
+	)
+	rows = {row.sku: row for row in result.scalars()}
+	missing = next((item.sku for item in items if item.sku not in rows), None)
+	if missing is not None:
+		raise HTTPException(status_code=404, detail=f"SKU not found: {missing}")
+
+	state = {sku: InventoryResponse.model_validate(row) for sku, row in rows.items()}
+	lines: list[InventoryResponse] = []
+	changes = []
+	for index, item in enumerate(items):
+		current = state[item.sku]
+		new_qty = current.quantity + item.delta
+		if new_qty < 0:
+			raise HTTPException(
+				status_code=400,
+				detail=f"Insufficient quantity for line {index} ({item.sku}). Available: {current.quantity}, requested: {abs(item.delta)}",
+			)
+		current = current.model_copy(
+			update={"quantity": new_qty, "version": current.version + 1, "updated_at": now}
+		)
+		state[item.sku] = current
+		lines.append(current)
+		changes.append({
+			"operation_id": item.operation_id,
+			"inventory_id": current.id,
+			"sku": item.sku,
+			"delta": item.delta,
+			"local_version": current.version,
+			"central_version": item.version,
+			"status": SyncStatus.PENDING.value,
+			"created_at": now,
+			"updated_at": now,
+		})
+
+	inventory_table = Inventory.__table__
+	updates = [
+		{
+			"_id": rows[sku].id,
+			"_version": rows[sku].version,
+			"_quantity": final.quantity,
+			"_new_version": final.version,
+			"_updated_at": now,
+		}
+		for sku, final in state.items()
+		if final.version != rows[sku].version
+	]
+	updated = await db.execute(
+		update(inventory_table)
+		.where(
+			inventory_table.c.id == bindparam("_id"),
+			inventory_table.c.version == bindparam("_version"),
+		)
+		.values(
+			quantity=bindparam("_quantity"),
+			version=bindparam("_new_version"),
+			updated_at=bindparam("_updated_at"),
+		),
+		updates,
+	)
+	if updated.rowcount >= 0 and updated.rowcount != len(updates):
+		raise HTTPException(
+			status_code=409, detail="Inventory changed while applying the batch, retry"
+		)
+	try:
+		await db.execute(insert(PendingChange), changes)
+	except IntegrityError as e:
+		raise HTTPException(
+			status_code=409, detail="operation_id already used by another change"
+		) from e
+	return lines
+
+
 async def get_pending_change(db: AsyncSession, operation_id: str) -> PendingChange:
 	stmt = lambda_stmt(
 		lambda: select(PendingChange).where(PendingChange.operation_id == operation_id)
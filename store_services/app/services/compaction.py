@@ -0,0 +1,70 @@
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from uuid import NAMESPACE_URL, uuid5
+
+from models.models import PendingChange
+
+# Namespace of the operation ids given to compacted pushes
+COMPACTION_NAMESPACE = uuid5(NAMESPACE_URL, "store-services/compaction")
+
+
+@dataclass(slots=True)
+class CompactedPush:
+	"""Several pending changes of one SKU sent to central as a single net delta."""
+
+	sku: str
+	inventory_id: int
+	# Central version expected by the oldest change of the group
+	central_version: int | None
+	changes: list[PendingChange] = field(default_factory=list)
+	operation_id: str | None = None
+
+	@property
+	def delta(self) -> int:
+		return sum(change.delta for change in self.changes)
+
+	@property
+	def change_ids(self) -> list[int]:
+		return [change.id for change in self.changes]
+
+
+def push_operation_id(changes: list[PendingChange]) -> str:
+	"""Idempotency key of the push carrying `changes`.
+
+	A single change keeps its own operation_id. A group gets a uuid5 of its
+	members, so the same group always gets the same key.
+	"""
+	if len(changes) == 1:
+		return changes[0].operation_id
+	members = ",".join(sorted(change.operation_id for change in changes))
+	return str(uuid5(COMPACTION_NAMESPACE, members))
+
+
+def compact_changes(changes: Iterable[PendingChange]) -> list[CompactedPush]:
+	"""Fold the pending changes of each SKU into one push with their net delta.
+
+	`changes` must be ordered by creation. Changes already tied to a push by an
+	earlier attempt keep that group, so a retry reuses the idempotency key
+	central may have already applied. A group that comes back without all of
+	its members gets the key of the members it has: central would answer the
+	old key as `replayed` and the missing members' delta would be lost.
+	Params:
+		changes (Iterable[PendingChange])
+	Return:
+		list[CompactedPush]: One push per group, in order of their first change
+	"""
+	groups: dict[tuple[str, str | None], CompactedPush] = {}
+	for change in changes:
+		key = (change.sku, change.push_operation_id)
+		push = groups.get(key)
+		if push is None:
+			push = groups[key] = CompactedPush(
+				sku=change.sku,
+				inventory_id=change.inventory_id,
+				central_version=change.central_version,
+			)
+		push.changes.append(change)
+	for push in groups.values():
+		# The key is derived from the members, so a partial group never matches
+		push.operation_id = push_operation_id(push.changes)
+	return list(groups.values())
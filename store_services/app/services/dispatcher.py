@@ -0,0 +1,66 @@
+import asyncio
+import logging
+from collections import deque
+from collections.abc import Awaitable, Callable, Iterable
+from operator import attrgetter
+
+logger = logging.getLogger(__name__)
+
+
+class SkuOrderedDispatcher[T]:
+	"""Run `handler` on many items at once, but on the items of one SKU in order.
+
+	Every SKU gets a FIFO of its items. FIFOs are drained concurrently, with at
+	most `concurrency` handlers running at a time, and each FIFO runs its next
+	item only once the previous one is done. A slow item only holds up the later
+	items of its own SKU.
+
+	.. code-block:: python
+		dispatcher = SkuOrderedDispatcher(push_change, concurrency=5)
+		results = await dispatcher.run(changes)
+	"""
+
+	def __init__(
+		self,
+		handler: Callable[[T], Awaitable[bool]],
+		concurrency: int,
+		key: Callable[[T], str] = attrgetter("sku"),
+	) -> None:
+		self.handler = handler
+		self.concurrency = max(1, concurrency)
+		self.key = key
+
+	async def run(self, items: Iterable[T]) -> list[bool]:
+		"""Run the handler on every item.
+
+		If the handler fails (returns False or raises), the later items of that
+		SKU are skipped so they are never applied before it; they keep their
+		lease and are picked up by a later run, after the failed one.
+		Params:
+			items (Iterable[T]): Items ordered by creation
+		Return:
+			list[bool]: Result of the handler for each item, False when skipped
+		"""
+		items = list(items)
+		results = [False] * len(items)
+		fifos: dict[str, deque[int]] = {}
+		for index, item in enumerate(items):
+			fifos.setdefault(self.key(item), deque()).append(index)
+		semaphore = asyncio.Semaphore(self.concurrency)
+
+		async def drain(key: str, fifo: deque[int]) -> None:
+			while fifo:
+				index = fifo.popleft()
+				try:
+					async with semaphore:
+						results[index] = await self.handler(items[index])
+				except Exception:
+					logger.exception(f"Dispatch of SKU {key} failed, {len(fifo)} later items skipped")
+					return
+				if not results[index]:
+					if fifo:
+						logger.warning(f"Dispatch of SKU {key} failed, {len(fifo)} later items skipped")
+					return
+
+		await asyncio.gather(*(drain(key, fifo) for key, fifo in fifos.items()))
+		return results
@@ -1,139 +1,380 @@
-import asyncio
 import logging
-from collections.abc import Callable, Coroutine
-from datetime import UTC, datetime
-from typing import Any
+import os
+import random
+import socket
+import time
+from collections.abc import Sequence
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+from uuid import uuid4
 
 import httpx
+from sqlalchemy import update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from auth.client import get_service_token
-from common.schemas import UpdateInventory
+from auth.client import post_to_central
+from common.schemas import BulkSyncItemResult, UpdateInventory
+from core.circuit_breaker import CircuitOpenError
 from core.config import get_settings
 from core.db import session
+from core.http import central_breaker
+from core.write_pipeline import run_write
 from models.models import Inventory, PendingChange, SyncStatus
 from observability import (
+	compacted_changes_total,
 	inventory_count,
 	pending_changes_gauge,
 	push_response_seconds,
 	sync_attempts_total,
 	sync_conflicts_total,
+	sync_dead_letter_total,
 	sync_duration_seconds,
 	sync_failures_total,
+	sync_partition_backlog,
+	sync_partition_duration_seconds,
+	sync_partition_processed,
+	sync_rebase_seconds,
+	sync_rebases_exhausted_total,
+	sync_rebases_total,
 	sync_success_total,
 )
 
+from .compaction import CompactedPush, compact_changes
+from .dispatcher import SkuOrderedDispatcher
 from .sync_service_db import (
+	claim_pending_changes,
 	count,
+	count_backlog_by_partition,
+	get_inventories,
 	get_inventory,
-	get_pending_changes,
-	update_model,
+	update_models,
 )
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
 
-RETRY_DELAYS = [1, 2, 4, 8, 16, 32]  # Exponential backoff
+@dataclass(slots=True)
+class PushResult:
+	"""Outcome of pushing one pending change to central."""
 
+	success: bool
+	error: str | None = None
+	# Version central reported for the SKU
+	central_version: int | None = None
+	# Kind of error, stored as `last_error_class`
+	error_class: str | None = None
+	# Whether a later push can succeed
+	retryable: bool = False
 
-async def with_retry(
-	func_call: Callable[[], Coroutine[None, None, httpx.Response]],
-	max_retries: int = len(RETRY_DELAYS),
-) -> Any:
-	"""Execute a provided coroutine factory with exponential backoff retry.
 
-	`func_call` should be a zero-argument callable that returns an awaitable (e.g. a lambda).
-	"""
-	last_error = None
-	for i in range(max_retries):
-		try:
-			sync_attempts_total.inc()
-			return await func_call()
-		except httpx.HTTPStatusError as e:
-			if e.response.status_code == 409:
-				sync_conflicts_total.inc()
-				raise
-			if 400 <= e.response.status_code < 500:
-				sync_failures_total.inc()
-				raise
-			last_error = e
-		except Exception as e:
-			last_error = e
+def retry_delay(attempt: int) -> float:
+	"""Seconds before the next push of a change that failed `attempt` times.
+
+	Exponential backoff with full jitter, so changes that failed together don't
+	come back together."""
+	return random.uniform(0, min(settings.sync_retry_cap, settings.sync_retry_base * 2**attempt))
 
-		if i < len(RETRY_DELAYS):
-			delay = RETRY_DELAYS[i]
-			logger.warning(f"Retry {i + 1}/{max_retries} after {delay}s: {last_error}")
-			await asyncio.sleep(delay)
 
-	sync_failures_total.inc()
-	raise last_error
+def http_failure(status_code: int, error: str) -> PushResult:
+	"""PushResult of a push central answered with an error status."""
+	return PushResult(
+		False,
+		error,
+		error_class=f"http_{status_code}",
+		# 409: the batch raced another writer at central
+		retryable=status_code >= 500 or status_code in (401, 408, 409, 429),
+	)
 
 
-async def push_inventory_update(
-	db: AsyncSession, change: PendingChange
-) -> tuple[bool, str | None]:
-	"""Push a single inventory update to central. Returns (success, error_message)."""
+def failed_push(e: Exception) -> PushResult:
+	"""PushResult of a push that failed as a whole."""
+	if isinstance(e, CircuitOpenError):
+		return PushResult(False, str(e), error_class="circuit_open", retryable=True)
+	if isinstance(e, httpx.HTTPStatusError):
+		return http_failure(e.response.status_code, f"HTTP error: {str(e)}")
+	# Connection errors, timeouts and bad payloads
+	return PushResult(
+		False, f"Sync error: {str(e)}", error_class=type(e).__name__, retryable=True
+	)
+
+
+def conflict_version(response: httpx.Response) -> int | None:
+	"""Version of the SKU at central from the body of a 409 of /adjust."""
 	try:
-		token = await get_service_token()
-		headers = {
-			"Authorization": f"Bearer {token}",
-			"Idempotency-Key": change.operation_id,
-		}
+		body = response.json()
+	except ValueError:
+		return None
+	detail = body.get("detail", body) if isinstance(body, dict) else None
+	if not isinstance(detail, dict):
+		return None
+	return detail.get("current_state", {}).get("version")
+
+
+async def push_inventory_update(db: AsyncSession, change: PendingChange) -> PushResult:
+	"""Push a single inventory update to central with /adjust.
+
+	A version conflict is rebased on the version central reports and pushed
+	again, up to `sync_max_rebases` times. Every other failure is returned at
+	once: the retry is scheduled by `retry_values`, not waited for here."""
+	try:
+		headers = {"Idempotency-Key": change.operation_id}
 		item = await get_inventory(id=change.inventory_id, db=db)
-		update = UpdateInventory(
-			delta=change.delta,
-			version=change.central_version or item.version,
-			operation_id=change.operation_id,
-		)
-		async with httpx.AsyncClient() as client:
+		version = change.central_version or item.version
+		for rebase in range(settings.sync_max_rebases + 1):
+			update = UpdateInventory(
+				delta=change.delta,
+				version=version,
+				operation_id=change.operation_id,
+			)
 			start_push = datetime.now(UTC)
-			response: httpx.Response = await with_retry(
-				lambda: client.post(
-					f"{settings.central_url}v1/inventory/{change.sku}/adjust",
-					json={**update.model_dump(), **{"sku": item.sku}},
-					headers=headers,
-				)
+			sync_attempts_total.inc()
+			response: httpx.Response = await post_to_central(
+				f"{settings.central_url}v1/inventory/{change.sku}/adjust",
+				json={**update.model_dump(), **{"sku": item.sku}},
+				headers=headers,
 			)
 			try:
 				push_response_seconds.set(
 					(datetime.now(UTC) - start_push).total_seconds()
 				)
+				if rebase:
+					sync_rebase_seconds.set((datetime.now(UTC) - start_push).total_seconds())
 			except Exception:
 				pass
 			if response.status_code == 200:
 				sync_success_total.inc()
-				result = response.json()
-				await update_model(
-					model=Inventory,
-					id=change.inventory_id,
-					db=db,
-					update_values={
-						"version": result["version"],
-						"last_synced_at": datetime.now(UTC),
-					},
+				return PushResult(True, central_version=response.json()["version"])
+			if response.status_code != 409:
+				sync_failures_total.inc()
+				return http_failure(
+					response.status_code, f"Unexpected response: {response.status_code}"
 				)
-				return True, None
 
-			return False, f"Unexpected response: {response.status_code}"
+			# Rebase the delta on the version central reported and push again
+			sync_conflicts_total.inc()
+			fresh_version = conflict_version(response)
+			if fresh_version is None:
+				break
+			version = fresh_version
+			if rebase < settings.sync_max_rebases:
+				sync_rebases_total.inc()
 
+		sync_rebases_exhausted_total.inc()
+		return PushResult(
+			False, "Version conflict with central", version, "conflict", retryable=True
+		)
+
+	except Exception as e:
+		if not isinstance(e, CircuitOpenError):
+			sync_failures_total.inc()
+		return failed_push(e)
+
+
+async def push_inventory_batch(
+	db: AsyncSession, pushes: Sequence[CompactedPush]
+) -> dict[str, PushResult]:
+	"""Push several compacted changes to central with one bulk-sync request.
+
+	Each item of central's answer is mapped back to its push by operation_id.
+	Central answers 404 for the whole batch when one SKU is unknown: the pushes
+	are then sent again one per request, so only the unknown SKU fails.
+	Returns the result of every push, keyed by its operation_id.
+	"""
+	items = await get_inventories(ids=(p.inventory_id for p in pushes), db=db)
+	payload = {
+		"items": [
+			{
+				**UpdateInventory(
+					delta=push.delta,
+					version=push.central_version or items[push.inventory_id].version,
+					operation_id=push.operation_id,
+				).model_dump(),
+				"sku": push.sku,
+			}
+			for push in pushes
+		]
+	}
+	try:
+		start_push = datetime.now(UTC)
+		# A single attempt: failed changes are retried by the scheduler, see
+		# `process_batch`
+		sync_attempts_total.inc()
+		response = await post_to_central(
+			f"{settings.central_url}v1/inventory/bulk-sync", json=payload
+		)
+		push_response_seconds.set((datetime.now(UTC) - start_push).total_seconds())
+		response.raise_for_status()
+		results = [BulkSyncItemResult.model_validate(r) for r in response.json()]
 	except httpx.HTTPStatusError as e:
-		if e.response.status_code == 409:
-			error_data = e.response.json()
-			current = error_data.get("current_state", {})
-			if current.get("version"):
-				await update_model(
-					model=PendingChange,
-					id=change.id,
-					db=db,
-					update_values={"central_version": current["version"]},
-				)
-			sync_conflicts_total.inc()
-			return False, "Version conflict with central"
-		return False, f"HTTP error: {str(e)}"
+		sync_failures_total.inc()
+		if e.response.status_code != 404 or len(pushes) == 1:
+			return {p.operation_id: failed_push(e) for p in pushes}
+		# In order, so the pushes of a SKU keep their order
+		split: dict[str, PushResult] = {}
+		for push in pushes:
+			split.update(await push_inventory_batch(db, [push]))
+		return split
 	except Exception as e:
 		sync_failures_total.inc()
-		return False, f"Sync error: {str(e)}"
+		return {p.operation_id: failed_push(e) for p in pushes}
+
+	by_operation = {r.operation_id: r for r in results}
+	outcome: dict[str, PushResult] = {}
+	for push in pushes:
+		result = by_operation.get(push.operation_id)
+		if result is None:
+			sync_failures_total.inc()
+			outcome[push.operation_id] = PushResult(
+				False, "Missing from bulk-sync response", error_class="missing", retryable=True
+			)
+		elif result.status in ("applied", "replayed"):
+			sync_success_total.inc()
+			outcome[push.operation_id] = PushResult(True, central_version=result.version)
+		elif result.status == "conflict":
+			sync_conflicts_total.inc()
+			outcome[push.operation_id] = PushResult(
+				False,
+				"Version conflict with central",
+				central_version=result.version,
+				error_class="conflict",
+				retryable=True,
+			)
+		else:
+			sync_failures_total.inc()
+			outcome[push.operation_id] = PushResult(
+				False, result.detail or result.status, error_class=result.status
+			)
+	return outcome
+
+
+async def rebase_conflicts(
+	db: AsyncSession, pushes: Sequence[CompactedPush], results: dict[str, PushResult]
+) -> None:
+	"""Push again the pushes that hit a version conflict, on the version central
+	reported, up to `sync_max_rebases` times. `results` is updated in place."""
+	for _ in range(settings.sync_max_rebases):
+		conflicts = [
+			push
+			for push in pushes
+			if results[push.operation_id].error_class == "conflict"
+			and results[push.operation_id].central_version is not None
+		]
+		if not conflicts:
+			return
+		for push in conflicts:
+			push.central_version = results[push.operation_id].central_version
+		sync_rebases_total.inc(len(conflicts))
+		start = time.perf_counter()
+		results.update(await push_inventory_batch(db, conflicts))
+		sync_rebase_seconds.set(time.perf_counter() - start)
+	sync_rebases_exhausted_total.inc(
+		sum(1 for push in pushes if results[push.operation_id].error_class == "conflict")
+	)
+
+
+def retry_values(change: PendingChange, result: PushResult, now: datetime) -> dict:
+	"""Status and retry state of a change after a push.
+
+	Failed changes go back to pending until their next attempt is due, or to the
+	dead-letter status once `sync_max_attempts` pushes failed. Errors a retry
+	can't fix mark the change failed right away."""
+	if result.error_class == "circuit_open":
+		# Never reached central: back to pending without using an attempt
+		return {
+			"status": SyncStatus.PENDING.value,
+			"attempts": change.attempts or 0,
+			"next_attempt_at": None,
+			"last_error_class": result.error_class,
+		}
+	attempts = (change.attempts or 0) + 1
+	values = {
+		"attempts": attempts,
+		"next_attempt_at": None,
+		"last_error_class": result.error_class,
+	}
+	if result.success:
+		values["status"] = SyncStatus.COMPLETED.value
+	elif not result.retryable:
+		values["status"] = SyncStatus.FAILED.value
+	elif attempts >= settings.sync_max_attempts:
+		sync_dead_letter_total.inc()
+		values["status"] = SyncStatus.DEAD_LETTER.value
+	else:
+		values["status"] = SyncStatus.PENDING.value
+		values["next_attempt_at"] = now + timedelta(seconds=retry_delay(attempts))
+	return values
+
+
+async def process_batch(db: AsyncSession, pushes: Sequence[CompactedPush]) -> int:
+	"""Push a batch of compacted changes with bulk-sync and write the status of
+	every change back with one statement.
+
+	Groups whose deltas cancel out are completed locally without a push.
+	Returns the number of changes completed."""
+	# Tie each change to its push before sending it, so a retry after a lost
+	# response reuses the same idempotency key
+	now = datetime.now(UTC)
+	await update_models(
+		db=db,
+		model=PendingChange,
+		rows=[
+			{
+				"id": change.id,
+				"push_operation_id": push.operation_id,
+				"updated_at": now,
+			}
+			for push in pushes
+			for change in push.changes
+			if change.push_operation_id != push.operation_id
+		],
+	)
+	to_push = [push for push in pushes if push.delta != 0]
+	results = await push_inventory_batch(db, to_push) if to_push else {}
+	await rebase_conflicts(db, to_push, results)
+	for push in pushes:
+		if push.delta == 0:
+			results[push.operation_id] = PushResult(True)
+	compacted_changes_total.inc(sum(len(p.changes) for p in pushes) - len(to_push))
+
+	now = datetime.now(UTC)
+	change_rows = []
+	synced: dict[int, int] = {}
+	completed = 0
+	for push in pushes:
+		result = results[push.operation_id]
+		if result.success:
+			completed += len(push.changes)
+			if result.central_version is not None:
+				synced[push.inventory_id] = result.central_version
+		for change in push.changes:
+			change_rows.append({
+				"id": change.id,
+				**retry_values(change, result, now),
+				"error": result.error,
+				"central_version": (
+					result.central_version
+					if not result.success and result.central_version is not None
+					else change.central_version
+				),
+				"lease_owner": None,
+				"lease_expires_at": None,
+				"updated_at": now,
+			})
+
+	async def write_statuses(db: AsyncSession) -> None:
+		await db.execute(update(PendingChange), change_rows)
+		if synced:
+			await db.execute(
+				update(Inventory),
+				[
+					{"id": inventory_id, "version": version, "last_synced_at": now}
+					for inventory_id, version in synced.items()
+				],
+			)
+
+	await run_write(db, write_statuses)
+	return completed
 
 
 async def sync_pending_changes() -> None:
@@ -151,74 +392,103 @@ async def update_metrics(db: AsyncSession) -> None:
 		logger.exception("Failed to update metrics")
 
 async def process_change(db: AsyncSession, change: PendingChange) -> bool:
-	"""Process a single pending change. Returns True if processed successfully."""
+	"""Push a single claimed change and write its status with `retry_values`,
+	like the bulk path does, through the write pipeline. Returns True if central
+	applied the change."""
 	logger.info(f"Processing change {change.operation_id}")
-	try:
-		# Mark as in progress
-		await update_model(
-			model=PendingChange,
-			id=change.id,
-			db=db,
-			update_values={
-				"status": SyncStatus.IN_PROGRESS.value,
-				"updated_at": datetime.now(UTC),
-			},
-		)
+	result = await push_inventory_update(db, change)
+	now = datetime.now(UTC)
+	values = {
+		**retry_values(change, result, now),
+		"error": result.error,
+		"central_version": (
+			result.central_version
+			if not result.success and result.central_version is not None
+			else change.central_version
+		),
+		"lease_owner": None,
+		"lease_expires_at": None,
+		"updated_at": now,
+	}
 
-		success, error = await push_inventory_update(db, change)
-
-		# Update final status
-		await update_model(
-			model=PendingChange,
-			id=change.id,
-			db=db,
-			update_values={
-				"status": SyncStatus.COMPLETED.value if success else SyncStatus.FAILED.value,
-				"error": error,
-				"updated_at": datetime.now(UTC),
-			},
+	async def write_status(db: AsyncSession) -> None:
+		await db.execute(
+			update(PendingChange).where(PendingChange.id == change.id).values(values)
 		)
+		if result.success and result.central_version is not None:
+			await db.execute(
+				update(Inventory)
+				.where(Inventory.id == change.inventory_id)
+				.values(version=result.central_version, last_synced_at=now)
+			)
 
-		return True
+	await run_write(db, write_status)
+	return result.success
 
-	except Exception:
-		logger.exception(f"Error processing change {change.operation_id}")
-		await update_model(
-			model=PendingChange,
-			id=change.id,
-			db=db,
-			update_values={
-				"status": SyncStatus.FAILED.value,
-				"error": "internal error",
-				"updated_at": datetime.now(UTC),
-			},
-		)
-		return False
 
-async def process_pending_once() -> int:
-	"""Process a batch of pending changes once. Returns number processed."""
+async def process_change_in_session(change: PendingChange) -> bool:
+	"""Process a single pending change on a session of its own, so concurrent
+	pushes don't share one."""
+	async with session() as db:
+		return await process_change(db, change)
+
+
+async def process_changes(db: AsyncSession, changes: Sequence[PendingChange]) -> int:
+	"""Push one page of pending changes. Returns number processed."""
+	processed = 0
+	if settings.sync_bulk_enabled:
+		pushes = compact_changes(changes)
+		for i in range(0, len(pushes), settings.sync_batch_size):
+			batch = pushes[i:i + settings.sync_batch_size]
+			processed += await process_batch(db, batch)
+		return processed
+
+	# Different SKUs are pushed concurrently, the changes of a SKU in order
+	dispatcher = SkuOrderedDispatcher(
+		process_change_in_session, concurrency=settings.sync_push_concurrency
+	)
+	results = await dispatcher.run(changes)
+	return sum(1 for r in results if r)
+
+
+def worker_id() -> str:
+	"""Unique id of a sync run, used as the owner of the changes it claims."""
+	return f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+
+
+async def process_pending_once(partition: int | None = None) -> int:
+	"""Process pending changes. Returns number processed.
+
+	Changes are leased to this run page after page, so several workers can drain
+	the outbox at the same time without pushing a change twice. With SYNC_DRAIN
+	pages are claimed until a page comes back short; otherwise only the oldest
+	page is processed. The run stops early, leaving changes pending, while the
+	circuit to central is open. With a `partition`, only the SKUs of that
+	partition (out of SYNC_PARTITIONS) are claimed."""
 	processed = 0
 	logger.info("Looking for changes")
 	start = datetime.now(UTC)
+	owner = worker_id()
+	claim_partition = None if partition is None else (partition, settings.sync_partitions)
 	async with session() as db:
 		try:
-			# Get pending changes and update metrics
-			changes = await get_pending_changes(db=db, status=SyncStatus.PENDING)
-			logger.info(changes)
 			await update_metrics(db)
-
-			if not changes:
-				return 0
-
-			# Process changes concurrently in small batches
-			batch_size = 5  # Adjust based on your needs
-			for i in range(0, len(changes), batch_size):
-				batch = changes[i:i + batch_size]
-				results = await asyncio.gather(
-					*[process_change(db, change) for change in batch],
-					return_exceptions=False
+			while not central_breaker.is_open:
+				changes = await run_write(
+					db,
+					lambda s: claim_pending_changes(
+						db=s,
+						owner=owner,
+						lease_seconds=settings.sync_lease_seconds,
+						limit=settings.sync_page_size,
+						partition=claim_partition,
+					),
 				)
-				processed += sum(1 for r in results if r)
+				if not changes:
+					break
+				processed += await process_changes(db, changes)
+				if not settings.sync_drain or len(changes) < settings.sync_page_size:
+					break
 
 		except Exception:
 			logger.exception("Error in single-run sync")
@@ -227,7 +497,27 @@ async def process_pending_once() -> int:
 			try:
 				elapsed = (datetime.now(UTC) - start).total_seconds()
 				sync_duration_seconds.set(float(elapsed))
+				if partition is not None:
+					sync_partition_duration_seconds.labels(partition=str(partition)).set(elapsed)
+					sync_partition_processed.labels(partition=str(partition)).set(processed)
 			except Exception:
 				logger.exception("Failed to record sync duration")
 
 	return processed
+
+
+async def partition_backlog() -> dict[int, int]:
+	"""Count the changes waiting in every sync partition and publish the counts.
+
+	Used by the coordinator to only start the partitions with work to do.
+	Return:
+		dict[int, int]: Backlog keyed by partition, for all SYNC_PARTITIONS
+	"""
+	partitions = settings.sync_partitions
+	async with session() as db:
+		await update_metrics(db)
+		counts = await count_backlog_by_partition(db=db, partitions=partitions)
+	backlog = {partition: counts.get(partition, 0) for partition in range(partitions)}
+	for partition, total in backlog.items():
+		sync_partition_backlog.labels(partition=str(partition)).set(total)
+	return backlog
@@ -1,7 +1,8 @@
-from collections.abc import Sequence
+from collections.abc import Iterable
+from datetime import UTC, datetime, timedelta
 
 from fastapi import HTTPException
-from sqlalchemy import func, lambda_stmt, select, update
+from sqlalchemy import and_, func, lambda_stmt, or_, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from models.models import Inventory, PendingChange, SyncStatus
@@ -10,12 +11,12 @@ from models.models import Inventory, PendingChange, SyncStatus
 async def get_inventory(id: int, db: AsyncSession) -> Inventory:
 	"""Get product of the inventory using the id
 	Params:
-	    id (int): Id of the product in the inventory
-	    db (AsyncSession)
+		id (int): Id of the product in the inventory
+		db (AsyncSession)
 	Return:
-	    Inventory
+		Inventory
 	Raises:
-	    NoResultFound: If not result is found
+		NoResultFound: If not result is found
 	"""
 	stmt = lambda_stmt(lambda: select(Inventory).where(Inventory.id == id))
 	result = await db.execute(stmt)
@@ -25,27 +26,149 @@ async def get_inventory(id: int, db: AsyncSession) -> Inventory:
 async def update_model(id: int, db: AsyncSession, update_values: dict, model) -> None:
 	"""Update any model where the main filter is the id
 	Params:
-	    model (SqlAlchemyModel)
-	    update_values (dict): Dictionary with the fields to update
-	    db (AsyncSession)
-	    id (int): Id of the model to update
+		model (SqlAlchemyModel)
+		update_values (dict): Dictionary with the fields to update
+		db (AsyncSession)
+		id (int): Id of the model to update
 	Return:
-	    None
+		None
 	"""
 	stmt = update(model).where(model.id == id).values(**update_values)
 	await db.execute(stmt)
 	await db.commit()
 
 
-async def get_pending_changes(db: AsyncSession, status: SyncStatus) -> Sequence[PendingChange]:
-	_status = status.value
-	stmt = (select(PendingChange)
-		.where(PendingChange.status == _status)
-		.order_by(PendingChange.created_at)
-		.limit(100))
+async def get_inventories(ids: Iterable[int], db: AsyncSession) -> dict[int, Inventory]:
+	"""Get several products of the inventory with a single query
+	Params:
+		ids (Iterable[int]): Ids of the products, duplicates are ignored
+		db (AsyncSession)
+	Return:
+		dict[int, Inventory]: Products keyed by id
+	"""
+	unique_ids = list(dict.fromkeys(ids))
+	if not unique_ids:
+		return {}
+	result = await db.execute(select(Inventory).where(Inventory.id.in_(unique_ids)))
+	return {item.id: item for item in result.scalars()}
+
+
+async def update_models(db: AsyncSession, rows: list[dict], model) -> None:
+	"""Update many rows of a model in one executemany statement and commit
+	Params:
+		model (SqlAlchemyModel)
+		rows (list[dict]): One dictionary per row, with the `id` and the fields
+		to update
+		db (AsyncSession)
+	Return:
+		None
+	"""
+	if rows:
+		await db.execute(update(model), rows)
+	await db.commit()
+
+
+async def claim_pending_changes(
+	db: AsyncSession,
+	owner: str,
+	lease_seconds: int,
+	limit: int = 100,
+	now: datetime | None = None,
+	partition: tuple[int, int] | None = None,
+) -> list[PendingChange]:
+	"""Lease the oldest claimable changes to `owner` with one UPDATE ... RETURNING.
 
+	Doesn't commit: run it through `run_write`, which commits the claim.
+
+	Pending changes whose retry is due and changes whose lease expired can be
+	claimed. A SKU with a change leased to another worker, or waiting for its
+	retry, is skipped as a whole, so the changes of one SKU are always pushed in
+	order by a single worker. Changes tied to a compacted push by an earlier
+	attempt are claimed with every other member of that push, even past `limit`,
+	so the group is never retried in part under its idempotency key.
+	Params:
+		owner (str): Id of the worker claiming the changes
+		lease_seconds (int): Seconds the changes stay owned by `owner`
+		limit (int): Max number of changes claimed
+		partition (tuple[int, int] | None): (index, partitions), only claim the
+		SKUs of that partition
+		db (AsyncSession)
+	Return:
+		list[PendingChange]: Claimed changes, oldest first
+	"""
+	now = now or datetime.now(UTC)
+	leased = PendingChange.status == SyncStatus.IN_PROGRESS.value
+	pending = PendingChange.status == SyncStatus.PENDING.value
+	due = or_(PendingChange.next_attempt_at.is_(None), PendingChange.next_attempt_at <= now)
+	claimable = or_(
+		and_(pending, due),
+		and_(leased, PendingChange.lease_expires_at < now),
+	)
+	busy_skus = select(PendingChange.sku).where(
+		or_(
+			and_(leased, PendingChange.lease_expires_at >= now),
+			# A change waiting for its retry holds back the later ones of its SKU
+			and_(pending, PendingChange.next_attempt_at > now),
+		)
+	)
+	if partition is not None:
+		index, partitions = partition
+		claimable = and_(claimable, func.sku_partition(PendingChange.sku, partitions) == index)
+	claimable = and_(claimable, PendingChange.sku.not_in(busy_skus))
+	page = (
+		select(PendingChange.id, PendingChange.push_operation_id)
+		.where(claimable)
+		.order_by(PendingChange.created_at, PendingChange.id)
+		.limit(limit)
+		.subquery()
+	)
+	claim_ids = select(PendingChange.id).where(
+		claimable,
+		or_(
+			PendingChange.id.in_(select(page.c.id)),
+			PendingChange.push_operation_id.in_(
+				select(page.c.push_operation_id).where(page.c.push_operation_id.is_not(None))
+			),
+		),
+	)
+	stmt = (
+		update(PendingChange)
+		.where(PendingChange.id.in_(claim_ids))
+		.values(
+			status=SyncStatus.IN_PROGRESS.value,
+			lease_owner=owner,
+			lease_expires_at=now + timedelta(seconds=lease_seconds),
+			updated_at=now,
+		)
+		.returning(PendingChange)
+		.execution_options(synchronize_session=False)
+	)
+	result = await db.scalars(stmt)
+	return sorted(result.all(), key=lambda c: (c.created_at, c.id))
+
+
+async def count_backlog_by_partition(db: AsyncSession, partitions: int) -> dict[int, int]:
+	"""Count the changes waiting to be pushed in each partition
+	Params:
+		partitions (int): Number of partitions
+		db (AsyncSession)
+	Return:
+		dict[int, int]: Pending and in-progress changes keyed by partition,
+		partitions without changes are left out
+	"""
+	partition = func.sku_partition(PendingChange.sku, partitions)
+	stmt = (
+		select(partition, func.count())
+		.where(
+			PendingChange.status.in_(
+				[SyncStatus.PENDING.value, SyncStatus.IN_PROGRESS.value]
+			)
+		)
+		.group_by(partition)
+	)
 	result = await db.execute(stmt)
-	return result.scalars().all()
+	return dict(result.all())
+
 
 async def get_pending_change_by_sku(db: AsyncSession, sku: str) -> str:
 	stmt = lambda_stmt(
@@ -0,0 +1,54 @@
+import asyncio
+import logging
+import time
+
+from core.config import get_settings
+
+from .sync_service import process_pending_once
+
+try:
+	from celery_tools.celery_tasks.tasks import process_pending_once_task
+	CELERY_AVAILABLE = True
+except Exception:
+	process_pending_once_task = None
+	CELERY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Monotonic time of the sync already scheduled by a previous write
+_scheduled_at: float | None = None
+_background_tasks: set[asyncio.Task] = set()
+
+
+def _run_in_background() -> None:
+	task = asyncio.create_task(process_pending_once())
+	_background_tasks.add(task)
+	task.add_done_callback(_background_tasks.discard)
+
+
+async def request_sync() -> None:
+	"""Schedule a sync `sync_trigger_debounce` seconds after a local write.
+
+	Writes made before the scheduled sync starts are carried by it, so a burst of
+	writes triggers one sync. The Celery beat schedule stays as a safety net for
+	writes whose trigger is lost. Async so a background task runs it on the
+	event loop, which the sync runs on when Celery is not available.
+	"""
+	global _scheduled_at
+	debounce = settings.sync_trigger_debounce
+	if debounce <= 0:
+		return
+	now = time.monotonic()
+	if _scheduled_at is not None and _scheduled_at > now:
+		return
+	_scheduled_at = now + debounce
+	try:
+		if CELERY_AVAILABLE and process_pending_once_task:
+			# Queue picked by CELERY_TASK_ROUTES; publishing blocks on the broker
+			await asyncio.to_thread(process_pending_once_task.apply_async, countdown=debounce)
+		else:
+			asyncio.get_running_loop().call_later(debounce, _run_in_background)
+	except Exception:
+		_scheduled_at = None
+		logger.exception("Failed to schedule a sync after a local write")
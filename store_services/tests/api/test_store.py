@@ -1,17 +1,18 @@
 from datetime import UTC, datetime
 from logging import Logger
-from unittest.mock import AsyncMock, MagicMock, Mock, patch
+from unittest.mock import MagicMock, Mock, patch
 from uuid import uuid4
 
 import pytest
 from fastapi.testclient import TestClient
 
-from app.api.store import get_db
+from api.store import get_db
 from app.common.schemas import InventoryResponse, UpdateInventory
 from app.main import app
 from app.models.models import Inventory, PendingChange
 
-PATH = "app.api.store"
+# Module object the app routes come from (`pythonpath` has `app`)
+PATH = "api.store"
 client = TestClient(app=app)
 
 
@@ -71,6 +72,9 @@ def test_get_inventory_500_error(mock_logger, db):
 
 @patch(f"{PATH}.logger", spec=Logger)
 def test_update_inventory_0_quantity(mock_logger, db):
+	# The conditional update matches nothing, the follow-up read explains why
+	mock_no_row = Mock()
+	mock_no_row.scalar_one_or_none.return_value = None
 	mock_result = Mock()
 	mock_result.scalar_one_or_none.return_value = Inventory(
 		id=1,
@@ -80,7 +84,7 @@ def test_update_inventory_0_quantity(mock_logger, db):
 		version=1,
 		updated_at=datetime.now(UTC),
 	)
-	db.execute.return_value = mock_result
+	db.execute.side_effect = [mock_no_row, mock_result]
 	app.dependency_overrides[get_db] = lambda: db
 	payload = UpdateInventory(delta=-1, version=1, operation_id=str(uuid4()))
 	response = client.post("/v1/local/inventory/abc/update", json=payload.model_dump())
@@ -91,19 +95,23 @@ def test_update_inventory_0_quantity(mock_logger, db):
 	app.dependency_overrides.clear()
 
 
+@patch(f"{PATH}.logger", spec=Logger)
+def test_update_inventory_not_found(mock_logger, db):
+	mock_no_row = Mock()
+	mock_no_row.scalar_one_or_none.return_value = None
+	db.execute.return_value = mock_no_row
+	app.dependency_overrides[get_db] = lambda: db
+	payload = UpdateInventory(delta=-1, version=1, operation_id=str(uuid4()))
+	response = client.post("/v1/local/inventory/abc/update", json=payload.model_dump())
+	assert response.status_code == 404
+	app.dependency_overrides.clear()
+
+
+@patch(f"{PATH}.request_sync")
 @patch(f"{PATH}.logger")
-def test_update_inventory(mock_logger, db):
+def test_update_inventory(mock_logger, mock_request_sync, db):
 	mock_result = Mock()
 	mock_result.scalar_one_or_none.return_value = Inventory(
-		id=1,
-		sku="abc",
-		name="dummy",
-		quantity=1,
-		version=1,
-		updated_at=datetime.now(UTC),
-	)
-	mock_result_get = Mock()
-	mock_result_get.scalar_one.return_value = Inventory(
 		id=1,
 		sku="abc",
 		name="dummy",
@@ -111,32 +119,28 @@ def test_update_inventory(mock_logger, db):
 		version=2,
 		updated_at=datetime.now(UTC),
 	)
-	db.execute.side_effect = [mock_result, None, mock_result_get]
-	db.commit.side_effect = [AsyncMock(), AsyncMock()]
+	db.execute.return_value = mock_result
 	db.add.return_value = Mock()
 	app.dependency_overrides[get_db] = lambda: db
 	payload = UpdateInventory(delta=-1, version=1, operation_id=str(uuid4()))
 	response = client.post("/v1/local/inventory/abc/update", json=payload.model_dump())
 	assert response.json()["sku"] == "abc"
+	assert response.json()["version"] == 2
 	assert response.status_code == 200
-	assert db.execute.call_count == 3
+	# One UPDATE ... RETURNING and a single commit with the outbox row
+	assert db.execute.call_count == 1
+	db.commit.assert_awaited_once()
+	assert db.add.call_args.args[0].local_version == 2
+	mock_request_sync.assert_called_once()
 	app.dependency_overrides.clear()
 
 
+@patch(f"{PATH}.request_sync")
 @patch(f"{PATH}.logger")
 @patch(f"{PATH}.local_updates_total.inc", side_effect=Exception())
-def test_update_inventory_exception(mock_local_update, mock_logger, db):
+def test_update_inventory_exception(mock_local_update, mock_logger, mock_request_sync, db):
 	mock_result = Mock()
 	mock_result.scalar_one_or_none.return_value = Inventory(
-		id=1,
-		sku="abc",
-		name="dummy",
-		quantity=1,
-		version=1,
-		updated_at=datetime.now(UTC),
-	)
-	mock_result_get = Mock()
-	mock_result_get.scalar_one.return_value = Inventory(
 		id=1,
 		sku="abc",
 		name="dummy",
@@ -144,15 +148,14 @@ def test_update_inventory_exception(mock_local_update, mock_logger, db):
 		version=2,
 		updated_at=datetime.now(UTC),
 	)
-	db.execute.side_effect = [mock_result, None, mock_result_get]
-	db.commit.side_effect = [AsyncMock(), AsyncMock()]
+	db.execute.return_value = mock_result
 	db.add.return_value = Mock()
 	app.dependency_overrides[get_db] = lambda: db
 	payload = UpdateInventory(delta=-1, version=1, operation_id=str(uuid4()))
 	response = client.post("/v1/local/inventory/abc/update", json=payload.model_dump())
 	assert response.json()["sku"] == "abc"
 	assert response.status_code == 200
-	assert db.execute.call_count == 3
+	assert db.execute.call_count == 1
 	app.dependency_overrides.clear()
 
 
@@ -1,56 +1,76 @@
-from datetime import UTC, datetime, timedelta
+import asyncio
+import time
 from unittest.mock import AsyncMock, Mock, patch
 
 import httpx
 import pytest
 
-from app.auth.client import get_expired_token, get_service_token
+# The module the app imports (`pythonpath` has `app`), with the shared token
+from auth.client import get_service_token, post_to_central, token_manager
 
 
-@patch("app.auth.client.jwt")
-def test_get_expired_token_success(mock_jwt):
-	mock_jwt.decode.return_value = {
-		"exp": (datetime.now(UTC) + timedelta(minutes=1)).timestamp()
-	}
-	assert get_expired_token(token="dummy-token")
-
-
-@patch("app.auth.client.jwt")
-def test_get_expired_token_fail(mock_jwt):
-	mock_jwt.decode.return_value = {
-		"exp": (datetime.now(UTC) - timedelta(minutes=1)).timestamp()
-	}
-	assert not get_expired_token(token="dummy-token")
+def _token_response(token: str = "some-dummy-token") -> Mock:
+	mock_response = Mock()
+	mock_response.status_code = 200
+	mock_response.json.return_value = {"access_token": token, "token_type": "bearer"}
+	return mock_response
 
 
 @pytest.mark.asyncio
-@patch("app.auth.client.get_expired_token", return_value=False)
-@patch("app.auth.client._token_cache", "some-dummy-token")
-async def test_get_service_token_token_cache(override_settings):
+@patch("auth.client.jwt")
+@patch("auth.client.get_http_client")
+async def test_get_service_token(MockAsyncHttp, mock_jwt, override_settings):
+	mock_jwt.decode.return_value = {"exp": time.time() + 600}
+	mocked_async_client = AsyncMock()
+	mocked_async_client.post = AsyncMock(return_value=_token_response())
+	MockAsyncHttp.return_value = mocked_async_client
+
 	token = await get_service_token()
 	assert token == "some-dummy-token"
+	# The cached token is checked against the stored expiry, not decoded again
+	assert await get_service_token() == "some-dummy-token"
+	assert mocked_async_client.post.await_count == 1
+	assert mock_jwt.decode.call_count == 1
 
 
 @pytest.mark.asyncio
-@patch("app.auth.client.get_expired_token", return_value=False)
-@patch("app.auth.client.httpx.AsyncClient")
-async def test_get_service_token(MockAsyncHttp, override_settings):
-	mock_response = Mock()
-	mock_response.status_code = 200
-	mock_response.json.return_value = {
-		"access_token": "some-dummy-token",
-		"token_type": "bearer",
-	}
+@patch("auth.client.jwt")
+@patch("auth.client.get_http_client")
+async def test_get_service_token_single_flight(MockAsyncHttp, mock_jwt, override_settings):
+	mock_jwt.decode.return_value = {"exp": time.time() + 600}
+
+	async def slow_post(*args, **kwargs):
+		await asyncio.sleep(0.01)
+		return _token_response()
+
 	mocked_async_client = AsyncMock()
-	mocked_async_client.post = AsyncMock(return_value=mock_response)
-	MockAsyncHttp.return_value.__aenter__.return_value = mocked_async_client
-	token = await get_service_token()
-	assert token == "some-dummy-token"
+	mocked_async_client.post = AsyncMock(side_effect=slow_post)
+	MockAsyncHttp.return_value = mocked_async_client
+
+	tokens = await asyncio.gather(*(get_service_token() for _ in range(5)))
+	assert set(tokens) == {"some-dummy-token"}
+	assert mocked_async_client.post.await_count == 1
 
 
 @pytest.mark.asyncio
-@patch("app.auth.client.get_expired_token", return_value=False)
-@patch("app.auth.client.httpx.AsyncClient")
+@patch("auth.client.jwt")
+@patch("auth.client.get_http_client")
+async def test_get_service_token_refreshes_before_expiry(MockAsyncHttp, mock_jwt, override_settings):
+	mock_jwt.decode.return_value = {"exp": time.time() + 600}
+	mocked_async_client = AsyncMock()
+	mocked_async_client.post = AsyncMock(return_value=_token_response("new-token"))
+	MockAsyncHttp.return_value = mocked_async_client
+	token_manager._token = "old-token"
+	token_manager._expires_at = time.time() + token_manager.refresh_margin / 2
+
+	# Still valid: returned right away while the refresh runs
+	assert await get_service_token() == "old-token"
+	await token_manager._refresh
+	assert await get_service_token() == "new-token"
+
+
+@pytest.mark.asyncio
+@patch("auth.client.get_http_client")
 async def test_get_service_token_raise_status(MockAsyncHttp, override_settings):
 	mocked_async_client = AsyncMock()
 	mocked_async_client.post = AsyncMock(
@@ -61,6 +81,26 @@ async def test_get_service_token_raise_status(MockAsyncHttp, override_settings):
 		)
 	)
 
-	MockAsyncHttp.return_value.__aenter__.return_value = mocked_async_client
+	MockAsyncHttp.return_value = mocked_async_client
 	with pytest.raises(httpx.HTTPStatusError):
 		await get_service_token()
+
+
+@pytest.mark.asyncio
+@patch("auth.client.get_http_client")
+async def test_post_to_central_refreshes_on_401(MockAsyncHttp, override_settings):
+	token_manager._token = "stale-token"
+	token_manager._expires_at = time.time() + 600
+	mocked_async_client = AsyncMock()
+	mocked_async_client.post = AsyncMock(
+		side_effect=[Mock(status_code=401), Mock(status_code=200)]
+	)
+	MockAsyncHttp.return_value = mocked_async_client
+
+	with patch.object(token_manager, "_fetch", AsyncMock(return_value="fresh-token")) as mock_fetch:
+		response = await post_to_central("http://dummy-central/v1", json={})
+
+	assert response.status_code == 200
+	mock_fetch.assert_awaited_once()
+	headers = mocked_async_client.post.call_args.kwargs["headers"]
+	assert headers["Authorization"] == "Bearer fresh-token"
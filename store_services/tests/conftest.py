@@ -44,11 +44,23 @@ def reset_patches():
 @pytest.fixture(autouse=True)
 def reset_cache_get_service_token():
 	"""Ensure all patches are cleaned up between tests"""
-	import app.auth.client
+	from auth.client import token_manager
 
-	app.auth.client._token_cache = None
+	token_manager.invalidate()
+	token_manager._refresh = None
 	yield
-	app.auth.client._token_cache = None
+	token_manager.invalidate()
+	token_manager._refresh = None
+
+
+@pytest.fixture(autouse=True)
+def reset_central_breaker():
+	"""Every test starts with the circuit to central closed"""
+	from core.http import central_breaker
+
+	central_breaker.reset()
+	yield
+	central_breaker.reset()
 
 
 @pytest.fixture(scope="function")
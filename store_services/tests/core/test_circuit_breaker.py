@@ -0,0 +1,78 @@
+import asyncio
+from unittest.mock import AsyncMock, Mock, patch
+
+import httpx
+import pytest
+
+from app.core.circuit_breaker import CircuitBreaker, CircuitOpenError, CircuitState
+
+
+def _breaker(**kwargs) -> CircuitBreaker:
+	return CircuitBreaker("test", **{"failure_threshold": 2, "reset_timeout": 10, **kwargs})
+
+
+def test_opens_on_consecutive_failures():
+	breaker = _breaker()
+	breaker.record_failure()
+	assert breaker.state is CircuitState.CLOSED
+	breaker.record_failure()
+	assert breaker.state is CircuitState.OPEN
+	with pytest.raises(CircuitOpenError):
+		breaker.allow()
+
+
+def test_opens_on_error_rate():
+	breaker = _breaker(failure_threshold=10, window=4, error_rate=0.5)
+	for success in (True, False, True, False):
+		breaker.record_success() if success else breaker.record_failure()
+	assert breaker.state is CircuitState.CLOSED
+	breaker.record_failure()
+	assert breaker.state is CircuitState.OPEN
+
+
+def test_half_open_probe():
+	breaker = _breaker()
+	breaker.record_failure()
+	breaker.record_failure()
+	with patch("app.core.circuit_breaker.time.monotonic", return_value=breaker._opened_at + 11):
+		assert breaker.state is CircuitState.HALF_OPEN
+		breaker.allow()
+		# Only one probe at a time
+		with pytest.raises(CircuitOpenError):
+			breaker.allow()
+		breaker.record_success()
+	assert breaker.state is CircuitState.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_call_counts_server_errors_only():
+	breaker = _breaker()
+	not_found = AsyncMock(return_value=Mock(status_code=404))
+	server_error = AsyncMock(return_value=Mock(status_code=503))
+	timeout = AsyncMock(side_effect=httpx.ConnectTimeout("timeout"))
+
+	await breaker.call(not_found)
+	await breaker.call(server_error)
+	assert breaker.state is CircuitState.CLOSED
+	with pytest.raises(httpx.ConnectTimeout):
+		await breaker.call(timeout)
+	assert breaker.state is CircuitState.OPEN
+	with pytest.raises(CircuitOpenError):
+		await breaker.call(not_found)
+	assert not_found.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_probe_frees_slot():
+	breaker = _breaker()
+	breaker.record_failure()
+	breaker.record_failure()
+	cancelled = AsyncMock(side_effect=asyncio.CancelledError)
+	ok = AsyncMock(return_value=Mock(status_code=200))
+	with patch("app.core.circuit_breaker.time.monotonic", return_value=breaker._opened_at + 11):
+		with pytest.raises(asyncio.CancelledError):
+			await breaker.call(cancelled)
+		assert breaker.state is CircuitState.HALF_OPEN
+		# The next probe goes through and closes the circuit
+		await breaker.call(ok)
+	assert breaker.state is CircuitState.CLOSED
@@ -0,0 +1,14 @@
+import pytest
+
+from app.core.http import close_http_client, get_http_client
+
+
+@pytest.mark.asyncio
+async def test_get_http_client_reused():
+	client = get_http_client()
+	assert get_http_client() is client
+
+	await close_http_client()
+	assert client.is_closed
+	assert get_http_client() is not client
+	await close_http_client()
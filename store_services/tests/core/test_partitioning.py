@@ -0,0 +1,15 @@
+from app.core.partitioning import partition_queue, sku_partition
+
+
+def test_sku_partition_stable():
+	partitions = [sku_partition(f"SKU-{i}", 4) for i in range(100)]
+
+	assert all(0 <= partition < 4 for partition in partitions)
+	assert len(set(partitions)) == 4
+	# Same SKU, same partition
+	assert sku_partition("SKU-1", 4) == sku_partition("SKU-1", 4)
+	assert sku_partition("SKU-1", 1) == 0
+
+
+def test_partition_queue():
+	assert partition_queue(3) == "Store.p3"
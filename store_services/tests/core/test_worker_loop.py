@@ -0,0 +1,30 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+from app.core.worker_loop import WorkerLoop
+
+
+async def _current_loop() -> asyncio.AbstractEventLoop:
+	return asyncio.get_running_loop()
+
+
+def test_worker_loop_reused_across_runs():
+	worker_loop = WorkerLoop(shutdown_timeout=1)
+	with (
+		patch("app.core.worker_loop.engine") as engine,
+		patch("app.core.worker_loop.write_engine") as write_engine,
+		patch("app.core.worker_loop.close_http_client", new_callable=AsyncMock) as close_client,
+	):
+		engine.dispose = AsyncMock()
+		write_engine.dispose = AsyncMock()
+		first = worker_loop.run(_current_loop())
+		assert worker_loop.run(_current_loop()) is first
+		assert worker_loop.is_running
+
+		worker_loop.stop()
+
+	assert not worker_loop.is_running
+	assert first.is_closed()
+	close_client.assert_awaited_once()
+	engine.dispose.assert_awaited_once()
+	write_engine.dispose.assert_awaited_once()
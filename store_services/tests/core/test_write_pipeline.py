@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from app.core.write_pipeline import WritePipeline
+
+
+class _Transaction:
+	def __init__(self, log: list[str], name: str) -> None:
+		self.log = log
+		self.name = name
+
+	async def __aenter__(self):
+		return self
+
+	async def __aexit__(self, exc_type, exc, tb) -> bool:
+		self.log.append(f"{self.name} {'rollback' if exc_type else 'commit'}")
+		return False
+
+
+class _Session:
+	def __init__(self, log: list[str]) -> None:
+		self.log = log
+
+	async def __aenter__(self):
+		return self
+
+	async def __aexit__(self, *exc) -> bool:
+		return False
+
+	def begin(self) -> _Transaction:
+		return _Transaction(self.log, "transaction")
+
+	def begin_nested(self) -> _Transaction:
+		return _Transaction(self.log, "savepoint")
+
+
+@pytest.mark.asyncio
+async def test_write_pipeline_group_commit():
+	log: list[str] = []
+	pipeline = WritePipeline(lambda: _Session(log), window=0.01, max_batch=10)
+
+	async def ok(db):
+		return "ok"
+
+	async def fail(db):
+		raise ValueError("no stock")
+
+	results = await asyncio.gather(
+		pipeline.submit(ok), pipeline.submit(fail), pipeline.submit(ok),
+		return_exceptions=True,
+	)
+
+	assert results[0] == "ok" and results[2] == "ok"
+	assert isinstance(results[1], ValueError)
+	# The failed write only rolled back its savepoint, the group committed once
+	assert log.count("transaction commit") == 1
+	assert log.count("savepoint rollback") == 1
+
+
+@pytest.mark.asyncio
+async def test_write_pipeline_commit_failure():
+	class _FailingTransaction(_Transaction):
+		async def __aexit__(self, exc_type, exc, tb) -> bool:
+			raise RuntimeError("database is locked")
+
+	class _FailingSession(_Session):
+		def begin(self) -> _Transaction:
+			return _FailingTransaction(self.log, "transaction")
+
+	pipeline = WritePipeline(lambda: _FailingSession([]), window=0.01, max_batch=2)
+
+	async def ok(db):
+		return "ok"
+
+	results = await asyncio.gather(
+		pipeline.submit(ok), pipeline.submit(ok), return_exceptions=True
+	)
+	assert all(isinstance(r, RuntimeError) for r in results)
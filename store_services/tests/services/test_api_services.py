@@ -1,11 +1,17 @@
+from datetime import UTC, datetime
 from logging import Logger
 from unittest.mock import Mock
 
 import pytest
 from fastapi import HTTPException, Request
 
+from app.common.schemas import BatchUpdateItem
 from app.models.models import Inventory, PendingChange
-from app.services.api_services import get_inventory_by_sku, get_pending_change
+from app.services.api_services import (
+	apply_local_batch,
+	get_inventory_by_sku,
+	get_pending_change,
+)
 
 
 @pytest.mark.asyncion
@@ -83,4 +89,70 @@ async def test_get_pending_change(db):
     result = await get_pending_change(db=db, operation_id="abc")
     assert isinstance(result, PendingChange)
     mock_result.scalar_one_or_none.assert_called_once()
-    db.execute.assert_called()
\ No newline at end of file
+    db.execute.assert_called()
+
+def _inventory_rows(*quantities: int) -> Mock:
+	mock_result = Mock()
+	mock_result.scalars.return_value = [
+		Inventory(
+			id=i,
+			sku=f"sku-{i}",
+			name=f"item-{i}",
+			quantity=quantity,
+			version=1,
+			updated_at=datetime.now(UTC),
+		)
+		for i, quantity in enumerate(quantities)
+	]
+	return mock_result
+
+
+@pytest.mark.asyncio
+async def test_apply_local_batch(db):
+	db.execute.side_effect = [_inventory_rows(5, 1), Mock(rowcount=2), None]
+	items = [
+		BatchUpdateItem(sku="sku-0", delta=-2),
+		BatchUpdateItem(sku="sku-1", delta=-1),
+		BatchUpdateItem(sku="sku-0", delta=-3),
+	]
+
+	lines = await apply_local_batch(db=db, items=items)
+
+	assert [(line.sku, line.quantity, line.version) for line in lines] == [
+		("sku-0", 3, 2),
+		("sku-1", 0, 2),
+		("sku-0", 0, 3),
+	]
+	# One read, one executemany update and one bulk insert
+	assert db.execute.call_count == 3
+	assert len(db.execute.call_args_list[2].args[1]) == 3
+	# Committed by the caller
+	db.commit.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_apply_local_batch_all_or_nothing(db):
+	db.execute.side_effect = [_inventory_rows(5, 1)]
+	items = [
+		BatchUpdateItem(sku="sku-0", delta=-2),
+		BatchUpdateItem(sku="sku-1", delta=-2),
+	]
+
+	with pytest.raises(HTTPException) as err:
+		await apply_local_batch(db=db, items=items)
+
+	assert err.value.status_code == 400
+	assert db.execute.call_count == 1
+	db.commit.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_apply_local_batch_conflict(db):
+	db.execute.side_effect = [_inventory_rows(5), Mock(rowcount=0)]
+
+	with pytest.raises(HTTPException) as err:
+		await apply_local_batch(db=db, items=[BatchUpdateItem(sku="sku-0", delta=-1)])
+
+	assert err.value.status_code == 409
+	# The INSERT of the outbox rows is never sent
+	assert db.execute.call_count == 2
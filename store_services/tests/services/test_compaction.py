@@ -0,0 +1,63 @@
+from app.models.models import PendingChange
+from app.services.compaction import compact_changes, push_operation_id
+
+
+def _change(id: int, sku: str, delta: int, **kwargs) -> PendingChange:
+	return PendingChange(
+		id=id,
+		sku=sku,
+		inventory_id=hash(sku),
+		operation_id=f"op-{id}",
+		delta=delta,
+		**kwargs,
+	)
+
+
+def test_compact_changes_folds_per_sku():
+	changes = [
+		_change(1, "a", -1, central_version=3),
+		_change(2, "b", -2),
+		_change(3, "a", -4, central_version=4),
+		_change(4, "a", 2),
+	]
+	pushes = compact_changes(changes)
+
+	assert [p.sku for p in pushes] == ["a", "b"]
+	assert pushes[0].delta == -3
+	assert pushes[0].change_ids == [1, 3, 4]
+	assert pushes[0].central_version == 3
+	assert pushes[0].operation_id == push_operation_id([changes[0], changes[2], changes[3]])
+	# A change on its own keeps its operation id
+	assert pushes[1].operation_id == "op-2"
+
+
+def test_compact_changes_keeps_previous_groups():
+	group = push_operation_id([_change(1, "a", -1), _change(2, "a", -1)])
+	changes = [
+		_change(1, "a", -1, push_operation_id=group),
+		_change(2, "a", -1, push_operation_id=group),
+		_change(3, "a", -1),
+	]
+	pushes = compact_changes(changes)
+
+	assert [p.operation_id for p in pushes] == [group, "op-3"]
+	assert [p.delta for p in pushes] == [-2, -1]
+
+
+def test_compact_changes_rekeys_partial_group():
+	group = push_operation_id([_change(i, "a", -1) for i in (1, 2, 3)])
+	changes = [
+		_change(1, "a", -1, push_operation_id=group),
+		_change(2, "a", -1, push_operation_id=group),
+	]
+	pushes = compact_changes(changes)
+
+	# Central stored `group` with the delta of all three changes, or of none
+	assert len(pushes) == 1
+	assert pushes[0].operation_id != group
+	assert pushes[0].operation_id == push_operation_id(changes)
+
+
+def test_push_operation_id_is_stable():
+	changes = [_change(1, "a", -1), _change(2, "a", -1)]
+	assert push_operation_id(changes) == push_operation_id(changes[::-1])
@@ -0,0 +1,63 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.dispatcher import SkuOrderedDispatcher
+
+
+def _items(*skus: str) -> list[SimpleNamespace]:
+	return [SimpleNamespace(id=i, sku=sku) for i, sku in enumerate(skus)]
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_orders_each_sku():
+	done: list[int] = []
+	running = 0
+	max_running = 0
+
+	async def handler(item) -> bool:
+		nonlocal running, max_running
+		running += 1
+		max_running = max(max_running, running)
+		# The first item of "a" is the slowest
+		await asyncio.sleep(0.02 if item.id == 0 else 0)
+		running -= 1
+		done.append(item.id)
+		return True
+
+	items = _items("a", "b", "a", "c", "b")
+	results = await SkuOrderedDispatcher(handler, concurrency=2).run(items)
+
+	assert results == [True] * 5
+	assert max_running == 2
+	# Other SKUs didn't wait for the slow push, the later "a" did
+	assert done.index(1) < done.index(0) < done.index(2)
+	assert done.index(1) < done.index(4)
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_skips_rest_of_sku_on_error():
+	async def handler(item) -> bool:
+		if item.id == 0:
+			raise RuntimeError("boom")
+		return True
+
+	results = await SkuOrderedDispatcher(handler, concurrency=5).run(_items("a", "b", "a"))
+
+	assert results == [False, True, False]
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_skips_rest_of_sku_on_failed_result():
+	handled: list[int] = []
+
+	async def handler(item) -> bool:
+		handled.append(item.id)
+		return item.id != 0
+
+	results = await SkuOrderedDispatcher(handler, concurrency=5).run(_items("a", "b", "a", "a"))
+
+	assert results == [False, True, False, False]
+	# The later "a" changes never ran ahead of the failed one
+	assert sorted(handled) == [0, 1]
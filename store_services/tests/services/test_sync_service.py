@@ -1,127 +1,114 @@
-from datetime import UTC, datetime
+import time
+from datetime import UTC, datetime, timedelta
 from unittest.mock import AsyncMock, Mock, patch
 
 import httpx
 import pytest
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
 
+from app.common.schemas import BulkSyncItemResult
 from app.models.models import Inventory, PendingChange, SyncStatus
+from app.services.compaction import compact_changes
 from app.services.sync_service import (
+	PushResult,
+	failed_push,
+	partition_backlog,
+	process_batch,
 	process_change,
 	process_pending_once,
+	push_inventory_batch,
 	push_inventory_update,
+	retry_values,
 	update_metrics,
-	with_retry,
 )
-from sqlalchemy.ext.asyncio import AsyncSession
-
-PATH_TO_SYNC_SERVICES = "app.services.sync_service"
-
-
-@pytest.mark.asyncio
-async def test_with_retry_success():
-	mock_response = AsyncMock(spec=httpx.Response)
-	mock_response.status_code = 200
-	mock_func = AsyncMock(return_value=mock_response)
-
-	result = await with_retry(mock_func)
-	assert result == mock_response
-	assert mock_func.call_count == 1
-
-
-@pytest.mark.asyncio
-async def test_with_retry_error_409():
-	# mock_response = AsyncMock(spec=httpx.Response)
-
-	mock_func = AsyncMock(
-		side_effect=httpx.HTTPStatusError(
-			response=Mock(status_code=409), request=Mock(), message="Dummy Error"
-		)
-	)
-	with pytest.raises(httpx.HTTPStatusError) as err:
-		result = await with_retry(mock_func, max_retries=1)
-		assert result == ""
-	assert err.value.response.status_code == 409
-
-
-@pytest.mark.asyncio
-async def test_with_retry_error_400_500():
-	# mock_response = AsyncMock(spec=httpx.Response)
-
-	mock_func = AsyncMock(
-		side_effect=httpx.HTTPStatusError(
-			response=Mock(status_code=401), request=Mock(), message=""
-		)
-	)
-	with pytest.raises(httpx.HTTPStatusError) as err:
-		result = await with_retry(mock_func)
-	assert err.value.response.status_code == 401
 
+# The instances sync_service uses: `app.auth...` and `app.core...` would be
+# other module objects
+from auth.client import token_manager
+from core.circuit_breaker import CircuitOpenError
+from core.http import central_breaker
+from models import models as db_models
+from models.base import Base
 
-@pytest.mark.asyncio
-async def test_with_retry_eventual_success():
-	mock_response = AsyncMock(spec=httpx.Response)
-	mock_response.status_code = 200
-	mock_func = AsyncMock(side_effect=[Exception("Temporary error"), mock_response])
-
-	result = await with_retry(mock_func, max_retries=2)
-	assert result == mock_response
-	assert mock_func.call_count == 2
-
-
-@pytest.mark.asyncio
-async def test_with_retry_permanent_failure():
-	mock_func = AsyncMock(side_effect=Exception("Permanent error"))
-
-	with pytest.raises(Exception) as exc_info:
-		await with_retry(mock_func, max_retries=2)
-	assert str(exc_info.value) == "Permanent error"
-	assert mock_func.call_count == 2
+PATH_TO_SYNC_SERVICES = "app.services.sync_service"
 
 
 @pytest.mark.asyncio
-@patch(f"{PATH_TO_SYNC_SERVICES}.get_service_token")
+@patch(f"{PATH_TO_SYNC_SERVICES}.post_to_central")
 @patch(
 	f"{PATH_TO_SYNC_SERVICES}.get_inventory",
 	return_value=Inventory(
 		id=1, sku="abc", name="abc", quantity=1, version=1, updated_at=datetime.now(UTC)
 	),
 )
-@patch(
-	f"{PATH_TO_SYNC_SERVICES}.update_model",
-	return_value=Inventory(
-		id=1, sku="abc", name="abc", quantity=1, version=1, updated_at=datetime.now(UTC)
-	),
-)
-async def test_push_inventory_update_success(mock_token, override_settings, db):
-	mock_token.return_value = "test_token"
+async def test_push_inventory_update_success(
+	mock_inventory, mock_post, override_settings, db
+):
 	mock_response = AsyncMock(spec=httpx.Response)
 	mock_response.status_code = 200
 	mock_response.json.return_value = {"version": "2"}
-
-	mocked_client = AsyncMock()
-	mocked_client.post.return_value = mock_response
+	mock_post.return_value = mock_response
 
 	change = PendingChange(
 		sku="test-sku", operation_id="test-op", inventory_id=1, delta=5
 	)
 
-	with patch(f"{PATH_TO_SYNC_SERVICES}.httpx.AsyncClient") as mock_client:
-		mock_client.return_value.__aenter__.return_value = mocked_client
-		success, error = await push_inventory_update(db=db, change=change)
+	result = await push_inventory_update(db=db, change=change)
 
-	assert success
-	assert error is None
+	assert result == PushResult(True, central_version="2")
 
 
 @pytest.mark.asyncio
 @patch(
-	f"{PATH_TO_SYNC_SERVICES}.get_service_token",
-	side_effect=httpx.HTTPStatusError(message="Error", request=Mock(), response=Mock()),
+	f"{PATH_TO_SYNC_SERVICES}.get_inventory",
+	return_value=Inventory(id=1, sku="abc", name="abc", quantity=1, version=1),
 )
-async def test_push_inventory_update_failed_token(mock_token, override_settings, db):
-	success, error = await push_inventory_update(db=db, change=PendingChange())
-	assert not success
-	assert error == "HTTP error: Error"
+@patch("auth.client.get_http_client")
+async def test_push_inventory_update_refreshes_token(
+	mock_http, mock_inventory, override_settings, db
+):
+	token_manager._token = "stale-token"
+	token_manager._expires_at = time.time() + 600
+	accepted = Mock(status_code=200)
+	accepted.json.return_value = {"version": 2}
+	client = AsyncMock()
+	client.post = AsyncMock(side_effect=[Mock(status_code=401), accepted])
+	mock_http.return_value = client
+	change = PendingChange(id=1, sku="abc", operation_id="test-op", inventory_id=1, delta=-1)
+
+	with patch.object(token_manager, "_fetch", AsyncMock(return_value="fresh-token")) as mock_fetch:
+		result = await push_inventory_update(db=db, change=change)
+
+	# The 401 refreshed the token once and the push went through with it
+	assert result == PushResult(True, central_version=2)
+	mock_fetch.assert_awaited_once()
+	assert client.post.call_args.kwargs["headers"]["Authorization"] == "Bearer fresh-token"
+
+
+@pytest.mark.asyncio
+@patch(
+	f"{PATH_TO_SYNC_SERVICES}.get_inventory",
+	return_value=Inventory(id=1, sku="abc", name="abc", quantity=1, version=1),
+)
+@patch("auth.client.get_http_client")
+async def test_push_inventory_update_failed_token(mock_http, mock_inventory, override_settings, db):
+	token_manager._token = "stale-token"
+	token_manager._expires_at = time.time() + 600
+	client = AsyncMock()
+	client.post = AsyncMock(return_value=Mock(status_code=401))
+	mock_http.return_value = client
+	change = PendingChange(id=1, sku="abc", operation_id="test-op", inventory_id=1, delta=-1)
+
+	with patch.object(token_manager, "_fetch", AsyncMock(return_value="fresh-token")) as mock_fetch:
+		result = await push_inventory_update(db=db, change=change)
+
+	# Refreshed once only, the change is retried later
+	mock_fetch.assert_awaited_once()
+	assert client.post.await_count == 2
+	assert result.error_class == "http_401"
+	assert result.retryable
 
 
 @pytest.mark.asyncio
@@ -141,61 +128,104 @@ async def test_update_metrics(db):
 	mock_inv_count.set.assert_called_once_with(1)
 
 
+def _status_values(db) -> dict:
+	"""Values of the status UPDATE process_change sent through run_write."""
+	stmt = db.execute.await_args_list[0].args[0]
+	return {column.key: value.value for column, value in stmt._values.items()}
+
+
 @pytest.mark.asyncio
-@patch(f"{PATH_TO_SYNC_SERVICES}.update_model", side_effect=[None, None])
 async def test_process_change_success(db):
 	change = PendingChange(
 		id=1,
 		sku="test-sku",
 		operation_id="test-op",
 		inventory_id=1,
-		status=SyncStatus.PENDING.value,
+		status=SyncStatus.IN_PROGRESS.value,
 	)
 	with patch(f"{PATH_TO_SYNC_SERVICES}.push_inventory_update") as mock_push:
-		mock_push.return_value = (True, None)
+		mock_push.return_value = PushResult(True, central_version=2)
 		result = await process_change(db, change)
 
-		assert result is True
+	assert result is True
+	values = _status_values(db)
+	assert values["status"] == SyncStatus.COMPLETED.value
+	assert values["lease_owner"] is None
+	# The status and the synced version of the item are committed together
+	assert db.execute.await_count == 2
+	db.commit.assert_awaited_once()
 
 
 @pytest.mark.asyncio
-@patch(f"{PATH_TO_SYNC_SERVICES}.update_model", side_effect=[None, None])
-async def test_process_change_failure(db):
+async def test_process_change_failure_retried(db):
 	change = PendingChange(
 		id=1,
 		sku="test-sku",
 		operation_id="test-op",
 		inventory_id=1,
-		status=SyncStatus.PENDING.value,
+		status=SyncStatus.IN_PROGRESS.value,
+		attempts=0,
 	)
-
 	with patch(f"{PATH_TO_SYNC_SERVICES}.push_inventory_update") as mock_push:
-		mock_push.return_value = (False, "Test error")
+		mock_push.return_value = PushResult(
+			False, "Sync error", error_class="ConnectError", retryable=True
+		)
 		result = await process_change(db, change)
 
-		assert result is True  # Process completed, even though sync failed
+	assert result is False
+	# Back to pending with a backoff, like the bulk path
+	values = _status_values(db)
+	assert values["status"] == SyncStatus.PENDING.value
+	assert values["attempts"] == 1
+	assert values["next_attempt_at"] is not None
 
 
 @pytest.mark.asyncio
-@patch(f"{PATH_TO_SYNC_SERVICES}.update_model", side_effect=[None, None, None])
-@patch(f"{PATH_TO_SYNC_SERVICES}.push_inventory_update")
-async def test_process_change_failure_exception(mock_update_model, mock_push, db):
+async def test_process_change_failure_permanent(db):
 	change = PendingChange(
 		id=1,
 		sku="test-sku",
 		operation_id="test-op",
 		inventory_id=1,
-		status=SyncStatus.PENDING.value,
+		status=SyncStatus.IN_PROGRESS.value,
 	)
-	mock_push.side_effect = Exception()
-	with pytest.raises(Exception) as err:
+	with patch(f"{PATH_TO_SYNC_SERVICES}.push_inventory_update") as mock_push:
+		mock_push.return_value = PushResult(
+			False, "Unexpected response: 400", error_class="http_400"
+		)
 		result = await process_change(db, change)
-		assert result is False
+
+	assert result is False
+	values = _status_values(db)
+	assert values["status"] == SyncStatus.FAILED.value
+
+
+@pytest.mark.asyncio
+@patch(
+	f"{PATH_TO_SYNC_SERVICES}.get_inventory",
+	return_value=Inventory(id=1, sku="abc", name="abc", quantity=1, version=1),
+)
+@patch(
+	f"{PATH_TO_SYNC_SERVICES}.post_to_central",
+	side_effect=CircuitOpenError("Circuit central is open"),
+)
+async def test_process_change_circuit_open(mock_post, mock_inventory, db):
+	change = PendingChange(
+		id=1, sku="abc", operation_id="test-op", inventory_id=1, delta=-1, attempts=2
+	)
+	result = await process_change(db, change)
+
+	assert result is False
+	# Central was never reached: pending again, without using an attempt
+	values = _status_values(db)
+	assert values["status"] == SyncStatus.PENDING.value
+	assert values["attempts"] == 2
+	assert values["last_error_class"] == "circuit_open"
 
 
 @pytest.mark.asyncio
 @patch(f"{PATH_TO_SYNC_SERVICES}.session")
-@patch(f"{PATH_TO_SYNC_SERVICES}.get_pending_changes", return_value = [])
+@patch(f"{PATH_TO_SYNC_SERVICES}.claim_pending_changes", return_value = [])
 @patch(f"{PATH_TO_SYNC_SERVICES}.update_metrics", return_value=None)
 async def test_process_pending_once_empty(
 	mock_update_metrics, mock_pending_changes, db_with
@@ -210,7 +240,8 @@ async def test_process_pending_once_empty(
 
 
 @pytest.mark.asyncio
-@patch(f"{PATH_TO_SYNC_SERVICES}.get_pending_changes")
+@patch(f"{PATH_TO_SYNC_SERVICES}.settings.sync_bulk_enabled", False)
+@patch(f"{PATH_TO_SYNC_SERVICES}.claim_pending_changes")
 @patch(f"{PATH_TO_SYNC_SERVICES}.update_metrics", return_value=None)
 @patch(f"{PATH_TO_SYNC_SERVICES}.process_change")
 @patch(f"{PATH_TO_SYNC_SERVICES}.sync_duration_seconds.set")
@@ -254,7 +285,8 @@ async def test_process_pending_once_success(
 
 
 @pytest.mark.asyncio
-@patch(f"{PATH_TO_SYNC_SERVICES}.get_pending_changes")
+@patch(f"{PATH_TO_SYNC_SERVICES}.settings.sync_bulk_enabled", False)
+@patch(f"{PATH_TO_SYNC_SERVICES}.claim_pending_changes")
 @patch(f"{PATH_TO_SYNC_SERVICES}.update_metrics", return_value=None)
 @patch(f"{PATH_TO_SYNC_SERVICES}.process_change")
 @patch(f"{PATH_TO_SYNC_SERVICES}.sync_duration_seconds.set")
@@ -294,3 +326,379 @@ async def test_process_pending_once_partial_success(
 
 	assert processed == 2
 	assert mock_process_change.call_count == 3
+
+
+def _bulk_changes(n: int) -> list[PendingChange]:
+	return [
+		PendingChange(
+			id=i,
+			sku=f"test-sku-{i}",
+			operation_id=f"test-op-{i}",
+			inventory_id=i,
+			delta=-1,
+			status=SyncStatus.PENDING.value,
+		)
+		for i in range(n)
+	]
+
+
+@pytest.mark.asyncio
+@patch(f"{PATH_TO_SYNC_SERVICES}.post_to_central")
+@patch(f"{PATH_TO_SYNC_SERVICES}.get_inventories")
+async def test_push_inventory_batch_maps_results(mock_inventories, mock_post, db):
+	pushes = compact_changes(_bulk_changes(3))
+	mock_inventories.return_value = {
+		p.inventory_id: Inventory(id=p.inventory_id, sku=p.sku, version=1) for p in pushes
+	}
+	mock_response = Mock(spec=httpx.Response)
+	mock_response.status_code = 200
+	mock_response.json.return_value = [
+		BulkSyncItemResult(
+			operation_id="test-op-0", sku="test-sku-0", quantity=4, version=2, status="applied"
+		).model_dump(mode="json"),
+		BulkSyncItemResult(
+			operation_id="test-op-1", sku="test-sku-1", quantity=9, version=7, status="conflict"
+		).model_dump(mode="json"),
+		BulkSyncItemResult(
+			operation_id="test-op-2",
+			sku="test-sku-2",
+			quantity=0,
+			version=1,
+			status="insufficient",
+			detail="Insufficient stock",
+		).model_dump(mode="json"),
+	]
+	mock_post.return_value = mock_response
+
+	results = await push_inventory_batch(db, pushes)
+
+	assert mock_post.call_count == 1
+	assert len(mock_post.call_args.kwargs["json"]["items"]) == 3
+	assert results["test-op-0"] == PushResult(True, central_version=2)
+	assert results["test-op-1"] == PushResult(
+		False, "Version conflict with central", 7, "conflict", retryable=True
+	)
+	assert results["test-op-2"] == PushResult(
+		False, "Insufficient stock", error_class="insufficient"
+	)
+
+
+@pytest.mark.asyncio
+@patch(f"{PATH_TO_SYNC_SERVICES}.post_to_central")
+@patch(f"{PATH_TO_SYNC_SERVICES}.get_inventories")
+async def test_push_inventory_batch_unknown_sku(mock_inventories, mock_post, db):
+	pushes = compact_changes(_bulk_changes(3))
+	mock_inventories.return_value = {
+		p.inventory_id: Inventory(id=p.inventory_id, sku=p.sku, version=1) for p in pushes
+	}
+
+	async def central(url: str, json: dict, **kwargs) -> httpx.Response:
+		request = httpx.Request("POST", url)
+		if any(item["sku"] == "test-sku-1" for item in json["items"]):
+			return httpx.Response(404, json={"detail": "SKU not found: test-sku-1"}, request=request)
+		return httpx.Response(
+			200,
+			json=[
+				BulkSyncItemResult(
+					operation_id=item["operation_id"],
+					sku=item["sku"],
+					quantity=4,
+					version=2,
+					status="applied",
+				).model_dump(mode="json")
+				for item in json["items"]
+			],
+			request=request,
+		)
+
+	mock_post.side_effect = central
+
+	results = await push_inventory_batch(db, pushes)
+
+	# The whole batch, then one request per push
+	assert mock_post.call_count == 4
+	assert results["test-op-0"] == PushResult(True, central_version=2)
+	assert results["test-op-2"] == PushResult(True, central_version=2)
+	assert not results["test-op-1"].success
+	assert not results["test-op-1"].retryable
+
+
+@pytest.mark.asyncio
+@patch(f"{PATH_TO_SYNC_SERVICES}.settings.sync_max_rebases", 0)
+@patch(f"{PATH_TO_SYNC_SERVICES}.update_models")
+@patch(f"{PATH_TO_SYNC_SERVICES}.push_inventory_batch")
+async def test_process_batch(mock_push, mock_update_models, db):
+	pushes = compact_changes(_bulk_changes(2))
+	mock_push.return_value = {
+		"test-op-0": PushResult(True, central_version=2),
+		"test-op-1": PushResult(
+			False, "Version conflict with central", 7, "conflict", retryable=True
+		),
+	}
+
+	processed = await process_batch(db, pushes)
+
+	assert processed == 1
+	mock_update_models.assert_awaited_once()
+	# One executemany for the changes and one for the synced inventory
+	assert db.execute.call_count == 2
+	change_rows = db.execute.call_args_list[0].args[1]
+	assert change_rows[0]["status"] == SyncStatus.COMPLETED.value
+	# The conflict is retried later, with the version central reported
+	assert change_rows[1]["status"] == SyncStatus.PENDING.value
+	assert change_rows[1]["next_attempt_at"] is not None
+	assert change_rows[1]["attempts"] == 1
+	assert change_rows[1]["central_version"] == 7
+	db.commit.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+@patch(f"{PATH_TO_SYNC_SERVICES}.update_models")
+@patch(f"{PATH_TO_SYNC_SERVICES}.push_inventory_batch")
+async def test_process_batch_net_zero(mock_push, mock_update_models, db):
+	changes = _bulk_changes(2)
+	for change in changes:
+		change.sku, change.inventory_id = "test-sku", 1
+	changes[1].delta = 1
+
+	processed = await process_batch(db, compact_changes(changes))
+
+	assert processed == 2
+	mock_push.assert_not_awaited()
+	change_rows = db.execute.call_args_list[0].args[1]
+	assert {row["status"] for row in change_rows} == {SyncStatus.COMPLETED.value}
+
+
+@pytest.mark.asyncio
+@patch(f"{PATH_TO_SYNC_SERVICES}.settings.sync_page_size", 2)
+@patch(f"{PATH_TO_SYNC_SERVICES}.claim_pending_changes")
+@patch(f"{PATH_TO_SYNC_SERVICES}.update_metrics", return_value=None)
+@patch(f"{PATH_TO_SYNC_SERVICES}.process_changes")
+@patch(f"{PATH_TO_SYNC_SERVICES}.session")
+async def test_process_pending_once_drains_pages(
+	db_with, mock_process_changes, mock_update_metrics, mock_claim
+):
+	changes = _bulk_changes(3)
+	mock_claim.side_effect = [changes[:2], changes[2:]]
+	mock_process_changes.side_effect = lambda db, page: len(page)
+
+	processed = await process_pending_once()
+
+	assert processed == 3
+	assert mock_claim.call_count == 2
+	# Every page is claimed by the same run
+	owners = {call.kwargs["owner"] for call in mock_claim.call_args_list}
+	assert len(owners) == 1
+
+
+@pytest.mark.asyncio
+@patch(f"{PATH_TO_SYNC_SERVICES}.settings.sync_partitions", 4)
+@patch(f"{PATH_TO_SYNC_SERVICES}.claim_pending_changes", return_value=[])
+@patch(f"{PATH_TO_SYNC_SERVICES}.update_metrics", return_value=None)
+@patch(f"{PATH_TO_SYNC_SERVICES}.session")
+async def test_process_pending_once_partition(db_with, mock_update_metrics, mock_claim):
+	await process_pending_once(partition=2)
+
+	assert mock_claim.call_args.kwargs["partition"] == (2, 4)
+
+
+@pytest.mark.asyncio
+@patch(f"{PATH_TO_SYNC_SERVICES}.settings.sync_partitions", 3)
+@patch(f"{PATH_TO_SYNC_SERVICES}.count_backlog_by_partition", return_value={1: 5})
+@patch(f"{PATH_TO_SYNC_SERVICES}.update_metrics", return_value=None)
+@patch(f"{PATH_TO_SYNC_SERVICES}.session")
+async def test_partition_backlog(db_with, mock_update_metrics, mock_count):
+	backlog = await partition_backlog()
+
+	# Partitions without changes are reported too
+	assert backlog == {0: 0, 1: 5, 2: 0}
+
+
+@pytest.mark.parametrize(
+	"result, attempts, status",
+	[
+		(PushResult(True), 0, SyncStatus.COMPLETED),
+		(PushResult(False, "Insufficient stock", error_class="insufficient"), 0, SyncStatus.FAILED),
+		(PushResult(False, "Sync error", error_class="ConnectError", retryable=True), 0, SyncStatus.PENDING),
+		(PushResult(False, "Sync error", error_class="ConnectError", retryable=True), 7, SyncStatus.DEAD_LETTER),
+	],
+)
+@patch(f"{PATH_TO_SYNC_SERVICES}.settings.sync_max_attempts", 8)
+def test_retry_values(result, attempts, status):
+	change = PendingChange(id=1, attempts=attempts)
+	values = retry_values(change, result, datetime.now(UTC))
+
+	assert values["status"] == status.value
+	assert values["attempts"] == attempts + 1
+	assert (values["next_attempt_at"] is not None) == (status == SyncStatus.PENDING)
+
+
+def test_failed_push_retryable():
+	server_error = httpx.HTTPStatusError(
+		message="", request=Mock(), response=Mock(status_code=503)
+	)
+	client_error = httpx.HTTPStatusError(
+		message="", request=Mock(), response=Mock(status_code=422)
+	)
+	assert failed_push(server_error).retryable
+	assert not failed_push(client_error).retryable
+	assert failed_push(httpx.ConnectError("refused")).error_class == "ConnectError"
+
+
+def test_retry_values_circuit_open():
+	change = PendingChange(id=1, attempts=3)
+	result = failed_push(CircuitOpenError("Circuit central is open"))
+	values = retry_values(change, result, datetime.now(UTC))
+
+	assert values["status"] == SyncStatus.PENDING.value
+	assert values["attempts"] == 3
+
+
+@pytest.mark.asyncio
+@patch(f"{PATH_TO_SYNC_SERVICES}.update_metrics", return_value=None)
+@patch(f"{PATH_TO_SYNC_SERVICES}.claim_pending_changes")
+@patch(f"{PATH_TO_SYNC_SERVICES}.session")
+async def test_process_pending_once_circuit_open(db_with, mock_claim, mock_update_metrics):
+	for _ in range(central_breaker.failure_threshold):
+		central_breaker.record_failure()
+
+	assert await process_pending_once() == 0
+	mock_claim.assert_not_called()
+
+
+@pytest.mark.asyncio
+@patch(f"{PATH_TO_SYNC_SERVICES}.settings.sync_max_rebases", 2)
+@patch(f"{PATH_TO_SYNC_SERVICES}.update_models")
+@patch(f"{PATH_TO_SYNC_SERVICES}.push_inventory_batch")
+async def test_process_batch_rebases_conflicts(mock_push, mock_update_models, db):
+	pushes = compact_changes(_bulk_changes(1))
+	mock_push.side_effect = [
+		{"test-op-0": PushResult(False, "Version conflict with central", 7, "conflict", True)},
+		{"test-op-0": PushResult(True, central_version=8)},
+	]
+
+	processed = await process_batch(db, pushes)
+
+	assert processed == 1
+	assert mock_push.await_count == 2
+	assert mock_push.await_args.args[1][0].central_version == 7
+	change_rows = db.execute.call_args_list[0].args[1]
+	assert change_rows[0]["status"] == SyncStatus.COMPLETED.value
+
+
+@pytest.mark.asyncio
+@patch(f"{PATH_TO_SYNC_SERVICES}.post_to_central")
+@patch(
+	f"{PATH_TO_SYNC_SERVICES}.get_inventory",
+	return_value=Inventory(id=1, sku="abc", name="abc", quantity=1, version=1),
+)
+async def test_push_inventory_update_rebases_conflict(mock_inventory, mock_post, db):
+	# Body of central's /adjust 409, as checked by central_services
+	# tests/api/test_central.py::test_adjust_conflict_is_json
+	conflict = httpx.Response(
+		409,
+		content=(
+			b'{"detail":{"error":"CONFLICT","message":"Optimistic lock failed - item was'
+			b' updated","current_state":{"sku":"abc","name":"abc","quantity":100,'
+			b'"version":5,"updated_at":"2026-10-17T07:12:31.032236"}}}'
+		),
+		headers={"content-type": "application/json"},
+	)
+	success = Mock(spec=httpx.Response, status_code=200)
+	success.json.return_value = {"version": 6}
+	mock_post.side_effect = [conflict, success]
+	change = PendingChange(id=1, sku="abc", operation_id="test-op", inventory_id=1, delta=-1)
+
+	result = await push_inventory_update(db=db, change=change)
+
+	assert result.success
+	assert mock_post.call_args.kwargs["json"]["version"] == 5
+
+
+class FakeCentral:
+	"""bulk-sync of central: applies each operation_id once, answers it
+	`replayed` afterwards. Fails the first `fail` requests with a 500."""
+
+	def __init__(self, quantities: dict[str, int], fail: int = 0) -> None:
+		self.quantities = quantities
+		self.fail = fail
+		self.applied: set[str] = set()
+
+	async def post(self, url: str, json: dict, **kwargs) -> httpx.Response:
+		request = httpx.Request("POST", url)
+		if self.fail:
+			self.fail -= 1
+			return httpx.Response(500, request=request)
+		results = []
+		for item in json["items"]:
+			status = "replayed" if item["operation_id"] in self.applied else "applied"
+			if status == "applied":
+				self.applied.add(item["operation_id"])
+				self.quantities[item["sku"]] += item["delta"]
+			results.append({
+				"sku": item["sku"],
+				"quantity": self.quantities[item["sku"]],
+				"version": item["version"] + 1,
+				"operation_id": item["operation_id"],
+				"status": status,
+			})
+		return httpx.Response(200, json=results, request=request)
+
+
+@pytest.mark.asyncio
+@patch(f"{PATH_TO_SYNC_SERVICES}.settings.sync_bulk_enabled", True)
+@patch(f"{PATH_TO_SYNC_SERVICES}.settings.sync_drain", False)
+@patch(f"{PATH_TO_SYNC_SERVICES}.settings.sync_page_size", 3)
+@patch(f"{PATH_TO_SYNC_SERVICES}.update_metrics", return_value=None)
+async def test_process_pending_once_split_group_retry(mock_update_metrics):
+	"""A failed group whose retry page is cut by another SKU's change is still
+	pushed with the delta of all its members."""
+	engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+	async with engine.begin() as conn:
+		await conn.run_sync(Base.metadata.create_all)
+	maker = async_sessionmaker(bind=engine, expire_on_commit=False)
+	start = datetime.now(UTC) - timedelta(minutes=5)
+	async with maker() as db:
+		db.add_all([
+			db_models.Inventory(id=1, sku="A", name="A", quantity=97, version=1),
+			db_models.Inventory(id=2, sku="B", name="B", quantity=9, version=1),
+		])
+		for id, sku, seconds in ((1, "A", 0), (2, "A", 1), (3, "B", 2), (4, "A", 3)):
+			db.add(db_models.PendingChange(
+				id=id, sku=sku, inventory_id=1 if sku == "A" else 2, operation_id=f"op-{id}",
+				delta=-1, local_version=1, created_at=start + timedelta(seconds=seconds),
+			))
+		await db.commit()
+		# B is leased to another worker during the first run
+		await db.execute(
+			update(db_models.PendingChange).where(db_models.PendingChange.id == 3).values(
+				status=SyncStatus.IN_PROGRESS.value,
+				lease_owner="other",
+				lease_expires_at=datetime.now(UTC) + timedelta(minutes=1),
+			)
+		)
+		await db.commit()
+
+	central = FakeCentral({"A": 100, "B": 10}, fail=1)
+	with (
+		patch(f"{PATH_TO_SYNC_SERVICES}.session", maker),
+		patch(f"{PATH_TO_SYNC_SERVICES}.post_to_central", side_effect=central.post),
+	):
+		assert await process_pending_once() == 0
+		async with maker() as db:
+			# The retry of A is due and the lease of B expired
+			await db.execute(
+				update(db_models.PendingChange).values(
+					next_attempt_at=None, lease_expires_at=start
+				)
+			)
+			await db.commit()
+		# The oldest 3 are A, B, A: the last A comes with its group
+		assert await process_pending_once() == 4
+		assert await process_pending_once() == 0
+
+	async with maker() as db:
+		statuses = (await db.scalars(select(db_models.PendingChange.status))).all()
+	await engine.dispose()
+	assert statuses == [SyncStatus.COMPLETED.value] * 4
+	assert central.quantities == {"A": 97, "B": 9}
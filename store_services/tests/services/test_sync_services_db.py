@@ -4,12 +4,13 @@ from unittest.mock import Mock, patch
 from fastapi import HTTPException
 import pytest
 
-from app.models.models import Inventory, PendingChange, SyncStatus
+from app.models.models import Inventory, PendingChange
 from app.services.sync_service_db import (
+	claim_pending_changes,
 	count,
+	count_backlog_by_partition,
 	get_inventory,
 	get_pending_change_by_sku,
-	get_pending_changes,
 	update_model,
 )
 
@@ -32,14 +33,41 @@ async def test_update_model(db):
 
 
 @pytest.mark.asyncio
-async def test_get_pending_change(db):
+async def test_claim_pending_changes(db):
+	now = datetime.now(UTC)
+	first = PendingChange(id=1, sku="a", created_at=now)
+	second = PendingChange(id=2, sku="b", created_at=now)
 	mock_result = Mock()
-	mock_result.scalars.return_value.all.return_value = [Inventory(), Inventory()]
+	mock_result.all.return_value = [second, first]
+	db.scalars.return_value = mock_result
+
+	result = await claim_pending_changes(db=db, owner="worker", lease_seconds=60)
+
+	assert result == [first, second]
+	db.scalars.assert_awaited_once()
+	# Committed by the caller's run_write
+	db.commit.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_claim_pending_changes_partition(db):
+	mock_result = Mock()
+	mock_result.all.return_value = []
+	db.scalars.return_value = mock_result
+
+	await claim_pending_changes(db=db, owner="worker", lease_seconds=60, partition=(1, 4))
+
+	stmt = db.scalars.call_args.args[0]
+	assert "sku_partition" in str(stmt)
+
+
+@pytest.mark.asyncio
+async def test_count_backlog_by_partition(db):
+	mock_result = Mock()
+	mock_result.all.return_value = [(0, 3), (2, 1)]
 	db.execute.return_value = mock_result
-	result = await get_pending_changes(db=db, status=SyncStatus.COMPLETED)
-	mock_result.scalars.assert_called_once()
-	db.execute.assert_called_once()
-	assert len(result) == 2
+
+	assert await count_backlog_by_partition(db=db, partitions=4) == {0: 3, 2: 1}
 
 
 @pytest.mark.asyncio
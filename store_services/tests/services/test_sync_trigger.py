@@ -0,0 +1,47 @@
+import asyncio
+from unittest.mock import Mock, patch
+
+import pytest
+
+import app.services.sync_trigger as sync_trigger
+
+PATH = "app.services.sync_trigger"
+
+
+@pytest.fixture(autouse=True)
+def reset_scheduled_at():
+	sync_trigger._scheduled_at = None
+	yield
+	sync_trigger._scheduled_at = None
+
+
+@patch(f"{PATH}.CELERY_AVAILABLE", True)
+@patch(f"{PATH}.process_pending_once_task")
+async def test_request_sync_debounced(mock_task):
+	await sync_trigger.request_sync()
+	await sync_trigger.request_sync()
+
+	mock_task.apply_async.assert_called_once()
+	assert mock_task.apply_async.call_args.kwargs["countdown"] > 0
+	# Routed by the Celery config, not pinned to a queue
+	assert "queue" not in mock_task.apply_async.call_args.kwargs
+
+
+@patch(f"{PATH}.CELERY_AVAILABLE", True)
+@patch(f"{PATH}.process_pending_once_task")
+async def test_request_sync_failure_allows_retry(mock_task):
+	mock_task.apply_async.side_effect = [Exception("broker down"), Mock()]
+	await sync_trigger.request_sync()
+	await sync_trigger.request_sync()
+
+	assert mock_task.apply_async.call_count == 2
+
+
+@patch(f"{PATH}.CELERY_AVAILABLE", False)
+@patch(f"{PATH}.settings.sync_trigger_debounce", 0.01)
+@patch(f"{PATH}.process_pending_once")
+async def test_request_sync_without_celery(mock_process):
+	await sync_trigger.request_sync()
+	await asyncio.sleep(0.05)
+
+	mock_process.assert_awaited_once()